@@ -1,10 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.urls import reverse
 from django.utils.html import format_html
-from .models import CustomUser, Plan, Membership, AccessLog, Payment
-import qrcode
-import base64
-from io import BytesIO
+from django.utils import timezone
+from .models import CustomUser, Plan, Membership, AccessLog, Payment, DailyAttendanceRollup, OutboxMessage, ReportJob
 
 @admin.register(CustomUser)
 class CustomUserAdmin(BaseUserAdmin):
@@ -31,24 +30,11 @@ class CustomUserAdmin(BaseUserAdmin):
             if not data_string:
                 return "Error en datos QR"
 
-            # Generar QR en memoria
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=4,
-                border=1,
-            )
-            qr.add_data(data_string)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir a Base64
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            img_str = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            
+            # Imagen servida por /qr/<id>.png (caché de qr_render + caché del navegador)
+            url = reverse('qr_image', args=[obj.qr_unique_id, 'png'])
+
             # Retornar HTML seguro
-            return format_html('<img src="data:image/png;base64,{}" width="150" height="150" style="border:1px solid #ccc; padding:5px;" />', img_str)
+            return format_html('<img src="{}?size=4&amp;border=1" width="150" height="150" style="border:1px solid #ccc; padding:5px;" />', url)
         return "Sin Código QR asignado"
     
     display_qr_code.short_description = "Vista Previa QR (Generado)"
@@ -133,8 +119,8 @@ class PlanAdmin(admin.ModelAdmin):
 @admin.register(Membership)
 class MembershipAdmin(admin.ModelAdmin):
     list_display = ('user', 'plan', 'start_date', 'end_date', 
-                   'status', 'is_active', 'days_remaining')
-    list_filter = ('status', 'is_active', 'plan', 'payment_method')
+                   'status', 'is_active', 'days_remaining', 'email_status')
+    list_filter = ('status', 'is_active', 'plan', 'payment_method', 'email_status')
     search_fields = ('user__rut', 'user__first_name', 'user__last_name', 'user__email')
     date_hierarchy = 'start_date'
     ordering = ('-created_at',)
@@ -156,6 +142,34 @@ class AccessLogAdmin(admin.ModelAdmin):
     
     readonly_fields = ('timestamp',)
 
+@admin.register(DailyAttendanceRollup)
+class DailyAttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'scope', 'user', 'plan', 'allowed', 'denied')
+    list_filter = ('scope', 'plan')
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+    
+    # Se mantiene solo desde el escáner o con rebuild_attendance_rollup
+    readonly_fields = ('date', 'scope', 'user', 'plan', 'allowed', 'denied')
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('user__rut', 'user__email', 'last_error')
+    ordering = ('-created_at',)
+    actions = ['reintentar']
+
+    # Lo escriben las vistas (al encolar) y el worker process_outbox
+    readonly_fields = ('kind', 'user', 'membership', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at')
+
+    @admin.action(description='Reintentar ahora los mensajes seleccionados')
+    def reintentar(self, request, queryset):
+        actualizados = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{actualizados} mensaje(s) vuelven a la cola.')
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     # Qué columnas se ven en la lista
@@ -197,4 +211,15 @@ class PaymentAdmin(admin.ModelAdmin):
         if obj.plan:
             return obj.plan.name
         return f"{obj.plan_backup_name} (Plan Borrado)"
-    get_plan_info.short_description = 'Plan Contratado'
\ No newline at end of file
+    get_plan_info.short_description = 'Plan Contratado'
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'total', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    ordering = ('-created_at',)
+
+    # Lo escriben el panel (al pedir el reporte) y el worker process_report_jobs
+    readonly_fields = ('kind', 'params', 'requested_by', 'fingerprint', 'file_name', 'progress', 'total',
+                       'error', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,98 @@
+"""
+Caché de admisión para el escáner QR (torniquete).
+
+Guarda por socio lo mínimo que necesita process_qr_scan para decidir un acceso:
+datos del usuario, vencimiento de la membresía activa, si ya entró hoy y sus
+accesos del mes. Se invalida desde los save() de CustomUser, Membership y
+AccessLog, así que un escaneo normal solo toca la BD para insertar el AccessLog.
+
+La invalidación solo llega a los workers que comparten la caché. Con una caché
+por proceso (LocMemCache) un worker no vería la renovación ni la entrada
+registradas por otro (negaría a quien renovó o dejaría entrar dos veces), así
+que en ese caso la caché no se usa y cada escaneo lee la BD, salvo que
+ADMISSION_CACHE_ALLOW_LOCAL lo permita (un solo proceso: runserver, tests).
+
+IMPORTANTE: Este módulo NO importa modelos (models.py lo usa en sus save()).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+KEY_PREFIX = 'admission'
+
+
+def _cache():
+    return caches[getattr(settings, 'ADMISSION_CACHE_ALIAS', 'default')]
+
+
+def enabled():
+    """¿Es seguro usar la caché? Solo si es compartida entre procesos (o se permite la local)."""
+    cache = _cache()
+    if isinstance(cache, DummyCache):
+        return False
+    return not isinstance(cache, LocMemCache) or getattr(settings, 'ADMISSION_CACHE_ALLOW_LOCAL', False)
+
+
+def _key(user_id):
+    # La clave es el ID del usuario que viaja en el QR; el qr_unique_id se valida
+    # dentro de la entrada. Así cualquier save() puede invalidar sin consultar la BD.
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def month_key(local_dt):
+    """Identificador del mes local ('2025-03') para el contador mensual."""
+    return local_dt.strftime('%Y-%m')
+
+
+def build_entry(user, membership, todays_access, monthly_access, now_chile):
+    """Arma la entrada de caché a partir de lo leído en la BD."""
+    return {
+        'user_id': user.id,
+        'rut': user.rut,
+        'qr_id': user.qr_unique_id,
+        'name': user.get_full_name(),
+        'membership_id': membership.id if membership else None,
+        'plan_id': membership.plan_id if membership else None,
+        'end_date': membership.end_date if membership else None,
+        'admitted_on': now_chile.date() if todays_access else None,
+        'access_time': todays_access.strftime('%H:%M:%S') if todays_access else None,
+        'month': month_key(now_chile),
+        'monthly_access': monthly_access,
+    }
+
+
+def get_entry(claims):
+    """Retorna la entrada solo si coincide con el QR escaneado (qr_token.QRClaims)."""
+    if not enabled():
+        return None
+    entry = _cache().get(_key(claims.user_id))
+    if entry is None or not claims.matches(entry['qr_id'], entry['rut']):
+        return None
+    return entry
+
+
+def set_entry(entry):
+    if not enabled():
+        return
+    timeout = getattr(settings, 'ADMISSION_CACHE_TIMEOUT', 60 * 60 * 12)
+    _cache().set(_key(entry['user_id']), entry, timeout)
+
+
+def record_admission(entry, local_dt):
+    """Write-through tras insertar un acceso permitido: marca el día y suma al mes."""
+    if entry['month'] != month_key(local_dt):
+        entry['month'] = month_key(local_dt)
+        entry['monthly_access'] = 0
+    entry['monthly_access'] += 1
+    entry['admitted_on'] = local_dt.date()
+    entry['access_time'] = local_dt.strftime('%H:%M:%S')
+    set_entry(entry)
+    return entry
+
+
+def invalidate(*user_ids):
+    """Elimina las entradas de los usuarios indicados (ignora None)."""
+    keys = [_key(uid) for uid in user_ids if uid is not None]
+    if keys:
+        _cache().delete_many(keys)
@@ -1,38 +1,70 @@
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from . import login_throttle
 from .models import CustomUser
+from .rut import looks_like_rut, normalize as normalize_rut
+
+
+def _is_admin_request(request):
+    return request is not None and '/admin' in request.path
+
+
+def lookup_field(identifier):
+    """
+    Qué columna identifica al usuario: correo si trae '@' (en minúsculas; se
+    compara sin distinguir mayúsculas), RUT si tiene forma de RUT (se busca
+    por rut_normalized) y si no, el username.
+    Una sola columna con índice por intento, en vez de un OR entre tres.
+    """
+    if '@' in identifier:
+        return 'email', identifier.lower()
+    if looks_like_rut(identifier):
+        return 'rut_normalized', normalize_rut(identifier)
+    return 'username', identifier
+
 
 class RUTorEmailBackend(ModelBackend):
     """
     Backend personalizado SOLO para usuarios normales (no superusuarios)
-    Los superusuarios SOLO pueden autenticarse en /admin con el backend por defecto
+    Los superusuarios SOLO pueden autenticarse en /admin con AdminModelBackend
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         # Si viene del /admin (request path contiene 'admin'), NO usar este backend
-        if request and '/admin' in request.path:
-            return None  # Dejar que el backend por defecto maneje el admin
-        
-        try:
-            # Buscar usuario por RUT, Email o Username
-            user = CustomUser.objects.get(
-                Q(rut=username) | Q(email=username) | Q(username=username)
-            )
-            
-            # IMPORTANTE: Rechazar superusuarios en este backend
-            if user.is_superuser:
-                return None  # Superusuarios NO pueden usar este backend
-            
-            # Validar contraseña
-            if user.check_password(password):
-                return user
-                
-        except CustomUser.DoesNotExist:
-            return None
-        except CustomUser.MultipleObjectsReturned:
+        if _is_admin_request(request):
+            return None  # Dejar que AdminModelBackend maneje el admin
+        if not username or password is None:
             return None
-        
+
+        field, value = lookup = lookup_field(username.strip())
+
+        # Demasiados fallos: se corta antes de la BD y del hash (PermissionDenied
+        # detiene también a los backends siguientes)
+        if login_throttle.is_blocked(lookup, request):
+            raise PermissionDenied('Demasiados intentos fallidos')
+
+        if field == 'rut_normalized':
+            # Incluye los RUT que chocan con otro y quedaron sin clave (ver get_by_rut)
+            try:
+                user = CustomUser.objects.get_by_rut(username)
+            except CustomUser.DoesNotExist:
+                user = None
+        else:
+            # Email no es único: dos cuentas con el mismo correo no pueden entrar por correo
+            lookup_expr = 'email__iexact' if field == 'email' else field
+            candidates = list(CustomUser.objects.filter(**{lookup_expr: value})[:2])
+            user = candidates[0] if len(candidates) == 1 else None
+
+        if user is None:
+            # Mismo costo que con un usuario existente (no revelar qué cuentas existen)
+            CustomUser().set_password(password)
+        elif not user.is_superuser and user.check_password(password):
+            # IMPORTANTE: los superusuarios NO pueden usar este backend
+            login_throttle.reset(lookup, request)
+            return user
+
+        login_throttle.register_failure(lookup, request)
         return None
-    
+
     def get_user(self, user_id):
         try:
             user = CustomUser.objects.get(pk=user_id)
@@ -42,3 +74,15 @@ class RUTorEmailBackend(ModelBackend):
             return user
         except CustomUser.DoesNotExist:
             return None
+
+
+class AdminModelBackend(ModelBackend):
+    """
+    ModelBackend de Django (username + contraseña) solo para /admin.
+    Fuera del admin no hace nada: así un login web fallido calcula el hash una
+    sola vez (en RUTorEmailBackend) y no dos.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if request is not None and not _is_admin_request(request):
+            return None
+        return super().authenticate(request, username=username, password=password, **kwargs)
@@ -0,0 +1,91 @@
+"""
+Contador de intentos de login fallidos (protección ante credential stuffing).
+
+Cada intento fallido suma en contadores de la caché, con la misma ventana:
+
+- cuenta + IP: LOGIN_MAX_FAILURES intentos (adivinar la clave de una cuenta)
+- solo IP: LOGIN_MAX_FAILURES_PER_IP intentos (probar muchas cuentas desde un
+  origen); solo si está configurado y se conoce la IP del cliente
+
+Al superar cualquiera de los dos, RUTorEmailBackend rechaza el intento sin
+consultar la BD ni calcular el hash PBKDF2 (lo caro del login), y
+process_login responde 429. Un login exitoso limpia el contador de esa cuenta.
+
+La cuenta se identifica por la columna y el valor canónico con que se busca
+(backends.lookup_field): '12.345.678-5', '12345678-5' y '012345678-5' son
+el mismo contador, así que variar el formato del RUT no salta el límite.
+
+La IP sale de X-Forwarded-For según LOGIN_TRUSTED_PROXY_COUNT (ver
+client_ip): detrás del balanceador de Render REMOTE_ADDR es el mismo para
+todos, y 5 claves malas contra un RUT bloquearían a ese socio en todas partes.
+
+Con LocMemCache el conteo es por worker; para un límite global 'default'
+debe ser una caché compartida (ver CACHES en settings).
+
+IMPORTANTE: Este módulo NO importa modelos.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'login_fail'
+
+
+def _cache():
+    return caches[getattr(settings, 'LOGIN_THROTTLE_CACHE_ALIAS', 'default')]
+
+
+def _window():
+    return getattr(settings, 'LOGIN_FAILURE_WINDOW', 15 * 60)
+
+
+def client_ip(request):
+    """
+    IP del cliente o None si no se puede saber. Detrás de
+    LOGIN_TRUSTED_PROXY_COUNT proxies se toma de X-Forwarded-For contando
+    desde la derecha: cada proxy agrega un salto al final y lo que está más a
+    la izquierda lo puede escribir el propio cliente.
+    """
+    if request is None:
+        return None
+    proxies = getattr(settings, 'LOGIN_TRUSTED_PROXY_COUNT', 0)
+    if not proxies:
+        return request.META.get('REMOTE_ADDR') or None
+    hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    return hops[-proxies] if len(hops) >= proxies else None
+
+
+def _keys(lookup, ip):
+    """(clave cuenta + IP, clave solo IP o None si no se aplica el límite por IP)."""
+    # La cuenta va hasheada: la clave de caché no guarda RUTs ni correos
+    field, value = lookup
+    ident = hashlib.sha256(f"{field}:{value}".encode()).hexdigest()[:32]
+    per_ip = ip is not None and getattr(settings, 'LOGIN_MAX_FAILURES_PER_IP', None) is not None
+    return f"{KEY_PREFIX}:id:{ident}:{ip or '-'}", f"{KEY_PREFIX}:ip:{ip}" if per_ip else None
+
+
+def is_blocked(lookup, request):
+    """¿Esta cuenta ((campo, valor) de lookup_field) o esta IP superó los intentos permitidos?"""
+    id_key, ip_key = _keys(lookup, client_ip(request))
+    counts = _cache().get_many([key for key in (id_key, ip_key) if key])
+    return (
+        counts.get(id_key, 0) >= getattr(settings, 'LOGIN_MAX_FAILURES', 5)
+        or (ip_key is not None and counts.get(ip_key, 0) >= settings.LOGIN_MAX_FAILURES_PER_IP)
+    )
+
+
+def register_failure(lookup, request):
+    cache = _cache()
+    for key in _keys(lookup, client_ip(request)):
+        if key is None:
+            continue
+        # add() crea la clave con la ventana; incr() no la renueva
+        cache.add(key, 0, _window())
+        try:
+            cache.incr(key)
+        except ValueError:  # expiró entre add() e incr()
+            cache.set(key, 1, _window())
+
+
+def reset(lookup, request):
+    _cache().delete(_keys(lookup, client_ip(request))[0])
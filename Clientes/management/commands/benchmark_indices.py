@@ -0,0 +1,218 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from Clientes.models import CustomUser, Plan, Membership, AccessLog, Payment
+
+BENCH_PREFIX = 'bench_idx_'
+
+
+class Command(BaseCommand):
+    help = ('Siembra ~1M de accesos y muestra con EXPLAIN que las consultas de los '
+            'dashboards y del escáner usan los índices compuestos (no full scan).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accesos', type=int, default=1_000_000, help='Cantidad de AccessLog a sembrar')
+        parser.add_argument('--socios', type=int, default=2000, help='Socios sintéticos a crear')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por consulta para la mediana')
+        parser.add_argument('--sin-sembrar', action='store_true', help='Usar los datos ya sembrados')
+        parser.add_argument('--limpiar', action='store_true', help='Borrar los datos sintéticos y salir')
+        parser.add_argument('--plan', action='store_true', help='Imprimir el plan completo de cada consulta')
+        parser.add_argument('--confirmar', action='store_true',
+                            help='Permitir sembrar/borrar datos con DEBUG=False (p. ej. en Render)')
+
+    def handle(self, *args, **opts):
+        # Sembrar o limpiar escribe ~1M de filas en la BD configurada: fuera de
+        # desarrollo se exige confirmarlo de forma explícita
+        escribe = opts['limpiar'] or not opts['sin_sembrar']
+        if escribe and not settings.DEBUG and not opts['confirmar']:
+            raise CommandError(
+                'DEBUG=False: esta BD parece de producción. Este comando inserta y borra datos '
+                'sintéticos; usa --confirmar si de verdad quieres hacerlo, o --sin-sembrar para solo medir.'
+            )
+
+        if opts['limpiar']:
+            self.limpiar()
+            return
+
+        if not opts['sin_sembrar']:
+            self.sembrar(opts['socios'], opts['accesos'])
+
+        socio = CustomUser.objects.filter(username__startswith=BENCH_PREFIX).first()
+        if socio is None:
+            self.stdout.write(self.style.ERROR('No hay datos sintéticos. Ejecuta sin --sin-sembrar.'))
+            return
+
+        self.analizar_tablas()
+
+        resultados = []
+        for nombre, qs in self.consultas(socio):
+            plan = qs.explain()
+            tiempos = []
+            for _ in range(opts['repeticiones']):
+                t0 = time.perf_counter()
+                list(qs.all())  # .all() clona: evita medir la caché del QuerySet
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            resultados.append((nombre, self.clasificar_plan(plan), statistics.median(tiempos), plan))
+
+        self.stdout.write('')
+        self.stdout.write(f"{'Consulta':<32} {'Acceso':<12} {'Mediana (ms)':>12}")
+        self.stdout.write('-' * 58)
+        for nombre, tipo, mediana, plan in resultados:
+            estilo = self.style.SUCCESS if tipo == 'índice' else self.style.ERROR
+            self.stdout.write(f"{nombre:<32} {estilo(f'{tipo:<12}')} {mediana:>12.2f}")
+            if opts['plan']:
+                self.stdout.write(plan)
+                self.stdout.write('')
+
+        full_scans = [r[0] for r in resultados if r[1] != 'índice']
+        if full_scans:
+            self.stdout.write(self.style.WARNING(f"Consultas sin índice: {', '.join(full_scans)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Todas las consultas usan un índice.'))
+
+    # ------------------------------------------------------------------
+    # Consultas con la misma forma que las de producción
+    # ------------------------------------------------------------------
+
+    def consultas(self, socio):
+        now_chile = timezone.localtime(timezone.now())
+        today = now_chile.date()
+        start_of_day = now_chile.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_day = now_chile.replace(hour=23, minute=59, second=59, microsecond=999999)
+        primer_dia_mes = now_chile.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        first_day_month = today.replace(day=1)
+        plan = Plan.objects.filter(is_active=True).first()
+
+        return [
+            # process_qr_scan
+            ('scanner: ya entró hoy', AccessLog.objects.filter(
+                user=socio, timestamp__range=(start_of_day, end_of_day), status='allowed')[:1]),
+            ('scanner: accesos del mes', AccessLog.objects.filter(
+                user=socio, timestamp__gte=primer_dia_mes, status='allowed').values('id')),
+            # index_socio
+            ('socio: últimos 30 días', socio.access_logs.filter(
+                timestamp__gte=start_of_day - timedelta(days=30), status='allowed').order_by('-timestamp')[:20]),
+            # get_kpis / index_moderador
+            ('kpi: accesos hoy', AccessLog.objects.filter(
+                timestamp__range=(start_of_day, end_of_day), status='allowed').values('id')),
+            ('moderador: últimos accesos', AccessLog.objects.filter(
+                timestamp__range=(start_of_day, end_of_day)).order_by('-timestamp')),
+            ('kpi: planes por vencer', Membership.objects.filter(
+                is_active=True, end_date__gte=today, end_date__lte=today + timedelta(days=7)).values('id')),
+            ('membresía activa del socio', Membership.objects.filter(
+                user=socio, is_active=True, end_date__gt=today)[:1]),
+            ('kpi: ingresos del mes', Membership.objects.filter(
+                payment_date__gte=first_day_month).exclude(status='cancelled').values('amount_paid')),
+            ('plan: ingresos del mes', Membership.objects.filter(
+                plan=plan, payment_date__gte=first_day_month, status__in=['active', 'pending']).values('amount_paid')),
+            ('pagos: año actual', Payment.objects.filter(
+                date__gte=today.replace(month=1, day=1)).values('amount')),
+        ]
+
+    def clasificar_plan(self, plan):
+        """Heurística multi-motor: PostgreSQL, SQLite y MySQL/MariaDB."""
+        texto = plan.upper()
+        full_scan = (
+            'SEQ SCAN' in texto                      # PostgreSQL
+            or 'TABLE SCAN' in texto                 # MySQL FORMAT=TREE
+            or any(linea.split(' ', 4)[-1].startswith('SCAN ') and 'INDEX' not in linea
+                   for linea in texto.splitlines())  # SQLite
+            or ' ALL ' in f' {texto} '               # MySQL tradicional (type=ALL)
+        )
+        if full_scan:
+            return 'full scan'
+        return 'índice' if 'INDEX' in texto or ' RANGE ' in texto or ' REF ' in texto else 'desconocido'
+
+    def analizar_tablas(self):
+        """Actualiza estadísticas para que el planificador vea la distribución real."""
+        tablas = [m._meta.db_table for m in (AccessLog, Membership, Payment)]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f"ANALYZE TABLE {', '.join(tablas)}")
+            else:
+                for tabla in tablas:
+                    cursor.execute(f'ANALYZE "{tabla}"')
+
+    # ------------------------------------------------------------------
+    # Datos sintéticos
+    # ------------------------------------------------------------------
+
+    def sembrar(self, n_socios, n_accesos):
+        self.limpiar()
+        planes = list(Plan.objects.filter(is_active=True))
+        if not planes:
+            self.stdout.write(self.style.ERROR('No hay planes activos. Ejecuta poblar_db primero.'))
+            raise SystemExit(1)
+
+        now = timezone.now()
+        today = now.date()
+
+        self.stdout.write(f'Creando {n_socios} socios sintéticos...')
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'{BENCH_PREFIX}{i}', password='!',
+                first_name='Bench', last_name=str(i), role='socio', is_active_member=True
+            ) for i in range(n_socios)
+        ], batch_size=2000)
+        socios = list(CustomUser.objects.filter(username__startswith=BENCH_PREFIX).values_list('id', flat=True))
+
+        # Una membresía y un pago por socio y mes durante el último año
+        self.stdout.write('Creando membresías y pagos...')
+        memberships, payments = [], []
+        for user_id in socios:
+            plan = random.choice(planes)
+            for mes in range(12):
+                start = today - timedelta(days=30 * (12 - mes))
+                end = start + timedelta(days=plan.duration_days)
+                vigente = end > today
+                pago = timezone.make_aware(timezone.datetime.combine(start, timezone.datetime.min.time()))
+                memberships.append(Membership(
+                    user_id=user_id, plan=plan, start_date=start, end_date=end,
+                    payment_method='efectivo', amount_paid=plan.price, payment_date=pago,
+                    status='active' if vigente else 'expired', is_active=vigente
+                ))
+                payments.append(Payment(
+                    user_id=user_id, plan=plan, user_backup_name='Bench', user_backup_rut='-',
+                    plan_backup_name=plan.name, amount=plan.price, payment_method='efectivo', date=pago
+                ))
+        Membership.objects.bulk_create(memberships, batch_size=5000)
+        Payment.objects.bulk_create(payments, batch_size=5000)
+
+        self.stdout.write(f'Creando {n_accesos} accesos (365 días)...')
+        lote = []
+        segundos_anio = 365 * 24 * 3600
+        for i in range(n_accesos):
+            lote.append(AccessLog(
+                user_id=random.choice(socios),
+                timestamp=now - timedelta(seconds=random.randint(0, segundos_anio)),
+                status='allowed' if random.random() < 0.95 else 'denied'
+            ))
+            if len(lote) == 10000:
+                AccessLog.objects.bulk_create(lote)
+                lote = []
+                self.stdout.write(f'  {i + 1} accesos...', ending='\r')
+        if lote:
+            AccessLog.objects.bulk_create(lote)
+        self.stdout.write(self.style.SUCCESS(f'Datos sintéticos listos ({n_accesos} accesos).'))
+
+    def limpiar(self):
+        socios = CustomUser.objects.filter(username__startswith=BENCH_PREFIX)
+        # Los accesos se borran con SQL directo: un delete() del ORM cargaría el
+        # millón de filas en memoria para emitir post_delete.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {AccessLog._meta.db_table} WHERE user_id IN "
+                f"(SELECT id FROM {CustomUser._meta.db_table} WHERE username LIKE %s)",
+                [f'{BENCH_PREFIX}%']
+            )
+        # Los pagos usan SET_NULL, hay que borrarlos explícitamente
+        Payment.objects.filter(user__in=socios).delete()
+        Membership.objects.filter(user__in=socios).delete()
+        borrados, _ = socios.delete()
+        if borrados:
+            self.stdout.write(self.style.WARNING('Datos sintéticos anteriores eliminados.'))
@@ -0,0 +1,51 @@
+import hashlib
+import statistics
+import time
+import qrcode
+from django.core.management.base import BaseCommand
+from Clientes import qr_token
+
+
+class Command(BaseCommand):
+    help = ('Compara el formato antiguo del QR (str(dict) + ast.literal_eval) con el '
+            'token firmado v1: tiempo de parseo/verificación, largo y versión del QR.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20000, help='Parseos por medición')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Mediciones para la mediana')
+
+    def handle(self, *args, **opts):
+        # Datos con la misma forma que los de producción (sin tocar la BD)
+        user_id = 123456
+        qr_unique_id = hashlib.sha256(b'12345678-5-1700000000.0').hexdigest()
+        rut = '12345678-5'
+
+        formatos = [
+            ('antiguo (str(dict))', str({'user_id': user_id, 'qr_id': qr_unique_id, 'rut': rut})),
+            ('token v1 (firmado)', qr_token.make_token(user_id, qr_unique_id)),
+        ]
+
+        self.stdout.write(f"{'Formato':<22} {'Largo':>6} {'QR':>10} {'Parseo+verif. (µs)':>20}")
+        self.stdout.write('-' * 62)
+        for nombre, data in formatos:
+            claims = qr_token.parse(data)
+            if not claims.matches(qr_unique_id, rut):
+                self.stdout.write(self.style.ERROR(f'{nombre}: el QR no verifica'))
+                return
+
+            micro = self.medir(data, qr_unique_id, rut, opts['iteraciones'], opts['repeticiones'])
+            qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)
+            qr.add_data(data)
+            qr.make(fit=True)
+            modulos = qr.modules_count
+            self.stdout.write(f"{nombre:<22} {len(data):>6} {f'v{qr.version} {modulos}x{modulos}':>10} {micro:>20.2f}")
+
+    def medir(self, data, qr_unique_id, rut, iteraciones, repeticiones):
+        """Mediana del tiempo por escaneo: parseo, firma y comparación con el usuario."""
+        tiempos = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            for _ in range(iteraciones):
+                qr_token.parse(data).matches(qr_unique_id, rut)
+            tiempos.append((time.perf_counter() - t0) / iteraciones * 1_000_000)
+        return statistics.median(tiempos)
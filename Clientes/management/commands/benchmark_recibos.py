@@ -0,0 +1,52 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from Clientes import pdf_worker
+from Clientes.models import Payment
+from Clientes.services.receipt_bundle import iter_receipts
+
+
+class Command(BaseCommand):
+    help = ('Mide cómo escala la generación de recibos PDF con la cantidad de procesos '
+            '(sin caché en disco): recibos/segundo y aceleración respecto de 1 proceso.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=40, help='Recibos a generar por medición')
+        parser.add_argument('--procesos', default=None,
+                            help='Lista de procesos a probar, p. ej. 1,2,4 (por defecto 1, 2, 4... hasta los núcleos)')
+
+    def handle(self, *args, **opts):
+        nucleos = os.cpu_count() or 1
+        if opts['procesos']:
+            niveles = [int(n) for n in opts['procesos'].split(',')]
+        else:
+            niveles, n = [], 1
+            while n < nucleos:
+                niveles.append(n)
+                n *= 2
+            niveles.append(nucleos)
+
+        ids = list(Payment.objects.order_by('id').values_list('id', flat=True)[:opts['cantidad']])
+        if not ids:
+            self.stdout.write(self.style.WARNING('No hay pagos en la BD (ejecute poblar_db).'))
+            return
+        pagos = Payment.objects.filter(id__in=ids).select_related('user').order_by('id')
+
+        self.stdout.write(f'{len(ids)} recibos, {nucleos} núcleo(s) disponibles')
+        self.stdout.write(f"{'Procesos':>9} {'Tiempo (s)':>11} {'Recibos/s':>10} {'Aceleración':>12}")
+        self.stdout.write('-' * 46)
+        base = None
+        for procesos in niveles:
+            with ProcessPoolExecutor(max_workers=procesos, initializer=pdf_worker.init_worker) as executor:
+                # Arranque de los procesos (e import de xhtml2pdf) fuera de la medición
+                list(executor.map(pdf_worker.html_to_pdf, ['<p>-</p>'] * procesos))
+                t0 = time.perf_counter()
+                generados = sum(
+                    1 for _, pdf in iter_receipts(pagos, executor, window=procesos * 2, use_cache=False) if pdf
+                )
+                elapsed = time.perf_counter() - t0
+            base = base or elapsed
+            self.stdout.write(
+                f'{procesos:>9} {elapsed:>11.2f} {generados / elapsed:>10.1f} {base / elapsed:>11.2f}x'
+            )
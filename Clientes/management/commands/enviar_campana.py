@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from Clientes.services.bulk_mailer import BulkMailer, campaign_messages, campaign_recipients
+
+
+class Command(BaseCommand):
+    help = ('Envío masivo a socios sobre una sola conexión SMTP: recordatorio de vencimiento, '
+            'reenvío de QR o copia del contrato. Reporta correos/segundo.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('campana', choices=['vencimiento', 'qr', 'contrato'], help='Campaña a enviar')
+        parser.add_argument('--dias', type=int, default=7, help='vencimiento: días hasta el vencimiento (por defecto 7)')
+        parser.add_argument('--rango', action='store_true',
+                            help='vencimiento: incluir todo lo que vence dentro de --dias, no solo ese día')
+        parser.add_argument('--lote', type=int, default=50, help='Correos por lote (reporte de avance)')
+        parser.add_argument('--por-segundo', type=float, default=None,
+                            help='Límite de correos por segundo (cuota del proveedor SMTP)')
+        parser.add_argument('--simular', action='store_true', help='Solo contar destinatarios, sin enviar')
+
+    def handle(self, *args, **opts):
+        campana = opts['campana']
+        total = campaign_recipients(campana, opts['dias'], opts['rango'])
+        self.stdout.write(f'Campaña "{campana}": {total} destinatario(s).')
+        if opts['simular'] or total == 0:
+            return
+
+        def avance(stats):
+            procesados = stats['sent'] + stats['failed']
+            self.stdout.write(
+                f"  {procesados}/{total} ({stats['per_second']:.1f} correos/s, {stats['failed']} fallidos)",
+                ending='\r'
+            )
+
+        with BulkMailer(batch_size=opts['lote'], rate=opts['por_segundo'], on_batch=avance) as mailer:
+            stats = mailer.send(campaign_messages(campana, opts['dias'], opts['rango']))
+
+        self.stdout.write('')
+        estilo = self.style.SUCCESS if not stats['failed'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"Enviados: {stats['sent']}, fallidos: {stats['failed']}, lotes: {stats['batches']}, "
+            f"tiempo: {stats['elapsed']:.1f}s ({stats['per_second']:.1f} correos/s)"
+        ))
@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from Clientes import pdf_worker
+from Clientes.services.receipt_bundle import iter_receipts, payments_between, stream_zip
+
+
+class Command(BaseCommand):
+    help = ('Genera un ZIP con los recibos de pago de un rango de fechas. Los recibos se '
+            'convierten en paralelo y se escriben en el ZIP a medida que terminan.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial AAAA-MM-DD (por defecto, inicio del mes)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final AAAA-MM-DD, inclusive (por defecto, hoy)')
+        parser.add_argument('--salida', help='Archivo ZIP de salida (por defecto Recibos_<desde>_<hasta>.zip)')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos para generar PDFs (por defecto PDF_RENDER_WORKERS)')
+
+    def handle(self, *args, **opts):
+        today = timezone.localdate()
+        desde = opts['desde'] or today.replace(day=1)
+        hasta = opts['hasta'] or today
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        pagos = payments_between(desde, hasta)
+        total = pagos.count()
+        salida = opts['salida'] or f'Recibos_{desde:%Y%m%d}_{hasta:%Y%m%d}.zip'
+        self.stdout.write(f'{total} pago(s) entre {desde} y {hasta} -> {salida}')
+        if total == 0:
+            return
+
+        def avance(procesados, fallidos):
+            self.stdout.write(f'  {procesados}/{total} recibos ({fallidos} fallidos)', ending='\r')
+
+        executor = None
+        if opts['procesos']:
+            executor = ProcessPoolExecutor(max_workers=opts['procesos'], initializer=pdf_worker.init_worker)
+        try:
+            window = opts['procesos'] * 2 if opts['procesos'] else None
+            with open(salida, 'wb') as f:
+                for chunk in stream_zip(iter_receipts(pagos, executor, window), on_progress=avance):
+                    f.write(chunk)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'ZIP generado: {salida}'))
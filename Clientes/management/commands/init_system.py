@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from Clientes.models import CustomUser
+from Clientes.rut import normalize
 
 class Command(BaseCommand):
     help = 'Crea los usuarios base para iniciar el sistema (Admin Web y Moderador)'
@@ -9,7 +10,7 @@ class Command(BaseCommand):
 
         # 1. Crear ADMIN WEB (Para usar el Dashboard /admin-panel/)
         # IMPORTANTE: is_superuser=False para que el login web lo deje pasar
-        if not CustomUser.objects.filter(rut='11.111.111-1').exists():
+        if not CustomUser.objects.filter(rut_normalized=normalize('11.111.111-1')).exists():
             admin_user = CustomUser.objects.create_user(
                 username='administrador',  # Usamos el RUT como username
                 email='admin@clubhouse.com',
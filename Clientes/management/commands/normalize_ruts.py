@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Clientes.models import CustomUser
+from Clientes.rut import is_valid, normalize
+
+
+class Command(BaseCommand):
+    help = ('Completa CustomUser.rut_normalized para los usuarios existentes, por lotes. '
+            'Solo procesa filas pendientes: se puede ejecutar en cada deploy.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Usuarios por lote')
+        parser.add_argument('--todos', action='store_true', help='Recalcular también las filas ya normalizadas')
+
+    def handle(self, *args, **opts):
+        users = CustomUser.objects.filter(rut__isnull=False).exclude(rut='').only('id', 'rut', 'rut_normalized')
+        if not opts['todos']:
+            users = users.filter(rut_normalized__isnull=True)
+
+        # Claves ya tomadas por otras filas: dos RUT escritos distinto que son el mismo
+        # ('11.111.111-1' y '11111111-1') no pueden compartir el índice único.
+        taken = dict(
+            CustomUser.objects.filter(rut_normalized__isnull=False).values_list('rut_normalized', 'id')
+        )
+
+        total = actualizados = 0
+        duplicados, invalidos = [], []
+        last_id = 0
+        while True:
+            batch = list(users.filter(id__gt=last_id).order_by('id')[:opts['lote']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            total += len(batch)
+
+            changed = []
+            for user in batch:
+                key = normalize(user.rut)
+                if key == user.rut_normalized:
+                    continue
+                owner = taken.get(key)
+                if owner is not None and owner != user.id:
+                    duplicados.append((user.id, user.rut, owner))
+                    continue
+                if not is_valid(user.rut):
+                    invalidos.append((user.id, user.rut))
+                taken.pop(user.rut_normalized, None)
+                taken[key] = user.id
+                user.rut_normalized = key
+                changed.append(user)
+
+            # bulk_update no pasa por save(): no regenera QR ni términos de búsqueda
+            with transaction.atomic():
+                CustomUser.objects.bulk_update(changed, ['rut_normalized'])
+            actualizados += len(changed)
+            self.stdout.write(f'  {total} revisados, {actualizados} actualizados...')
+
+        for user_id, rut, owner in duplicados:
+            self.stdout.write(self.style.ERROR(
+                f'RUT duplicado: usuario #{user_id} ({rut}) es el mismo RUT que el usuario #{owner}; quedó sin normalizar '
+                f'(entra solo con el RUT escrito tal cual, corregir uno de los dos).'
+            ))
+        for user_id, rut in invalidos:
+            self.stdout.write(self.style.WARNING(f'RUT con dígito verificador incorrecto: usuario #{user_id} ({rut}).'))
+
+        self.stdout.write(self.style.SUCCESS(f'¡Listo! {actualizados} RUT normalizados.'))
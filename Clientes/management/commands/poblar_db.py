@@ -4,6 +4,8 @@ from django.utils import timezone
 from faker import Faker
 from datetime import timedelta
 from Clientes.models import CustomUser, Plan, Membership, AccessLog, Payment
+from Clientes.services.attendance import rebuild_rollups
+from Clientes.rut import check_digit, normalize
 
 # Configuración de Faker para español de Chile
 fake = Faker(['es_CL'])
@@ -163,6 +165,10 @@ class Command(BaseCommand):
                     except Exception as e:
                         self.stdout.write(self.style.ERROR(f"Error: {e}"))
 
+        # Los accesos históricos se crean directo en AccessLog: recalcular el resumen diario
+        self.stdout.write('Reconstruyendo resumen diario de asistencia...')
+        rebuild_rollups(timezone.datetime(current_year, 1, 1).date(), timezone.localdate())
+
         self.stdout.write(self.style.SUCCESS(f'¡Listo! Total usuarios creados: {total_creados}'))
 
     def crear_planes_base(self):
@@ -222,17 +228,11 @@ class Command(BaseCommand):
             numero = random.randint(5000000, 28000000) # Rango amplio de RUTs
             dv = self.calcular_dv(numero)
             rut_completo = f"{numero}-{dv}"
-            if not CustomUser.objects.filter(rut=rut_completo).exists():
+            if not CustomUser.objects.filter(rut_normalized=normalize(rut_completo)).exists():
                 return rut_completo
 
     def calcular_dv(self, rut):
-        aux = 1
-        suma = 0
-        for i in reversed(str(rut)):
-            aux = (aux + 1) % 8 or 2
-            suma += int(i) * aux
-        resto = suma % 11
-        return str(11 - resto) if resto > 1 else 'K' if resto == 1 else '0'
+        return check_digit(rut)
 
     def generar_asistencias(self, user, membership):
         # Generar asistencias pasadas si la membresía estuvo activa
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from Clientes.services.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = ('Entrega los correos encolados en OutboxMessage (QR, contrato) con reintentos. '
+            'Para probar en local: EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=20, help='Mensajes por lote (una conexión SMTP por lote)')
+        parser.add_argument('--continuo', action='store_true', help='Seguir corriendo y revisar la cola cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera cuando la cola está vacía')
+
+    def handle(self, *args, **opts):
+        total = {'sent': 0, 'retry': 0, 'failed': 0}
+        try:
+            while True:
+                summary = process_batch(opts['lote'])
+                for key, value in summary.items():
+                    total[key] += value
+                if any(summary.values()):
+                    self.stdout.write(
+                        f"Lote: {summary['sent']} enviados, {summary['retry']} para reintento, "
+                        f"{summary['failed']} fallidos"
+                    )
+                    continue  # Puede haber más mensajes listos
+                if not opts['continuo']:
+                    break
+                time.sleep(opts['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Detenido.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {total['sent']} enviados, {total['retry']} para reintento, {total['failed']} fallidos"
+        ))
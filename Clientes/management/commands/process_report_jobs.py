@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from Clientes.services.report_jobs import claim_job, purge_old, run_job
+
+
+class Command(BaseCommand):
+    help = ('Genera los reportes pedidos desde el panel (Excel/CSV de pagos, ZIP de recibos) '
+            'y los deja en MEDIA_ROOT/reports para descargarlos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='Seguir corriendo y revisar la cola cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera cuando no hay reportes pendientes')
+        parser.add_argument('--retener-dias', type=int, default=7,
+                            help='Borrar reportes (y archivos) con más de estos días (0 = no borrar)')
+        parser.add_argument('--purgar-cada', type=float, default=3600.0,
+                            help='Con --continuo, segundos entre limpiezas de reportes antiguos')
+
+    def purge(self, days):
+        borrados = purge_old(days)
+        if borrados:
+            self.stdout.write(f'{borrados} reporte(s) antiguo(s) eliminados.')
+
+    def handle(self, *args, **opts):
+        total = {'done': 0, 'failed': 0}
+        next_purge = 0.0  # Limpia al arrancar y luego cada --purgar-cada segundos
+        try:
+            while True:
+                if opts['retener_dias'] and time.monotonic() >= next_purge:
+                    self.purge(opts['retener_dias'])
+                    next_purge = time.monotonic() + opts['purgar_cada']
+
+                job = claim_job()
+                if job is not None:
+                    self.stdout.write(f'Generando {job} {job.params}...')
+                    resultado = run_job(job)
+                    total[resultado] += 1
+                    self.stdout.write(f'  {resultado}')
+                    continue  # Puede haber más reportes pendientes
+                if not opts['continuo']:
+                    break
+                time.sleep(opts['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Detenido.')
+
+        self.stdout.write(self.style.SUCCESS(f"Total: {total['done']} generados, {total['failed']} fallidos"))
@@ -0,0 +1,43 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from Clientes.models import AccessLog, DailyAttendanceRollup
+from Clientes.services.attendance import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de asistencia (DailyAttendanceRollup) desde AccessLog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=str, default=None, help='Fecha inicial YYYY-MM-DD (por defecto: primer acceso)')
+        parser.add_argument('--hasta', type=str, default=None, help='Fecha final YYYY-MM-DD (por defecto: hoy)')
+        parser.add_argument('--si-vacio', action='store_true', help='Solo reconstruir si el resumen está vacío (deploy)')
+
+    def handle(self, *args, **opts):
+        if opts['si_vacio'] and DailyAttendanceRollup.objects.exists():
+            self.stdout.write('El resumen diario ya tiene datos, no se reconstruye.')
+            return
+
+        hasta = self.parse_fecha(opts['hasta']) if opts['hasta'] else timezone.localdate()
+        if opts['desde']:
+            desde = self.parse_fecha(opts['desde'])
+        else:
+            primer_acceso = AccessLog.objects.aggregate(m=Min('timestamp'))['m']
+            if primer_acceso is None:
+                self.stdout.write(self.style.WARNING('No hay accesos registrados.'))
+                return
+            desde = timezone.localtime(primer_acceso).date()
+
+        if desde > hasta:
+            raise CommandError('--desde debe ser anterior o igual a --hasta')
+
+        self.stdout.write(f'Reconstruyendo resumen del {desde} al {hasta}...')
+        filas = rebuild_rollups(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'¡Listo! {filas} filas de resumen creadas.'))
+
+    def parse_fecha(self, valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {valor} (usar YYYY-MM-DD)')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Clientes.models import CustomUser, MemberSearchToken
+
+
+class Command(BaseCommand):
+    help = 'Regenera los términos de búsqueda (MemberSearchToken) de los socios existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Socios por lote')
+        parser.add_argument('--si-vacio', action='store_true', help='Solo regenerar si el índice está vacío (deploy)')
+
+    def handle(self, *args, **opts):
+        if opts['si_vacio'] and MemberSearchToken.objects.exists():
+            self.stdout.write('El índice de búsqueda ya tiene datos, no se regenera.')
+            return
+
+        users = CustomUser.objects.filter(role='socio', is_superuser=False).only(
+            'id', 'is_superuser', 'role', 'first_name', 'last_name', 'email', 'rut'
+        ).order_by('id')
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(users.filter(id__gt=last_id)[:opts['lote']])
+            if not batch:
+                break
+            with transaction.atomic():
+                MemberSearchToken.rebuild(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f'  {total} socios indexados...')
+
+        self.stdout.write(self.style.SUCCESS(f'¡Listo! {total} socios indexados.'))
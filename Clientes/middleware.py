@@ -0,0 +1,157 @@
+"""
+Middlewares de Clientes.
+
+CachedAuthenticationMiddleware: AuthenticationMiddleware de Django, pero
+request.user sale de la caché por sesión (ver user_cache).
+
+Perfilador de SQL por request (opcional, SQL_PROFILER_ENABLED).
+
+Mide cada request con connection.execute_wrapper (funciona con DEBUG=False):
+cantidad de consultas, tiempo en SQL, consultas duplicadas (mismo SQL y mismos
+parámetros) y similares (mismo SQL con otros parámetros, típico de un N+1), y
+el tiempo total de la vista. Las mediciones quedan en un buffer circular en
+memoria (las últimas SQL_PROFILER_BUFFER_SIZE) que resume la vista perfil_sql
+con p50/p95/p99 por nombre de URL.
+
+El buffer es por proceso: con varios workers cada uno muestra lo que atendió.
+"""
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import ExitStack
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+from . import user_cache
+
+def _cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = user_cache.load_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _cached_user(request))
+
+
+RequestProfile = namedtuple('RequestProfile', [
+    'url_name', 'method', 'status', 'wall_ms', 'queries', 'sql_ms',
+    'duplicates', 'similar', 'top_sql', 'top_count', 'finished_at',
+])
+
+
+class ProfileBuffer:
+    """Buffer circular thread-safe con las últimas mediciones."""
+
+    def __init__(self, maxlen):
+        self._items = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def append(self, profile):
+        with self._lock:
+            self._items.append(profile)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+buffer = ProfileBuffer(getattr(settings, 'SQL_PROFILER_BUFFER_SIZE', 2000))
+
+
+class _QueryRecorder:
+    """execute_wrapper que cronometra cada consulta y detecta repeticiones."""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.exact = Counter()
+        self.templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.count += 1
+            self.templates[sql] += 1
+            self.exact[(sql, repr(params))] += 1
+
+
+class SQLProfilerMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        top_sql, top_count = recorder.templates.most_common(1)[0] if recorder.templates else ('', 0)
+        buffer.append(RequestProfile(
+            url_name=match.view_name if match else '(sin ruta)',
+            method=request.method,
+            status=response.status_code,
+            wall_ms=wall * 1000,
+            queries=recorder.count,
+            sql_ms=recorder.elapsed * 1000,
+            duplicates=sum(n - 1 for n in recorder.exact.values()),
+            similar=sum(n - 1 for n in recorder.templates.values()),
+            top_sql=top_sql[:300],
+            top_count=top_count,
+            finished_at=time.time(),
+        ))
+        return response
+
+
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(profiles):
+    """Resumen por nombre de URL, ordenado por p95 de tiempo total (descendente)."""
+    groups = {}
+    for profile in profiles:
+        groups.setdefault(profile.url_name, []).append(profile)
+
+    rows = []
+    for url_name, items in groups.items():
+        wall = sorted(p.wall_ms for p in items)
+        queries = sorted(p.queries for p in items)
+        sql = sorted(p.sql_ms for p in items)
+        worst = max(items, key=lambda p: p.similar)
+        rows.append({
+            'url_name': url_name,
+            'requests': len(items),
+            'wall': [percentile(wall, q) for q in (50, 95, 99)],
+            'queries': [percentile(queries, q) for q in (50, 95, 99)],
+            'sql': [percentile(sql, q) for q in (50, 95, 99)],
+            'duplicates': max(p.duplicates for p in items),
+            'similar': worst.similar,
+            'top_sql': worst.top_sql,
+            'top_count': worst.top_count,
+        })
+    rows.sort(key=lambda r: r['wall'][1], reverse=True)
+    return rows
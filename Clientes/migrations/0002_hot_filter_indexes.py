@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['user', 'status', 'timestamp'], name='accesslog_user_status_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['status', 'timestamp'], name='accesslog_status_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['timestamp'], name='accesslog_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['user', 'is_active', 'end_date'], name='membership_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['is_active', 'end_date'], name='membership_active_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['plan', 'payment_date', 'status'], name='membership_plan_paydate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['payment_date'], name='membership_paydate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['date'], name='payment_date_idx'),
+        ),
+    ]
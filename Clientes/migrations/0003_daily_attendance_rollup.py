@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Clientes', '0002_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('scope', models.CharField(choices=[('total', 'Total del día'), ('plan', 'Por plan'), ('user', 'Por socio')], max_length=5, verbose_name='Alcance')),
+                ('allowed', models.PositiveIntegerField(default=0, verbose_name='Permitidos')),
+                ('denied', models.PositiveIntegerField(default=0, verbose_name='Denegados')),
+                ('plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='Clientes.plan', verbose_name='Plan')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Asistencia',
+                'verbose_name_plural': 'Resúmenes Diarios de Asistencia',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['scope', 'date'], name='rollup_scope_date_idx'), models.Index(fields=['user', 'date'], name='rollup_user_date_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('scope', 'total')), fields=('date',), name='rollup_unique_total'), models.UniqueConstraint(condition=models.Q(('scope', 'plan')), fields=('date', 'plan'), name='rollup_unique_plan'), models.UniqueConstraint(condition=models.Q(('scope', 'user')), fields=('date', 'user'), name='rollup_unique_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Clientes', '0004_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('excel', 'Excel de pagos'), ('csv', 'CSV de pagos'), ('recibos', 'ZIP de recibos')], max_length=10, verbose_name='Tipo')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'Generando'), ('done', 'Listo'), ('failed', 'Fallido')], default='pending', max_length=10, verbose_name='Estado')),
+                ('fingerprint', models.CharField(blank=True, default='', max_length=64, verbose_name='Huella')),
+                ('file_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Archivo')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='Avance')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminado')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Reporte en Segundo Plano',
+                'verbose_name_plural': 'Reportes en Segundo Plano',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'), models.Index(fields=['fingerprint'], name='reportjob_fingerprint_idx')],
+            },
+        ),
+    ]
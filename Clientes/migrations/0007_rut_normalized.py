@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Clientes', '0006_member_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='rut_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True, unique=True, verbose_name='RUT normalizado'),
+        ),
+    ]
@@ -1,17 +1,44 @@
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.utils import timezone
-from datetime import timedelta
+from collections import Counter
+from datetime import datetime, time, timedelta
 import hashlib
 
 # --- NUEVAS IMPORTACIONES NECESARIAS ---
 import os
-from django.db.models.signals import post_delete
+from django.db.models import Prefetch
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, pre_delete
 from django.dispatch import receiver
+from . import admission_cache, qr_token, rut as rut_utils, search_index, user_cache
 # ---------------------------------------
 
+# Atributo donde with_active_membership() deja las membresías activas precargadas
+ACTIVE_MEMBERSHIPS_ATTR = 'prefetched_active_memberships'
+
+
 class CustomUserManager(UserManager):
     """Manager personalizado que diferencia entre superusuarios y usuarios normales"""
+
+    def with_active_membership(self):
+        """
+        Precarga la membresía activa (con su plan) en una sola consulta extra.
+        get_active_membership() y has_active_membership() leen ese valor en lugar
+        de consultar por cada usuario.
+        Uso: CustomUser.objects.with_active_membership().filter(role='socio')
+        """
+        return self.get_queryset().prefetch_related(
+            Prefetch(
+                'memberships',
+                queryset=Membership.objects.filter(
+                    is_active=True,
+                    end_date__gt=timezone.now().date()
+                ).select_related('plan'),
+                to_attr=ACTIVE_MEMBERSHIPS_ATTR
+            )
+        )
     
     def create_superuser(self, username, email=None, password=None, **extra_fields):
         """
@@ -37,6 +64,23 @@ class CustomUserManager(UserManager):
         
         return self.create_user(username, email, password, **extra_fields)
 
+    def get_by_rut(self, value):
+        """
+        Usuario por RUT escrito de cualquier forma, en una consulta: el dueño de
+        la clave normalizada o la fila sin clave con ese RUT exacto (un RUT que
+        chocaba con otro ya normalizado, ver normalize_ruts). Si aparecen los dos
+        gana el que coincide tal como se escribió. Lanza DoesNotExist.
+        """
+        raw = (value or '').strip()
+        key = rut_utils.normalize(raw)
+        candidates = list(self.filter(
+            models.Q(rut_normalized=key) | models.Q(rut_normalized__isnull=True, rut=raw)
+        )[:2]) if key else []
+        if not candidates:
+            raise self.model.DoesNotExist('No existe un usuario con ese RUT')
+        candidates.sort(key=lambda user: user.rut != raw)
+        return candidates[0]
+
 
 class CustomUser(AbstractUser):
     """Modelo de usuario personalizado que extiende AbstractUser"""
@@ -51,6 +95,10 @@ class CustomUser(AbstractUser):
     
     # Campos adicionales - TODOS OPCIONALES
     rut = models.CharField(max_length=12, unique=True, verbose_name="RUT", null=True, blank=True)
+    # Clave de búsqueda: dígitos + DV sin puntos ni guion (ver rut.normalize). Se calcula en save().
+    rut_normalized = models.CharField(
+        max_length=12, unique=True, null=True, blank=True, editable=False, verbose_name="RUT normalizado"
+    )
     phone = models.CharField(max_length=15, verbose_name="Teléfono", null=True, blank=True)
     birthdate = models.DateField(verbose_name="Fecha de Nacimiento", null=True, blank=True)
     role = models.CharField(
@@ -92,6 +140,12 @@ class CustomUser(AbstractUser):
         verbose_name = "Usuario"
         verbose_name_plural = "Usuarios"
         ordering = ['-created_at']
+        indexes = [
+            # Login por correo (RUTorEmailBackend); rut_normalized y username ya son únicos
+            models.Index(fields=['email'], name='customuser_email_idx'),
+            # email__iexact en PostgreSQL es UPPER(email) = UPPER(%s)
+            models.Index(Upper('email'), name='customuser_email_upper_idx'),
+        ]
     
     def __str__(self):
         if self.is_superuser:
@@ -105,6 +159,11 @@ class CustomUser(AbstractUser):
         Override del método save.
         IMPORTANTE: NO genera QR ni asigna rol a superusuarios
         """
+        self.rut_normalized = rut_utils.normalize(self.rut)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'rut' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'rut_normalized'}
+
         # Si es superuser, guardar y salir
         if self.is_superuser:
             super().save(*args, **kwargs)
@@ -117,8 +176,41 @@ class CustomUser(AbstractUser):
     
         # SIEMPRE hacer el save principal
         super().save(*args, **kwargs)
+
+        # Cualquier cambio (nombre, RUT, QR, estado) invalida la caché del escáner
+        # y el request.user en caché de sus sesiones
+        admission_cache.invalidate(self.pk)
+        user_cache.invalidate(self.pk)
+
+        # Términos de búsqueda: solo si cambió algún campo del que salen
+        if update_fields is None or search_index.SOURCE_FIELDS.intersection(update_fields):
+            MemberSearchToken.rebuild([self])
     
 
+    def clean(self):
+        """
+        Un RUT escrito distinto ('11.111.111-1' y '11111111-1') es el mismo RUT:
+        el duplicado se rechaza aquí, en los formularios, y no como un
+        IntegrityError del índice único de rut_normalized al guardar.
+        """
+        super().clean()
+        key = rut_utils.normalize(self.rut)
+        if key and CustomUser.objects.filter(rut_normalized=key).exclude(pk=self.pk).exists():
+            raise ValidationError({'rut': 'Ya existe un usuario con este RUT.'})
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        """
+        Al leer un campo diferido se cargan todos los diferidos de una vez (una
+        consulta, no una por campo). Ver user_cache: request.user llega con solo
+        algunos campos.
+        """
+        if fields is not None:
+            fields = set(fields)
+            deferred_fields = self.get_deferred_fields()
+            if fields.intersection(deferred_fields):
+                fields = fields.union(deferred_fields)
+        super().refresh_from_db(using, fields, **kwargs)
+
     def generate_qr_code(self):
         """
         Método de compatibilidad: asegura que exista el qr_unique_id.
@@ -128,21 +220,18 @@ class CustomUser(AbstractUser):
             self.save() # El save() generará el ID
 
     def get_qr_data(self):
-        """Retorna el string exacto que se debe codificar en el QR"""
-        if not self.qr_unique_id:
+        """Retorna el string exacto que se debe codificar en el QR (token firmado v1)"""
+        if not self.qr_unique_id or not self.id:
             return None
-            
-        data_dict = {
-            'user_id': self.id,
-            'qr_id': self.qr_unique_id,
-            'rut': self.rut
-        }
-        return str(data_dict) # Retorna la representación en texto del diccionario
+        return qr_token.make_token(self.id, self.qr_unique_id)
     
     def get_active_membership(self):
-        """Retorna la membresía activa del usuario o None."""
+        """Retorna la membresía activa del usuario o None (usa la precarga si existe)."""
         if self.is_superuser:
             return None
+        prefetched = getattr(self, ACTIVE_MEMBERSHIPS_ATTR, None)
+        if prefetched is not None:
+            return prefetched[0] if prefetched else None
         return self.memberships.filter(
             is_active=True,
             end_date__gt=timezone.now().date()
@@ -152,12 +241,45 @@ class CustomUser(AbstractUser):
         """Verifica si el usuario tiene una membresía activa."""
         if self.is_superuser:
             return False
+        prefetched = getattr(self, ACTIVE_MEMBERSHIPS_ATTR, None)
+        if prefetched is not None:
+            return bool(prefetched)
         return self.memberships.filter(
             is_active=True,
             end_date__gt=timezone.now().date()
         ).exists()
 
 
+class MemberSearchToken(models.Model):
+    """
+    Término de búsqueda normalizado de un socio (ver search_index).
+    Se regenera desde CustomUser.save(); rebuild_search_index lo llena para datos existentes.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=search_index.TOKEN_MAX_LENGTH, db_index=True)
+
+    class Meta:
+        verbose_name = "Término de Búsqueda"
+        verbose_name_plural = "Términos de Búsqueda"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'token'], name='searchtoken_user_token_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.token}"
+
+    @classmethod
+    def rebuild(cls, users):
+        """Reemplaza los términos de los usuarios dados (2 consultas por lote)."""
+        users = [u for u in users if u.pk]
+        cls.objects.filter(user_id__in=[u.pk for u in users]).delete()
+        cls.objects.bulk_create([
+            cls(user_id=u.pk, token=token)
+            for u in users if u.role == 'socio' and not u.is_superuser
+            for token in search_index.user_tokens(u.first_name, u.last_name, u.email, u.rut)
+        ])
+
+
 class Plan(models.Model):
     """Modelo para los planes de membresía del gimnasio."""
     
@@ -221,6 +343,13 @@ class Membership(models.Model):
         ('expired', 'Vencida'),
         ('cancelled', 'Cancelada'),
     )
+
+    EMAIL_STATUS_CHOICES = (
+        ('none', 'Sin envío'),
+        ('pending', 'En cola'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    )
     
     user = models.ForeignKey(
         CustomUser,
@@ -256,6 +385,14 @@ class Membership(models.Model):
         verbose_name="Estado"
     )
     is_active = models.BooleanField(default=False, verbose_name="Activa")
+
+    # Correo de bienvenida/QR/contrato (lo actualiza el worker del outbox)
+    email_status = models.CharField(
+        max_length=10,
+        choices=EMAIL_STATUS_CHOICES,
+        default='none',
+        verbose_name="Estado del Correo"
+    )
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -266,6 +403,16 @@ class Membership(models.Model):
         verbose_name = "Membresía"
         verbose_name_plural = "Membresías"
         ordering = ['-created_at']
+        indexes = [
+            # get_active_membership / has_active_membership
+            models.Index(fields=['user', 'is_active', 'end_date'], name='membership_user_active_idx'),
+            # Planes por vencer (dashboards admin y moderador)
+            models.Index(fields=['is_active', 'end_date'], name='membership_active_end_idx'),
+            # Ingresos por plan (get_plan_stats, admin_plan_details)
+            models.Index(fields=['plan', 'payment_date', 'status'], name='membership_plan_paydate_idx'),
+            # Ingresos del mes / mes anterior (get_kpis)
+            models.Index(fields=['payment_date'], name='membership_paydate_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.plan.name} ({self.status})"
@@ -286,6 +433,7 @@ class Membership(models.Model):
             self.is_active = True
         
         super().save(*args, **kwargs)
+        admission_cache.invalidate(self.user_id)
         
         # Actualizar estado del usuario
         self.user.is_active_member = self.is_active
@@ -306,6 +454,25 @@ class Membership(models.Model):
         return self.days_remaining()
 
 
+class AccessLogQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Borra los accesos y recalcula el resumen diario de los días afectados
+        (una reconstrucción por día, no un UPDATE por fila). Sin señales de
+        borrado en AccessLog, la cascada desde CustomUser sigue siendo un
+        DELETE directo; esos días los recalculan los receptores del final.
+        """
+        with transaction.atomic():
+            affected = list(self.order_by().values_list('user_id', 'timestamp'))
+            result = super().delete()
+            for user_id in {user_id for user_id, _ in affected}:
+                admission_cache.invalidate(user_id)
+            DailyAttendanceRollup.rebuild_days(
+                {timezone.localtime(timestamp).date() for _, timestamp in affected}
+            )
+        return result
+
+
 class AccessLog(models.Model):
     """Modelo para registrar los accesos al gimnasio mediante QR."""
     
@@ -335,15 +502,135 @@ class AccessLog(models.Model):
         null=True,
         verbose_name="Razón de Denegación"
     )
+
+    objects = AccessLogQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Registro de Acceso"
         verbose_name_plural = "Registros de Acceso"
         ordering = ['-timestamp']
+        indexes = [
+            # Escáner (ya entró hoy / conteo mensual) y panel del socio
+            models.Index(fields=['user', 'status', 'timestamp'], name='accesslog_user_status_ts_idx'),
+            # Accesos hoy/ayer y asistencia global (get_kpis, index_moderador)
+            models.Index(fields=['status', 'timestamp'], name='accesslog_status_ts_idx'),
+            # Logs del día sin filtro de estado (tablas de últimos accesos)
+            models.Index(fields=['timestamp'], name='accesslog_ts_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.status} - {self.timestamp}"
-    
+
+    def save(self, *args, **kwargs):
+        """Un acceso permitido cambia el 'ya entró hoy' y el conteo mensual del socio."""
+        super().save(*args, **kwargs)
+        if self.status == 'allowed':
+            admission_cache.invalidate(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        """Borrar un acceso recalcula su día en el resumen (admin, shell)."""
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            admission_cache.invalidate(self.user_id)
+            DailyAttendanceRollup.rebuild_days({timezone.localtime(self.timestamp).date()})
+        return result
+    
+class DailyAttendanceRollup(models.Model):
+    """
+    Resumen diario de escaneos (permitidos/denegados) para los dashboards.
+    Cada fila es un día local y un alcance: total del día, por plan o por socio.
+    Lo mantiene services/attendance.record_access() en cada escaneo, los
+    borrados de AccessLog recalculan los días afectados con rebuild_days() y
+    se puede reconstruir entero con el comando rebuild_attendance_rollup.
+    """
+
+    SCOPE_CHOICES = (
+        ('total', 'Total del día'),
+        ('plan', 'Por plan'),
+        ('user', 'Por socio'),
+    )
+
+    date = models.DateField(verbose_name="Fecha")
+    scope = models.CharField(max_length=5, choices=SCOPE_CHOICES, verbose_name="Alcance")
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attendance_rollups',
+        verbose_name="Usuario"
+    )
+    plan = models.ForeignKey(
+        Plan,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attendance_rollups',
+        verbose_name="Plan"
+    )
+    allowed = models.PositiveIntegerField(default=0, verbose_name="Permitidos")
+    denied = models.PositiveIntegerField(default=0, verbose_name="Denegados")
+
+    class Meta:
+        verbose_name = "Resumen Diario de Asistencia"
+        verbose_name_plural = "Resúmenes Diarios de Asistencia"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date'], condition=models.Q(scope='total'), name='rollup_unique_total'),
+            models.UniqueConstraint(fields=['date', 'plan'], condition=models.Q(scope='plan'), name='rollup_unique_plan'),
+            models.UniqueConstraint(fields=['date', 'user'], condition=models.Q(scope='user'), name='rollup_unique_user'),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'date'], name='rollup_scope_date_idx'),
+            models.Index(fields=['user', 'date'], name='rollup_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} [{self.scope}] {self.allowed} permitidos / {self.denied} denegados"
+
+    @classmethod
+    def rebuild_day(cls, day):
+        """
+        Reemplaza las filas de un día local desde AccessLog: un GROUP BY por
+        rango de timestamp (sin funciones de zona horaria en la BD) y un
+        bulk_create. Retorna la cantidad de filas creadas.
+        """
+        with transaction.atomic():
+            cls.objects.filter(date=day).delete()
+            day_start = timezone.make_aware(datetime.combine(day, time.min))
+            grouped = AccessLog.objects.filter(
+                timestamp__gte=day_start, timestamp__lt=day_start + timedelta(days=1)
+            ).order_by().values('user_id', 'membership__plan_id', 'status').annotate(n=models.Count('id'))
+
+            totals, per_plan, per_user = Counter(), Counter(), Counter()
+            for g in grouped:
+                field = 'allowed' if g['status'] == 'allowed' else 'denied'
+                totals[field] += g['n']
+                per_user[(g['user_id'], field)] += g['n']
+                if g['membership__plan_id']:
+                    per_plan[(g['membership__plan_id'], field)] += g['n']
+
+            rows = []
+            if totals:
+                rows.append(cls(date=day, scope='total', allowed=totals['allowed'], denied=totals['denied']))
+            for plan_id in {p for p, _ in per_plan}:
+                rows.append(cls(
+                    date=day, scope='plan', plan_id=plan_id,
+                    allowed=per_plan[(plan_id, 'allowed')], denied=per_plan[(plan_id, 'denied')]
+                ))
+            for user_id in {u for u, _ in per_user}:
+                rows.append(cls(
+                    date=day, scope='user', user_id=user_id,
+                    allowed=per_user[(user_id, 'allowed')], denied=per_user[(user_id, 'denied')]
+                ))
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @classmethod
+    def rebuild_days(cls, days):
+        """Recalcula cada día de `days` una sola vez, sin importar cuántos accesos se borraron."""
+        return sum(cls.rebuild_day(day) for day in sorted(set(days)))
+
 class Payment(models.Model):
     """
     Modelo exclusivo para registro financiero histórico (Libro Mayor).
@@ -390,6 +677,162 @@ class Payment(models.Model):
         verbose_name = "Historial de Pago"
         verbose_name_plural = "Historial de Pagos"
         ordering = ['-date']
+        indexes = [
+            # Ingresos anuales, ticket promedio y gráficos por fecha
+            models.Index(fields=['date'], name='payment_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pago #{self.id} - ${self.amount} ({self.date.strftime('%d/%m/%Y')})"
+
+
+class OutboxMessage(models.Model):
+    """
+    Cola persistente de correos/documentos (patrón outbox).
+    Las vistas solo insertan una fila; el comando process_outbox la entrega
+    fuera del request, con reintentos y backoff exponencial.
+    """
+
+    KIND_CHOICES = (
+        ('welcome_email', 'Correo de bienvenida (QR/Contrato)'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pendiente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    )
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name="Tipo")
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outbox_messages',
+        verbose_name="Usuario"
+    )
+    membership = models.ForeignKey(
+        Membership,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbox_messages',
+        verbose_name="Membresía"
+    )
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Datos")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Estado")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name="Máximo de Intentos")
+    # Próximo intento; mientras se envía hace de "lease" por si el worker muere
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Próximo Intento")
+    last_error = models.TextField(blank=True, default='', verbose_name="Último Error")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Enviado")
+
+    class Meta:
+        verbose_name = "Mensaje en Cola"
+        verbose_name_plural = "Cola de Mensajes"
+        ordering = ['-created_at']
+        indexes = [
+            # Selección de mensajes listos por el worker
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
+
+
+class ReportJob(models.Model):
+    """
+    Reporte pesado (Excel/CSV de pagos, ZIP de recibos) pedido desde el panel.
+    La vista solo inserta la fila; el comando process_report_jobs lo genera y
+    deja el archivo bajo MEDIA_ROOT/reports para descargarlo después.
+    """
+
+    KIND_CHOICES = (
+        ('excel', 'Excel de pagos'),
+        ('csv', 'CSV de pagos'),
+        ('recibos', 'ZIP de recibos'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pendiente'),
+        ('running', 'Generando'),
+        ('done', 'Listo'),
+        ('failed', 'Fallido'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Tipo")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    requested_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs',
+        verbose_name="Solicitado por"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Estado")
+    # Huella de los datos de origen (tipo + parámetros + estado de Payment): si
+    # coincide con un reporte ya generado se reutiliza su archivo
+    fingerprint = models.CharField(max_length=64, blank=True, default='', verbose_name="Huella")
+    file_name = models.CharField(max_length=255, blank=True, default='', verbose_name="Archivo")
+    progress = models.PositiveIntegerField(default=0, verbose_name="Avance")
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name="Total")
+    error = models.TextField(blank=True, default='', verbose_name="Error")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminado")
+
+    class Meta:
+        verbose_name = "Reporte en Segundo Plano"
+        verbose_name_plural = "Reportes en Segundo Plano"
+        ordering = ['-created_at']
+        indexes = [
+            # Selección de reportes pendientes por el worker
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'),
+            # Reutilización de reportes con los mismos datos
+            models.Index(fields=['fingerprint'], name='reportjob_fingerprint_idx'),
+        ]
 
     def __str__(self):
-        return f"Pago #{self.id} - ${self.amount} ({self.date.strftime('%d/%m/%Y')})"
\ No newline at end of file
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
+
+
+# ==================== INVALIDACIÓN DE CACHÉ AL BORRAR ====================
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Membership)
+def invalidate_admission_cache(sender, instance, **kwargs):
+    """
+    Los borrados (incluidos los en cascada) no pasan por save(). AccessLog no
+    tiene receptor: sus borrados pasan por AccessLog.delete() o por
+    AccessLogQuerySet.delete(), y así la cascada desde CustomUser es un DELETE
+    directo en vez de cargar y señalizar cada acceso.
+    """
+    user_id = instance.pk if sender is CustomUser else instance.user_id
+    admission_cache.invalidate(user_id)
+    if sender is CustomUser:
+        user_cache.invalidate(user_id)
+
+
+# ==================== RESUMEN DIARIO AL BORRAR SOCIOS ====================
+
+@receiver(pre_delete, sender=CustomUser)
+def collect_attendance_days(sender, instance, **kwargs):
+    """Anota los días con accesos del socio antes de que la cascada los borre."""
+    instance._attendance_days = {
+        timezone.localtime(timestamp).date()
+        for timestamp in instance.access_logs.order_by().values_list('timestamp', flat=True)
+    }
+
+
+@receiver(post_delete, sender=CustomUser)
+def rebuild_attendance_days(sender, instance, **kwargs):
+    """Recalcula esos días: los totales y planes ya no cuentan al socio borrado."""
+    DailyAttendanceRollup.rebuild_days(getattr(instance, '_attendance_days', ()))
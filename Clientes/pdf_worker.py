@@ -0,0 +1,27 @@
+"""
+Función que corre dentro de los procesos del pool de PDFs (services/pdf_render.py).
+
+IMPORTANTE: Este módulo NO importa Django ni modelos. Con el método 'spawn'
+(Windows/macOS) cada proceso hijo lo importa desde cero; el HTML ya llega
+renderizado desde el proceso web.
+"""
+from io import BytesIO
+
+
+def init_worker():
+    """Salida determinista: sin fecha de creación ni ID aleatorio en el PDF."""
+    from reportlab import rl_config
+    rl_config.invariant = 1
+
+
+def html_to_pdf(html):
+    """Convierte HTML a PDF con xhtml2pdf. Retorna los bytes o None si falla."""
+    from xhtml2pdf import pisa
+
+    init_worker()
+    result = BytesIO()
+    # UTF-8 explícito para soportar tildes y ñ
+    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result, encoding='UTF-8')
+    if pdf.err:
+        return None
+    return result.getvalue()
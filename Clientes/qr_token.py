@@ -0,0 +1,127 @@
+"""
+Token compacto y firmado que va dentro del código QR del socio.
+
+Formato v1: 'GQ1' + base32(user_id | huella del qr_unique_id | HMAC), 29
+caracteres en mayúsculas y dígitos. Al ser alfanumérico el QR usa el modo
+alfanumérico y queda en versión 2 (25x25 módulos) en lugar de la versión 6 que
+generaba str(dict); se lee más rápido con cámaras malas.
+
+La firma se verifica sin consultar la BD (solo SECRET_KEY). La huella de 4 bytes
+del qr_unique_id se compara después contra el usuario (o la caché de admisión),
+así regenerar el qr_unique_id sigue revocando los QR impresos.
+
+Se sigue aceptando el formato antiguo "{'user_id': ..., 'qr_id': ..., 'rut': ...}"
+mientras existan QR impresos con él.
+
+IMPORTANTE: Este módulo NO importa modelos (models.py lo usa en get_qr_data()).
+"""
+import ast
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import struct
+from collections import namedtuple
+from functools import lru_cache
+from django.conf import settings
+from .rut import normalize as normalize_rut
+
+TOKEN_PREFIX = 'GQ1'
+_SALT = 'Clientes.qr_token.v1'
+_FINGERPRINT_BYTES = 4
+_MAC_BYTES = 8
+_PAYLOAD_BYTES = 4 + _FINGERPRINT_BYTES
+_TOKEN_BYTES = _PAYLOAD_BYTES + _MAC_BYTES
+
+
+class InvalidQRToken(ValueError):
+    """El contenido del QR no es un token válido ni un QR antiguo reconocible."""
+
+
+def fingerprint(qr_unique_id):
+    """Huella corta del qr_unique_id que viaja dentro del token."""
+    return hashlib.sha256(qr_unique_id.encode()).digest()[:_FINGERPRINT_BYTES]
+
+
+@lru_cache(maxsize=4)
+def _derive_key(secret):
+    # Misma derivación que django.utils.crypto.salted_hmac, calculada una sola vez
+    return hashlib.sha256((_SALT + secret).encode()).digest()
+
+
+def _sign(payload):
+    key = _derive_key(settings.SECRET_KEY)
+    return hmac.new(key, TOKEN_PREFIX.encode() + payload, hashlib.sha256).digest()[:_MAC_BYTES]
+
+
+class QRClaims(namedtuple('QRClaims', ['user_id', 'qr_id', 'rut', 'signed'])):
+    """
+    Datos leídos de un QR. En tokens firmados `qr_id` es la huella y `rut` es None;
+    en el formato antiguo son el qr_unique_id y el RUT completos.
+    """
+    __slots__ = ()
+
+    def matches(self, qr_unique_id, rut):
+        """¿Corresponde el QR al usuario con este qr_unique_id y RUT?"""
+        if not qr_unique_id:
+            return False
+        if self.signed:
+            return hmac.compare_digest(fingerprint(qr_unique_id), self.qr_id)
+        return self.qr_id == qr_unique_id and normalize_rut(self.rut) == normalize_rut(rut)
+
+
+def make_token(user_id, qr_unique_id):
+    """Genera el token v1 para un socio."""
+    payload = struct.pack('>I', user_id) + fingerprint(qr_unique_id)
+    raw = payload + _sign(payload)
+    return TOKEN_PREFIX + base64.b32encode(raw).decode('ascii').rstrip('=')
+
+
+def _parse_token(text):
+    body = text[len(TOKEN_PREFIX):].upper()
+    try:
+        raw = base64.b32decode(body + '=' * (-len(body) % 8))
+    except (binascii.Error, ValueError):
+        raise InvalidQRToken("Token QR mal formado")
+    # El último carácter lleva bits de relleno que b32decode ignora: solo se
+    # acepta la codificación canónica, así cada token tiene una sola forma escrita
+    if len(raw) != _TOKEN_BYTES or base64.b32encode(raw).decode('ascii').rstrip('=') != body:
+        raise InvalidQRToken("Token QR mal formado")
+
+    payload, mac = raw[:_PAYLOAD_BYTES], raw[_PAYLOAD_BYTES:]
+    if not hmac.compare_digest(_sign(payload), mac):
+        raise InvalidQRToken("Firma del QR inválida")
+    user_id = struct.unpack('>I', payload[:4])[0]
+    return QRClaims(user_id, payload[4:], None, True)
+
+
+def _parse_legacy(qr_data):
+    """Formato antiguo: str(dict), dict o JSON con user_id, qr_id y rut."""
+    try:
+        if isinstance(qr_data, dict):
+            qr_dict = qr_data
+        elif isinstance(qr_data, str):
+            qr_dict = ast.literal_eval(qr_data.strip())
+        else:
+            qr_dict = json.loads(qr_data)
+        user_id = int(qr_dict.get('user_id'))
+        qr_id = qr_dict.get('qr_id')
+        rut = qr_dict.get('rut')
+    except Exception:
+        raise InvalidQRToken("Formato QR inválido")
+    if not user_id or not qr_id or not rut:
+        raise InvalidQRToken("Datos incompletos")
+    return QRClaims(user_id, str(qr_id), str(rut), False)
+
+
+def parse(qr_data):
+    """
+    Lee el contenido de un QR (token v1 o formato antiguo) y retorna QRClaims.
+    Lanza InvalidQRToken si no es válido. No consulta la BD.
+    """
+    if isinstance(qr_data, str):
+        text = qr_data.strip()
+        if text[:len(TOKEN_PREFIX)].upper() == TOKEN_PREFIX:
+            return _parse_token(text)
+    return _parse_legacy(qr_data)
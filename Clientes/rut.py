@@ -0,0 +1,64 @@
+"""
+RUT chileno: forma canónica y dígito verificador.
+
+El RUT se guarda tal como se escribió ('11.111.111-1', '12345678-9', ...), así
+que para buscarlo se usa CustomUser.rut_normalized: solo dígitos y el DV en
+mayúscula, sin puntos ni guion ('11111111-1' -> '111111111'). Todas las
+búsquedas por RUT normalizan la entrada con normalize() y consultan esa
+columna (índice único), sin importar cómo la escribió el usuario.
+
+IMPORTANTE: Este módulo NO importa modelos (models.py lo usa en CustomUser.save()).
+"""
+import re
+from itertools import cycle
+
+_SHAPE_RE = re.compile(r'^\d{1,3}(?:\.?\d{3})*-?[\dK]$')
+_STRIP_RE = re.compile(r'[^0-9K]')
+
+# Factores 2..7 aplicados desde el dígito menos significativo (módulo 11)
+_WEIGHTS = tuple(w for w, _ in zip(cycle(range(2, 8)), range(16)))
+
+
+def compact(value):
+    """Solo dígitos y K, en mayúscula ('12.345.678-k' -> '12345678K')."""
+    return _STRIP_RE.sub('', (value or '').upper())
+
+
+def check_digit(body):
+    """Dígito verificador ('0'-'9' o 'K') del número de RUT (int o str sin DV)."""
+    total = sum(int(d) * w for d, w in zip(reversed(str(body)), _WEIGHTS))
+    rest = 11 - total % 11
+    return '0' if rest == 11 else 'K' if rest == 10 else str(rest)
+
+
+def check_digits(bodies):
+    """check_digit() para muchos números de una vez (siembra de datos, backfill)."""
+    return [check_digit(body) for body in bodies]
+
+
+def looks_like_rut(value):
+    """¿Tiene forma de RUT (con o sin puntos/guion)? No revisa el dígito verificador."""
+    return bool(_SHAPE_RE.match((value or '').strip().upper()))
+
+
+def is_valid(value):
+    """¿Tiene forma de RUT y su dígito verificador es correcto?"""
+    if not looks_like_rut(value):
+        return False
+    value = compact(value)
+    return check_digit(value[:-1]) == value[-1]
+
+
+def normalize(value):
+    """
+    Clave canónica para rut_normalized: dígitos + DV ('11.111.111-1' -> '111111111').
+    Lo que no tiene forma de RUT (p. ej. 'TEMP_admin' del admin) queda en
+    mayúsculas tal cual, para que siga siendo único. None si está vacío.
+    """
+    value = (value or '').strip().upper()
+    if not value:
+        return None
+    if _SHAPE_RE.match(value):
+        return compact(value).lstrip('0') or '0'
+    return value
+
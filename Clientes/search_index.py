@@ -0,0 +1,76 @@
+"""
+Normalización para la búsqueda de socios (api_buscar_socio).
+
+Cada socio tiene sus términos de búsqueda ya normalizados en la tabla
+MemberSearchToken (una fila por término, columna indexada):
+
+- nombres y apellidos palabra por palabra, sin tildes y en minúsculas
+  ("María José" -> "maria", "jose")
+- el correo completo y su parte local ("ana.perez@mail.cl" -> "ana.perez@mail.cl", "ana.perez")
+- el RUT sin puntos ni guion ("12.345.678-9" -> "123456789")
+
+La consulta se normaliza igual y cada palabra se busca como prefijo de un
+término, que es una búsqueda por rango en el índice (no un LIKE '%...%').
+
+IMPORTANTE: Este módulo NO importa modelos (models.py lo usa en CustomUser.save()).
+"""
+import re
+import unicodedata
+from . import rut as rut_utils
+
+TOKEN_MAX_LENGTH = 64
+MIN_PREFIX = 2   # palabras más cortas abarcan demasiados socios para un typeahead
+MAX_TERMS = 4
+
+# Campos de CustomUser de los que salen los términos (role: solo se indexan socios)
+SOURCE_FIELDS = frozenset({'first_name', 'last_name', 'email', 'rut', 'role'})
+
+_RUT_RE = re.compile(r'^\d{1,3}(\.?\d{3})*(-?[\dkK])?$')
+_WORD_SPLIT_RE = re.compile(r'[^a-z0-9]+')
+_EMAIL_STRIP_RE = re.compile(r'[^a-z0-9@._+-]+')
+
+
+def fold(text):
+    """Minúsculas y sin tildes ('Ñuñoa' -> 'nunoa')."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def rut_key(rut):
+    """RUT sin puntos, guion ni espacios y con la K en minúscula ('12.345.678-K' -> '12345678k')."""
+    return rut_utils.compact(rut).lower()
+
+
+def _words(text):
+    return [w for w in _WORD_SPLIT_RE.split(fold(text)) if w]
+
+
+def user_tokens(first_name, last_name, email, rut):
+    """Conjunto de términos normalizados de un usuario."""
+    tokens = set(_words(first_name)) | set(_words(last_name))
+    email = _EMAIL_STRIP_RE.sub('', fold(email))
+    if email:
+        tokens.add(email)
+        tokens.add(email.split('@', 1)[0])
+    if rut_key(rut):
+        tokens.add(rut_key(rut))
+    return {t[:TOKEN_MAX_LENGTH] for t in tokens if t}
+
+
+def query_terms(query):
+    """
+    Palabras de la consulta normalizadas como los términos. Un RUT (con o sin
+    puntos/guion) y un correo quedan en una sola palabra; el resto se separa
+    igual que los nombres. Se descartan las de menos de MIN_PREFIX caracteres.
+    """
+    terms = []
+    for raw in (query or '').split():
+        if _RUT_RE.match(raw):
+            words = [rut_key(raw)]
+        elif '@' in raw:
+            words = [_EMAIL_STRIP_RE.sub('', fold(raw))]
+        else:
+            words = _words(raw)
+        terms.extend(w[:TOKEN_MAX_LENGTH] for w in words if len(w) >= MIN_PREFIX)
+    # Sin repetidos, conservando el orden
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
@@ -0,0 +1,235 @@
+"""
+Servicios de asistencia compartidos por los dashboards.
+
+Las lecturas salen de DailyAttendanceRollup (una fila por día y alcance), así su
+costo no crece con el historial de AccessLog. record_access() mantiene el
+resumen en cada escaneo, record_accesses() en lotes de escaneos, los borrados
+de AccessLog (models.py) recalculan los días afectados y rebuild_rollups() lo
+recalcula desde AccessLog.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from ..models import AccessLog, DailyAttendanceRollup
+
+# Ventana de la racha: suficiente para que una racha de 100+ días se vea completa
+STREAK_WINDOW_DAYS = 365
+
+
+# ==================== MANTENCIÓN DEL RESUMEN ====================
+
+def _bump(day, scope, field, amount, user_id=None, plan_id=None):
+    """Suma `amount` a un contador del resumen, creando la fila si no existe."""
+    lookup = {'date': day, 'scope': scope, 'user_id': user_id, 'plan_id': plan_id}
+    if DailyAttendanceRollup.objects.filter(**lookup).update(**{field: F(field) + amount}):
+        return
+    try:
+        with transaction.atomic():
+            DailyAttendanceRollup.objects.create(**lookup, **{field: amount})
+    except IntegrityError:
+        # Otro worker creó la fila entre el UPDATE y el INSERT
+        DailyAttendanceRollup.objects.filter(**lookup).update(**{field: F(field) + amount})
+
+
+def _count_accesses(accesses):
+    """Agrupa (user_id, plan_id, status, timestamp) en {(día, alcance, user, plan, campo): n}."""
+    counters = Counter()
+    for user_id, plan_id, status, timestamp in accesses:
+        day = timezone.localtime(timestamp).date()
+        field = 'allowed' if status == 'allowed' else 'denied'
+        counters[(day, 'total', None, None, field)] += 1
+        counters[(day, 'user', user_id, None, field)] += 1
+        if plan_id:
+            counters[(day, 'plan', None, plan_id, field)] += 1
+    return counters
+
+
+def record_accesses(accesses):
+    """
+    Suma un lote de escaneos al resumen diario con escrituras masivas.
+    `accesses` es un iterable de (user_id, plan_id, status, timestamp).
+
+    Lee y bloquea las filas existentes en una consulta, las actualiza con un
+    bulk_update y crea las que faltan con un bulk_create, así el costo no crece
+    con la cantidad de socios del lote.
+    """
+    counters = _count_accesses(accesses)
+    if not counters:
+        return
+
+    deltas = defaultdict(Counter)
+    for (day, scope, user_id, plan_id, field), amount in counters.items():
+        deltas[(day, scope, user_id, plan_id)][field] += amount
+
+    days = {key[0] for key in deltas}
+    user_ids = {key[2] for key in deltas if key[2] is not None}
+    with transaction.atomic():
+        existing = {
+            (r.date, r.scope, r.user_id, r.plan_id): r
+            for r in DailyAttendanceRollup.objects.select_for_update().filter(
+                Q(scope__in=['total', 'plan']) | Q(scope='user', user_id__in=user_ids),
+                date__in=days,
+            )
+        }
+
+        to_update, to_create = [], []
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                day, scope, user_id, plan_id = key
+                to_create.append(DailyAttendanceRollup(
+                    date=day, scope=scope, user_id=user_id, plan_id=plan_id,
+                    allowed=delta['allowed'], denied=delta['denied']
+                ))
+            else:
+                row.allowed += delta['allowed']
+                row.denied += delta['denied']
+                to_update.append(row)
+
+        if to_update:
+            DailyAttendanceRollup.objects.bulk_update(to_update, ['allowed', 'denied'], batch_size=500)
+        if to_create:
+            try:
+                with transaction.atomic():
+                    DailyAttendanceRollup.objects.bulk_create(to_create, batch_size=500)
+            except IntegrityError:
+                # Otro worker creó alguna de las filas entretanto: se suman de a una
+                for row in to_create:
+                    for field in ('allowed', 'denied'):
+                        if getattr(row, field):
+                            _bump(row.date, row.scope, field, getattr(row, field),
+                                  user_id=row.user_id, plan_id=row.plan_id)
+
+
+def record_access(user_id, plan_id, status, timestamp):
+    """
+    Suma un escaneo al resumen diario (lo llama process_qr_scan).
+    Camino rápido: un UPDATE con F() por fila, sin lecturas previas.
+    """
+    counters = _count_accesses([(user_id, plan_id, status, timestamp)])
+    with transaction.atomic():
+        for (day, scope, user_id, plan_id, field), amount in counters.items():
+            _bump(day, scope, field, amount, user_id=user_id, plan_id=plan_id)
+
+
+def rebuild_rollups(start, end):
+    """
+    Recalcula el resumen de los días locales [start, end] desde AccessLog.
+    Cada día es un GROUP BY en su propia transacción
+    (DailyAttendanceRollup.rebuild_day): la memoria y los bloqueos quedan
+    acotados a un día aunque el rango sea todo el historial.
+    Retorna la cantidad de filas de resumen creadas.
+    """
+    created = 0
+    day = start
+    while day <= end:
+        created += DailyAttendanceRollup.rebuild_day(day)
+        day += timedelta(days=1)
+    return created
+
+
+# ==================== LECTURAS PARA DASHBOARDS ====================
+
+def allowed_totals(*days):
+    """Accesos permitidos de cada día pedido, en una consulta: {fecha: total}."""
+    rows = DailyAttendanceRollup.objects.filter(scope='total', date__in=days).values_list('date', 'allowed')
+    totals = dict(rows)
+    return {day: totals.get(day, 0) for day in days}
+
+
+def present_user_ids(day):
+    """IDs de socios con acceso permitido en el día (subconsulta reutilizable)."""
+    return DailyAttendanceRollup.objects.filter(scope='user', date=day, allowed__gt=0).values('user_id')
+
+
+def user_access_summary(user, today=None):
+    """
+    Contadores de asistencia de un socio en una sola consulta: semana (7 días),
+    mes actual, total histórico, permitidos/denegados y si ya vino hoy.
+    """
+    today = today or timezone.localdate()
+    summary = DailyAttendanceRollup.objects.filter(scope='user', user=user).aggregate(
+        weekly=Sum('allowed', filter=Q(date__gte=today - timedelta(days=7))),
+        monthly=Sum('allowed', filter=Q(date__gte=today.replace(day=1))),
+        today=Sum('allowed', filter=Q(date=today)),
+        allowed=Sum('allowed'),
+        denied=Sum('denied'),
+    )
+    allowed = summary['allowed'] or 0
+    denied = summary['denied'] or 0
+    return {
+        'weekly': summary['weekly'] or 0,
+        'monthly': summary['monthly'] or 0,
+        'accessed_today': bool(summary['today']),
+        'allowed': allowed,
+        'denied': denied,
+        'total': allowed + denied,
+    }
+
+
+def daily_attendance_histogram(days=7, today=None, status='allowed'):
+    """
+    Accesos por día local (America/Santiago) de los últimos `days` días, hoy incluido.
+
+    Lee a lo más `days` filas del resumen diario en una sola consulta.
+    Retorna (labels, data) para Chart.js, p. ej. (['11/03', ...], [42, ...]).
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    field = 'allowed' if status == 'allowed' else 'denied'
+    totals = dict(DailyAttendanceRollup.objects.filter(
+        scope='total', date__gte=start, date__lte=today
+    ).values_list('date', field))
+
+    labels, data = [], []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        labels.append(day.strftime('%d/%m'))
+        data.append(totals.get(day, 0))
+    return labels, data
+
+
+def attendance_streaks(user, window_days=STREAK_WINDOW_DAYS, today=None):
+    """
+    Racha actual, racha más larga y frecuencia semanal de un socio.
+
+    Trae en UNA consulta los días con acceso permitido dentro de la ventana y
+    calcula todo en Python (antes: un exists() por día).
+    Como antes, si hoy aún no vino la racha actual se cuenta desde ayer.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=window_days - 1)
+    days = set(DailyAttendanceRollup.objects.filter(
+        scope='user', user=user, allowed__gt=0, date__gte=start, date__lte=today
+    ).values_list('date', flat=True))
+
+    # Racha actual (con gracia para hoy)
+    current = 0
+    cursor = today if today in days else today - timedelta(days=1)
+    while cursor in days:
+        current += 1
+        cursor -= timedelta(days=1)
+
+    # Racha más larga dentro de la ventana
+    longest = 0
+    for day in days:
+        if day - timedelta(days=1) in days:
+            continue  # No es el inicio de una racha
+        length = 1
+        while day + timedelta(days=length) in days:
+            length += 1
+        longest = max(longest, length)
+
+    # Días de asistencia por semana desde el primer acceso de la ventana
+    weekly_frequency = 0
+    if days:
+        span_days = (today - min(days)).days + 1
+        weekly_frequency = round(len(days) / (span_days / 7), 1) if span_days >= 7 else len(days)
+
+    return {
+        'current': current,
+        'longest': longest,
+        'weekly_frequency': weekly_frequency,
+    }
@@ -0,0 +1,169 @@
+"""
+Envío masivo de correos a socios (recordatorios, reenvío de QR o contratos).
+
+EmailMessage.send() abre y cierra una sesión TLS con EMAIL_HOST por cada correo;
+con miles de socios eso domina el tiempo total. BulkMailer abre UNA conexión
+(get_connection) y entrega los correos en lotes sobre esa sesión, con un
+límite opcional de correos por segundo para no superar la cuota del proveedor,
+y mide el rendimiento (correos/segundo).
+
+Las campañas son generadores: arman cada correo justo antes de enviarlo, así la
+memoria no crece con la cantidad de destinatarios.
+"""
+import time
+from datetime import timedelta
+from django.core.mail import get_connection
+from django.utils import timezone
+from ..models import CustomUser, Membership
+from ..utils import build_expiry_reminder_email, build_qr_email
+
+
+class BulkMailer:
+    """
+    Uso:
+        with BulkMailer(batch_size=50, rate=10) as mailer:
+            mailer.send(mensajes)
+        mailer.stats  # {'sent', 'failed', 'batches', 'elapsed', 'per_second'}
+    """
+
+    def __init__(self, batch_size=50, rate=None, connection=None, on_batch=None):
+        self.batch_size = max(1, batch_size)
+        self.rate = rate  # Correos por segundo (None = sin límite)
+        self.on_batch = on_batch  # Callback(stats) tras cada lote, para reportar avance
+        # fail_silently: un destinatario rechazado no corta el lote; se cuenta como fallido
+        self.connection = connection or get_connection(fail_silently=True)
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self._started = None
+
+    def __enter__(self):
+        self.connection.open()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.connection.close()
+        return False
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._started if self._started else 0.0
+
+    @property
+    def stats(self):
+        elapsed = self.elapsed
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'batches': self.batches,
+            'elapsed': elapsed,
+            'per_second': self.sent / elapsed if elapsed else 0.0,
+        }
+
+    def _throttle(self, upcoming):
+        """Espera lo necesario para que el ritmo promedio no supere `rate`."""
+        if not self.rate:
+            return
+        earliest = (self.sent + self.failed + upcoming) / self.rate
+        wait = earliest - self.elapsed
+        if wait > 0:
+            time.sleep(wait)
+
+    def _deliver(self, message):
+        """
+        Entrega un correo sobre la conexión abierta. Con fail_silently una sesión
+        SMTP cortada a mitad de lote (límite por conexión, timeout) solo se ve
+        como 0 enviados: se reabre la conexión y se reintenta una vez antes de
+        contarlo como fallido, así el corte no arrastra al resto del lote.
+        """
+        if self.connection.send_messages([message]):
+            return True
+        self.connection.close()
+        self.connection.open()
+        return bool(self.connection.send_messages([message]))
+
+    def _flush(self, batch):
+        self._throttle(len(batch))
+        for message in batch:
+            message.connection = self.connection
+            if self._deliver(message):
+                self.sent += 1
+            else:
+                self.failed += 1
+        self.batches += 1
+        if self.on_batch:
+            self.on_batch(self.stats)
+
+    def send(self, messages):
+        """Envía un iterable de EmailMessage en lotes sobre la conexión abierta."""
+        if self._started is None:
+            raise RuntimeError("BulkMailer debe usarse como context manager (with BulkMailer() as m)")
+        batch = []
+        for message in messages:
+            batch.append(message)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.stats
+
+
+# ==================== CAMPAÑAS ====================
+
+def expiring_memberships(days=7, within=False, today=None):
+    """
+    Membresías activas que vencen en exactamente `days` días (o dentro de los
+    próximos `days` días con within=True), de socios con correo.
+    """
+    today = today or timezone.localdate()
+    target = today + timedelta(days=days)
+    memberships = Membership.objects.filter(is_active=True).exclude(user__email='')
+    if within:
+        memberships = memberships.filter(end_date__gt=today, end_date__lte=target)
+    else:
+        memberships = memberships.filter(end_date=target)
+    return memberships.select_related('user', 'plan').order_by('id')
+
+
+def active_socios_memberships():
+    """Membresía activa de cada socio con correo y QR (para reenvíos)."""
+    today = timezone.localdate()
+    return Membership.objects.filter(
+        is_active=True, end_date__gt=today,
+        user__role='socio', user__qr_unique_id__isnull=False,
+    ).exclude(user__email='').select_related('user', 'plan').order_by('user_id', '-end_date')
+
+
+def _one_per_user(memberships):
+    """Recorre membresías ordenadas por usuario y deja una por socio."""
+    last_user = None
+    for membership in memberships.iterator(chunk_size=500):
+        if membership.user_id != last_user:
+            last_user = membership.user_id
+            yield membership
+
+
+def campaign_messages(campaign, days=7, within=False):
+    """Generador de EmailMessage para una campaña: 'vencimiento', 'qr' o 'contrato'."""
+    if campaign == 'vencimiento':
+        for membership in expiring_memberships(days, within).iterator(chunk_size=500):
+            yield build_expiry_reminder_email(membership)
+    elif campaign in ('qr', 'contrato'):
+        for membership in _one_per_user(active_socios_memberships()):
+            yield build_qr_email(
+                membership.user, membership,
+                send_qr=campaign == 'qr', send_contract=campaign == 'contrato', reissue=True,
+            )
+    else:
+        raise ValueError(f"Campaña desconocida: {campaign}")
+
+
+def campaign_recipients(campaign, days=7, within=False):
+    """Cantidad de destinatarios de una campaña (para --simular y el avance)."""
+    if campaign == 'vencimiento':
+        return expiring_memberships(days, within).count()
+    return CustomUser.objects.filter(
+        id__in=active_socios_memberships().values('user_id')
+    ).count()
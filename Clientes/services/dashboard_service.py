@@ -3,6 +3,8 @@ from django.db.models import Count, Sum, Q, Avg
 from django.utils import timezone
 from datetime import timedelta, date
 from ..models import CustomUser, Plan, Membership, AccessLog, Payment
+from .timeseries import time_series, current_year_months
+from .attendance import daily_attendance_histogram, allowed_totals, present_user_ids
 
 class AdminDashboardService:
     def __init__(self):
@@ -24,83 +26,87 @@ class AdminDashboardService:
         }
 
     def get_kpis(self):
-        """Obtiene los indicadores clave de rendimiento (KPIs)."""
-        # 1. Usuarios Activos
-        active_users = CustomUser.objects.filter(role='socio', is_active_member=True).count()
+        """
+        Obtiene los indicadores clave de rendimiento (KPIs).
+        Una sola consulta de agregación condicional por tabla (4 en total; los
+        accesos salen del resumen diario), sin importar cuántos KPIs o períodos
+        de comparación se agreguen.
+        """
         last_month = self.today - timedelta(days=30)
-        active_users_last = CustomUser.objects.filter(role='socio', is_active_member=True, created_at__lte=last_month).count()
-        user_change = self._calculate_percentage_change(active_users_last, active_users)
-
-        # 2. Ingresos Mensuales
         first_day_month = self.today.replace(day=1)
-        monthly_revenue = Membership.objects.filter(payment_date__gte=first_day_month).exclude(status='cancelled').aggregate(t=Sum('amount_paid'))['t'] or 0
-        
         prev_month_start = (first_day_month - timedelta(days=1)).replace(day=1)
         prev_month_end = first_day_month - timedelta(days=1)
-        prev_revenue = Membership.objects.filter(payment_date__gte=prev_month_start, payment_date__lte=prev_month_end).exclude(status='cancelled').aggregate(t=Sum('amount_paid'))['t'] or 0
-        revenue_change = self._calculate_percentage_change(prev_revenue, monthly_revenue)
-
-        # 3. Planes por Vencer (7 días)
         limit_date = self.today + timedelta(days=7)
-        plans_expiring = Membership.objects.filter(is_active=True, end_date__gte=self.today, end_date__lte=limit_date).count()
-        
         week_start = self.today - timedelta(days=7)
-        plans_expiring_last = Membership.objects.filter(is_active=True, end_date__gte=week_start, end_date__lte=self.today).count()
-        plans_change = self._calculate_percentage_change(plans_expiring_last, plans_expiring)
+        year_start = date(self.today.year, 1, 1)
 
-        # 4. Accesos Hoy
-        accesses_today = AccessLog.objects.filter(timestamp__range=(self.start_of_day, self.end_of_day), status='allowed').count()
-        yesterday_start = self.start_of_day - timedelta(days=1)
-        yesterday_end = self.end_of_day - timedelta(days=1)
-        accesses_yesterday = AccessLog.objects.filter(timestamp__range=(yesterday_start, yesterday_end), status='allowed').count()
-        access_change = self._calculate_percentage_change(accesses_yesterday, accesses_today)
+        # 1. Usuarios Activos
+        users = CustomUser.objects.filter(role='socio', is_active_member=True).aggregate(
+            active=Count('id'),
+            active_last=Count('id', filter=Q(created_at__lte=last_month)),
+        )
+
+        # 2 y 3. Ingresos Mensuales y Planes por Vencer (7 días)
+        revenue_month = Q(payment_date__gte=first_day_month) & ~Q(status='cancelled')
+        revenue_prev = Q(payment_date__gte=prev_month_start, payment_date__lte=prev_month_end) & ~Q(status='cancelled')
+        expiring = Q(is_active=True, end_date__gte=self.today, end_date__lte=limit_date)
+        expiring_last = Q(is_active=True, end_date__gte=week_start, end_date__lte=self.today)
+        memberships = Membership.objects.filter(
+            revenue_month | revenue_prev | expiring | expiring_last
+        ).aggregate(
+            monthly_revenue=Sum('amount_paid', filter=revenue_month),
+            prev_revenue=Sum('amount_paid', filter=revenue_prev),
+            plans_expiring=Count('id', filter=expiring),
+            plans_expiring_last=Count('id', filter=expiring_last),
+        )
+
+        # 4. Accesos Hoy vs Ayer (dos filas del resumen diario)
+        local_today = self.now_chile.date()
+        local_yesterday = local_today - timedelta(days=1)
+        accesses = allowed_totals(local_today, local_yesterday)
 
         # Extras financieros
-        year_start = date(self.today.year, 1, 1)
-
-        annual_revenue = Payment.objects.filter(
-            date__gte=year_start
-        ).aggregate(t=Sum('amount'))['t'] or 0
+        payments = Payment.objects.filter(date__gte=year_start).aggregate(
+            annual_revenue=Sum('amount'),
+            avg_ticket=Avg('amount', filter=Q(date__year=self.today.year)),
+        )
 
-        avg_ticket = Payment.objects.filter(
-            date__year=self.today.year
-        ).aggregate(a=Avg('amount'))['a'] or 0
+        monthly_revenue = memberships['monthly_revenue'] or 0
+        prev_revenue = memberships['prev_revenue'] or 0
 
         return {
-            'usuarios_activos': active_users, 'cambio_usuarios': user_change,
-            'ingresos_mensuales': monthly_revenue, 'cambio_ingresos': revenue_change,
-            'planes_por_vencer': plans_expiring, 'cambio_planes': plans_change,
-            'accesos_hoy': accesses_today, 'cambio_accesos': access_change,
-            'ingresos_anuales': annual_revenue, 'ticket_promedio': avg_ticket
+            'usuarios_activos': users['active'],
+            'cambio_usuarios': self._calculate_percentage_change(users['active_last'], users['active']),
+            'ingresos_mensuales': monthly_revenue,
+            'cambio_ingresos': self._calculate_percentage_change(prev_revenue, monthly_revenue),
+            'planes_por_vencer': memberships['plans_expiring'],
+            'cambio_planes': self._calculate_percentage_change(memberships['plans_expiring_last'], memberships['plans_expiring']),
+            'accesos_hoy': accesses[local_today],
+            'cambio_accesos': self._calculate_percentage_change(accesses[local_yesterday], accesses[local_today]),
+            'ingresos_anuales': payments['annual_revenue'] or 0,
+            'ticket_promedio': payments['avg_ticket'] or 0
         }
 
     def get_user_stats(self):
-        """Prepara las listas de usuarios y estadísticas de roles."""
-        # Socios (Optimizando consulta N+1)
-        socios = CustomUser.objects.filter(role='socio', is_superuser=False).select_related().prefetch_related('memberships').order_by('-created_at')
-        socios_data = []
-        for socio in socios:
-            membership = socio.get_active_membership()
-            socios_data.append({
-                'user': socio,
-                'membership': membership,
-                'plan_name': membership.plan.name if membership else 'Sin plan',
-                'estado': 'Activo' if socio.is_active_member else 'Inactivo',
-                'dias_restantes': membership.days_remaining() if membership else 0
-            })
-        
+        """
+        Estadísticas de roles y listas de moderadores/administradores.
+        La tabla de socios la carga el panel a demanda desde api_socios (paginada).
+        """
+        counts = CustomUser.objects.filter(is_superuser=False).aggregate(
+            total_socios=Count('id', filter=Q(role='socio')),
+            socios_activos=Count('id', filter=Q(role='socio', is_active_member=True)),
+            total_moderadores=Count('id', filter=Q(role='moderador')),
+            total_admins=Count('id', filter=Q(role='admin')),
+        )
         moderadores = CustomUser.objects.filter(role='moderador', is_superuser=False).order_by('-created_at')
         administradores = CustomUser.objects.filter(role='admin', is_superuser=False).order_by('-created_at')
 
         return {
-            'socios': socios_data,
             'moderadores': moderadores,
             'administradores': administradores,
-            'total_socios': socios.count(),
-            'total_moderadores': moderadores.count(),
-            'total_admins': administradores.count(),
-            'socios_activos': socios.filter(is_active_member=True).count(),
-            'socios_inactivos': socios.filter(is_active_member=False).count()
+            'socios_inactivos': counts['total_socios'] - counts['socios_activos'],
+            'planes_filtro': Plan.objects.filter(is_active=True).order_by('price').values('id', 'name'),
+            **counts,
         }
 
     def get_plan_stats(self):
@@ -141,34 +147,25 @@ class AdminDashboardService:
         labels_pago = [m['payment_method'].capitalize() for m in methods]
         data_pago = [float(m['dinero']) for m in methods]
 
-        # Ingresos Mensuales
-        labels_ingresos = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        data_ingresos = [0] * 12
-        pagos = Payment.objects.filter(date__year=self.today.year)
-        for pago in pagos:
-            mes = pago.date.month - 1
-            data_ingresos[mes] += float(pago.amount)
+        # Ingresos Mensuales (agregados en la BD, meses vacíos en 0)
+        start, end = current_year_months(self.today)
+        labels_ingresos, data_ingresos = time_series(
+            Payment.objects.all(), 'date', start, end, period='month', aggregate=Sum('amount')
+        )
         
         # Distribución Planes
         planes_dist = Membership.objects.filter(is_active=True).values('plan__name').annotate(total=Count('id'))
         labels_planes = [p['plan__name'] for p in planes_dist]
         data_planes = [p['total'] for p in planes_dist]
 
-        # Asistencia (7 días)
-        labels_asist = []
-        data_asist = []
-        for i in range(6, -1, -1):
-            d = self.today - timedelta(days=i)
-            cnt = AccessLog.objects.filter(timestamp__date=d, status='allowed').count()
-            labels_asist.append(d.strftime("%d/%m"))
-            data_asist.append(cnt)
+        # Asistencia (7 días, una sola consulta agrupada por día local)
+        labels_asist, data_asist = daily_attendance_histogram(days=7, today=self.now_chile.date())
 
-        current_month = self.today.month
         return {
             'chart_pagos_labels': json.dumps(labels_pago),
             'chart_pagos_data': json.dumps(data_pago),
-            'chart_ingresos_labels': json.dumps(labels_ingresos[:current_month]),
-            'chart_ingresos_data': json.dumps(data_ingresos[:current_month]),
+            'chart_ingresos_labels': json.dumps(labels_ingresos),
+            'chart_ingresos_data': json.dumps(data_ingresos),
             'chart_planes_labels': json.dumps(labels_planes),
             'chart_planes_data': json.dumps(data_planes),
             'chart_asistencias_labels': json.dumps(labels_asist),
@@ -179,8 +176,8 @@ class AdminDashboardService:
         """Obtiene logs del día y usuarios ausentes."""
         logs_hoy = AccessLog.objects.filter(timestamp__range=(self.start_of_day, self.end_of_day)).select_related('user', 'membership', 'membership__plan').order_by('-timestamp')
         
-        ids_presentes = AccessLog.objects.filter(timestamp__date=self.today, status='allowed').values_list('user_id', flat=True)
-        socios_ausentes = CustomUser.objects.filter(role='socio', is_active_member=True).exclude(id__in=ids_presentes).select_related().order_by('last_name')
+        ids_presentes = present_user_ids(self.now_chile.date())
+        socios_ausentes = CustomUser.objects.with_active_membership().filter(role='socio', is_active_member=True).exclude(id__in=ids_presentes).order_by('last_name')
         
         ausentes_data = []
         for socio in socios_ausentes:
@@ -191,7 +188,7 @@ class AdminDashboardService:
                 })
         
         socios_activos = CustomUser.objects.filter(role='socio', is_active_member=True).count()
-        accesos_hoy = AccessLog.objects.filter(timestamp__range=(self.start_of_day, self.end_of_day), status='allowed').count()
+        accesos_hoy = allowed_totals(self.now_chile.date())[self.now_chile.date()]
         asistencia_pct = round((accesos_hoy / socios_activos * 100), 1) if socios_activos > 0 else 0
 
         return {
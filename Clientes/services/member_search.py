@@ -0,0 +1,63 @@
+"""
+Búsqueda de socios por RUT, nombre o correo para el typeahead de recepción.
+
+Antes api_buscar_socio hacía OR de cuatro icontains (LIKE '%...%', recorre
+toda la tabla) y devolvía un socio cualquiera. Ahora cada palabra de la
+consulta se busca como prefijo en MemberSearchToken.token (indexado, solo
+socios) y un socio debe calzar con todas las palabras.
+
+Ranking: la palabra más larga (la más selectiva) recorre el índice en orden
+de término, así que primero aparece el término exacto ("maria" antes que
+"mariana") y luego los más cortos alfabéticamente; el LIMIT corta el
+recorrido apenas hay suficientes socios. Las demás palabras filtran con
+user_id IN (...). Son dos consultas: el ranking y la carga de los N usuarios.
+
+El prefijo se resuelve según el motor para que use el índice:
+PostgreSQL con LIKE 'x%' (Django crea el índice varchar_pattern_ops junto al
+db_index), MySQL con LIKE sin BINARY y SQLite con un rango >= / < (su LIKE
+con ESCAPE no usa índices). Los términos ya vienen en minúsculas y ASCII.
+"""
+from django.db import connection
+from django.db.models import Q
+from ..models import CustomUser, MemberSearchToken
+from ..search_index import query_terms
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Un socio puede calzar con varios de sus términos ("maria" y "maria.gonzalez");
+# se piden más filas que socios para que el LIMIT alcance tras quitar repetidos.
+ROWS_PER_MEMBER = 4
+
+
+def _prefix(term):
+    if connection.vendor == 'sqlite':
+        return Q(token__gte=term, token__lt=term + '\U0010ffff')
+    if connection.vendor == 'mysql':
+        return Q(token__istartswith=term)
+    return Q(token__startswith=term)
+
+
+def ranked_ids(query, limit=DEFAULT_LIMIT):
+    """IDs de socios que calzan con todas las palabras, de más a menos relevante."""
+    terms = sorted(query_terms(query), key=len, reverse=True)
+    if not terms:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    rows = MemberSearchToken.objects.filter(_prefix(terms[0]))
+    for term in terms[1:]:
+        rows = rows.filter(user_id__in=MemberSearchToken.objects.filter(_prefix(term)).values('user_id'))
+    rows = rows.order_by('token').values_list('user_id', flat=True)[:limit * ROWS_PER_MEMBER]
+
+    # Sin repetidos, conservando el orden del ranking
+    return list(dict.fromkeys(rows))[:limit]
+
+
+def search_members(query, limit=DEFAULT_LIMIT):
+    """Socios ordenados por relevancia (a lo más `limit`)."""
+    ids = ranked_ids(query, limit=limit)
+    if not ids:
+        return []
+    users = CustomUser.objects.in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
@@ -0,0 +1,140 @@
+"""
+Outbox de correos y documentos.
+
+Las vistas llaman a enqueue_*() dentro de su request: solo es un INSERT. El
+comando process_outbox toma los mensajes listos, arma el correo (QR, PDF del
+contrato) y lo envía fuera del request. Si falla, reintenta con backoff
+exponencial hasta max_attempts y luego lo marca como fallido.
+
+En Render el worker lo levanta start.sh junto a gunicorn (y lo relanza si se
+cae); en local hay que correr `python manage.py process_outbox --continuo`.
+
+Varios workers pueden correr a la vez: la toma de mensajes usa
+SELECT ... FOR UPDATE SKIP LOCKED donde la BD lo soporta (PostgreSQL, MySQL 8,
+MariaDB 10.6+; en la MariaDB 10.4 de XAMPP queda un FOR UPDATE normal, que
+espera en vez de saltar filas) y deja un "lease" en next_attempt_at, así un
+mensaje de un worker caído se retoma solo.
+"""
+from datetime import timedelta
+from django.core.mail import get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from ..models import Membership, OutboxMessage
+from ..utils import build_qr_email
+
+# Reintentos: 1, 2, 4, 8... minutos, con tope de 1 hora
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=1)
+# Tiempo que un worker se reserva un mensaje mientras lo envía
+LEASE = timedelta(minutes=10)
+
+
+def enqueue_welcome_email(user, membership, send_qr=False, send_contract=False):
+    """Encola el correo de bienvenida (QR y/o contrato). No envía nada."""
+    if not (send_qr or send_contract) or not user.email:
+        return None
+    message = OutboxMessage.objects.create(
+        kind='welcome_email',
+        user=user,
+        membership=membership,
+        payload={'send_qr': bool(send_qr), 'send_contract': bool(send_contract)},
+    )
+    Membership.objects.filter(pk=membership.pk).update(email_status='pending')
+    return message
+
+
+def skip_locked():
+    """¿La BD soporta FOR UPDATE SKIP LOCKED? Django lanza NotSupportedError si se pide sin soporte."""
+    return connection.features.has_select_for_update_skip_locked
+
+
+def backoff(attempts):
+    """Espera antes del siguiente intento tras `attempts` intentos fallidos."""
+    return min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+
+
+def claim_batch(limit=20):
+    """
+    Reserva hasta `limit` mensajes listos para este worker y los retorna.
+    Incluye los 'sending' cuyo lease venció (worker caído a mitad de envío).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=skip_locked())
+            .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboxMessage.objects.filter(id__in=ids).update(
+            status='sending', attempts=F('attempts') + 1, next_attempt_at=now + LEASE
+        )
+    return list(
+        OutboxMessage.objects.filter(id__in=ids)
+        .select_related('user', 'membership__plan')
+        .order_by('next_attempt_at', 'id')
+    )
+
+
+def build_email(message, connection=None):
+    """Arma el EmailMessage de un mensaje de la cola según su tipo."""
+    if message.kind == 'welcome_email':
+        if message.user is None or message.membership is None:
+            raise ValueError("El usuario o la membresía ya no existen")
+        return build_qr_email(
+            message.user,
+            message.membership,
+            send_qr=message.payload.get('send_qr', False),
+            send_contract=message.payload.get('send_contract', False),
+            connection=connection,
+        )
+    raise ValueError(f"Tipo de mensaje desconocido: {message.kind}")
+
+
+def _mark_sent(message):
+    now = timezone.now()
+    OutboxMessage.objects.filter(pk=message.pk).update(status='sent', sent_at=now, last_error='')
+    if message.membership_id:
+        Membership.objects.filter(pk=message.membership_id).update(email_status='sent')
+
+
+def _mark_failed(message, error):
+    """Programa el reintento o, si ya no quedan, marca el mensaje como fallido."""
+    if message.attempts >= message.max_attempts:
+        OutboxMessage.objects.filter(pk=message.pk).update(status='failed', last_error=error)
+        if message.membership_id:
+            Membership.objects.filter(pk=message.membership_id).update(email_status='failed')
+        return 'failed'
+    OutboxMessage.objects.filter(pk=message.pk).update(
+        status='pending', last_error=error,
+        next_attempt_at=timezone.now() + backoff(message.attempts)
+    )
+    return 'retry'
+
+
+def process_batch(limit=20):
+    """
+    Entrega un lote de mensajes con una sola conexión SMTP.
+    Retorna un resumen {'sent': n, 'retry': n, 'failed': n}.
+    """
+    summary = {'sent': 0, 'retry': 0, 'failed': 0}
+    messages = claim_batch(limit)
+    if not messages:
+        return summary
+
+    connection = get_connection()
+    try:
+        for message in messages:
+            try:
+                build_email(message, connection=connection).send(fail_silently=False)
+            except Exception as e:
+                summary[_mark_failed(message, f"{type(e).__name__}: {e}")] += 1
+            else:
+                _mark_sent(message)
+                summary['sent'] += 1
+    finally:
+        connection.close()
+    return summary
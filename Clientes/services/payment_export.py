@@ -0,0 +1,142 @@
+"""
+Exportación de pagos a Excel (.xlsx) o CSV con memoria acotada.
+
+Antes se cargaban todas las membresías como objetos (con user y plan) y se
+armaba el libro completo en memoria. Aquí:
+
+- Las filas salen de la BD con values_list() + iterator(chunk_size): tuplas,
+  sin instanciar modelos y sin cachear el QuerySet.
+- El Excel usa el modo write_only de openpyxl, que escribe cada fila a un
+  archivo temporal en lugar de mantener la hoja en memoria.
+- El CSV se entrega en streaming (StreamingHttpResponse), fila por fila.
+
+Orígenes: 'membresias' (el reporte de siempre) o 'pagos' (libro mayor Payment,
+que conserva los pagos de usuarios eliminados).
+"""
+import csv
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from ..models import Membership, Payment
+
+CHUNK_SIZE = 2000
+
+SOURCES = {
+    'membresias': {
+        'title': 'Historial de Transacciones',
+        'headers': ['ID', 'Fecha', 'RUT Socio', 'Nombre Socio', 'Plan', 'Método Pago', 'Monto', 'Estado', 'Realizado Por'],
+        'widths': [10, 20, 15, 25, 20, 15, 12, 12, 15],
+    },
+    'pagos': {
+        'title': 'Libro de Pagos',
+        'headers': ['ID', 'Fecha', 'RUT Socio', 'Nombre Socio', 'Plan', 'Método Pago', 'Monto', 'Comentario'],
+        'widths': [10, 20, 15, 25, 20, 15, 12, 40],
+    },
+}
+
+
+def _format_date(value):
+    return timezone.localtime(value).strftime("%d/%m/%Y %H:%M")
+
+
+def membership_rows():
+    """Filas del reporte por membresía (una por compra/renovación)."""
+    methods = dict(Membership.PAYMENT_METHOD_CHOICES)
+    statuses = dict(Membership.STATUS_CHOICES)
+    rows = Membership.objects.order_by('-payment_date').values_list(
+        'id', 'payment_date', 'user__rut', 'user__first_name', 'user__last_name',
+        'plan__name', 'payment_method', 'amount_paid', 'status',
+    )
+    for pk, paid_at, rut, first, last, plan, method, amount, status in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            pk, _format_date(paid_at), rut, f"{first} {last}".strip(), plan,
+            methods.get(method, method), int(amount), statuses.get(status, status),
+            "Sistema",
+        ]
+
+
+def payment_rows():
+    """Filas del libro mayor (Payment), con los datos de respaldo del pago."""
+    methods = dict(Payment.PAYMENT_METHOD_CHOICES)
+    rows = Payment.objects.order_by('-date', '-id').values_list(
+        'id', 'date', 'user_backup_rut', 'user_backup_name', 'plan_backup_name',
+        'payment_method', 'amount', 'comment',
+    )
+    for pk, paid_at, rut, name, plan, method, amount, comment in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            pk, _format_date(paid_at), rut, name, plan,
+            methods.get(method, method), int(amount), comment or '',
+        ]
+
+
+def export_rows(source, on_progress=None):
+    """Filas del origen. on_progress(filas) se llama cada CHUNK_SIZE filas y al final."""
+    if source == 'pagos':
+        rows = payment_rows()
+    elif source == 'membresias':
+        rows = membership_rows()
+    else:
+        raise ValueError(f"Origen de exportación desconocido: {source}")
+    if on_progress is None:
+        return rows
+    return _counted(rows, on_progress)
+
+
+def _counted(rows, on_progress):
+    count = 0
+    for count, row in enumerate(rows, 1):
+        yield row
+        if count % CHUNK_SIZE == 0:
+            on_progress(count)
+    on_progress(count)
+
+
+def export_count(source):
+    model = Payment if source == 'pagos' else Membership
+    return model.objects.count()
+
+
+def write_xlsx(source, fileobj, on_progress=None):
+    """Escribe el Excel del origen en `fileobj` (archivo o ruta) en modo write_only."""
+    spec = SOURCES[source]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(spec['title'])
+
+    # En write_only los anchos se fijan antes de escribir filas
+    for i, width in enumerate(spec['widths'], 1):
+        ws.column_dimensions[chr(64 + i)].width = width
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="000000", end_color="000000", fill_type="solid")  # Fondo negro
+    center_align = Alignment(horizontal="center")
+    header = []
+    for title in spec['headers']:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_align
+        header.append(cell)
+    ws.append(header)
+
+    for row in export_rows(source, on_progress):
+        ws.append(row)
+    wb.save(fileobj)
+
+
+class _Echo:
+    """Pseudo-archivo para csv.writer: retorna la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(source, on_progress=None):
+    """
+    Generador de líneas CSV del origen. Separador ';' y BOM UTF-8 para que
+    Excel en español lo abra con columnas y tildes correctas.
+    """
+    writer = csv.writer(_Echo(), delimiter=';')
+    yield '\ufeff' + writer.writerow(SOURCES[source]['headers'])
+    for row in export_rows(source, on_progress):
+        yield writer.writerow(row)
@@ -0,0 +1,175 @@
+"""
+Generación de PDFs (recibos y contratos) fuera del worker web.
+
+xhtml2pdf es CPU intensivo (cientos de ms por documento). Aquí:
+
+1. El HTML se arma con el motor de templates en el proceso web (es barato) y
+   la conversión a PDF corre en un ProcessPoolExecutor (PDF_RENDER_WORKERS).
+2. La salida es determinista (reportlab en modo invariant): el mismo HTML da
+   siempre los mismos bytes.
+3. Los recibos se guardan en disco direccionados por contenido:
+   <PDF_CACHE_DIR>/receipt/<payment_id>/<sha256(versión + HTML)>.pdf
+   Payment es historial inmutable, así que cada recibo se dibuja una vez. Si
+   cambia el template (o el correo del socio que aparece en él) cambia el hash
+   y se genera un archivo nuevo en lugar de servir uno obsoleto.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from django.conf import settings
+from django.template.loader import render_to_string
+from .. import pdf_worker
+
+# Subir al cambiar algo del proceso de render que no se vea en el HTML
+TEMPLATE_VERSION = 1
+RECEIPT_TEMPLATE = 'pdfs/receipt_template.html'
+CONTRACT_TEMPLATE = 'pdfs/contract_template.html'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pool_size():
+    """Procesos del pool compartido (0 = conversión en el mismo proceso)."""
+    default = min(4, os.cpu_count() or 1)
+    return getattr(settings, 'PDF_RENDER_WORKERS', default)
+
+
+def render_timeout():
+    """
+    Segundos que una vista espera un PDF. Debe quedar bajo el --timeout de
+    gunicorn (WEB_TIMEOUT): si no, gunicorn mata al worker antes y el usuario
+    recibe un 502 en vez del error controlado.
+    """
+    return getattr(settings, 'PDF_RENDER_TIMEOUT', 20)
+
+
+def _pool():
+    """Pool de procesos compartido (se crea al primer uso). None = render en línea."""
+    global _executor
+    if pool_size() <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=pool_size(), initializer=pdf_worker.init_worker)
+        return _executor
+
+
+def _reset_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def submit_html(html, executor=None):
+    """
+    Encola la conversión HTML -> PDF y retorna un Future. Usa `executor` si se
+    entrega (p. ej. un pool propio de un comando) o el pool compartido.
+    Sin pool (PDF_RENDER_WORKERS=0) convierte en línea y retorna un Future resuelto.
+    """
+    if executor is not None:
+        return executor.submit(pdf_worker.html_to_pdf, html)
+
+    pool = _pool()
+    if pool is not None:
+        try:
+            return pool.submit(pdf_worker.html_to_pdf, html)
+        except (BrokenProcessPool, RuntimeError):
+            _reset_pool()
+    future = Future()
+    future.set_result(pdf_worker.html_to_pdf(html))
+    return future
+
+
+def html_to_pdf(html):
+    """
+    Convierte HTML a PDF en el pool y espera el resultado (bytes o None).
+    Si no termina en render_timeout() se cancela (si aún no empezó) y retorna
+    None, como cualquier otro fallo de render: repetirlo en línea solo
+    duplicaría la espera.
+    """
+    future = submit_html(html)
+    try:
+        return future.result(timeout=render_timeout())
+    except FutureTimeoutError:
+        future.cancel()
+        return None
+    except BrokenProcessPool:
+        # Un proceso del pool murió: se recrea en el próximo uso y este va en línea
+        _reset_pool()
+        return pdf_worker.html_to_pdf(html)
+
+
+def render_pdf(template_name, context):
+    """Renderiza un template a PDF (sin caché)."""
+    return html_to_pdf(render_to_string(template_name, context))
+
+
+# ==================== RECIBOS (CACHÉ EN DISCO) ====================
+
+def _cache_dir():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'cache' / 'pdf'))
+
+
+def receipt_context(payment):
+    """
+    Contexto del recibo. Usamos los datos de RESPALDO para garantizar que el
+    recibo sea fiel al momento del pago, incluso si el usuario se borró.
+    Nada dependiente de la hora actual: el HTML (y su hash) debe ser estable.
+    """
+    return {
+        'pago': payment,
+        # Datos del cliente (Snapshot histórico)
+        'cliente_nombre': payment.user_backup_name,
+        'cliente_rut': payment.user_backup_rut,
+        # Intentamos obtener el email actual si el usuario existe, sino '-'
+        'cliente_email': payment.user.email if payment.user else "No disponible (Usuario eliminado)"
+    }
+
+
+def receipt_html(payment):
+    return render_to_string(RECEIPT_TEMPLATE, receipt_context(payment))
+
+
+def receipt_path(payment, html):
+    """Ruta direccionada por contenido del recibo renderizado desde `html`."""
+    digest = hashlib.sha256(f"v{TEMPLATE_VERSION}\n{html}".encode()).hexdigest()[:32]
+    return _cache_dir() / 'receipt' / str(payment.pk) / f"{digest}.pdf"
+
+
+def store_receipt(path, content):
+    """Escritura atómica (archivo temporal + rename) y limpieza de versiones viejas."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    for old in path.parent.glob('*.pdf'):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def cached_receipt(payment):
+    """(html, ruta, bytes o None): lo necesario para decidir si hay que renderizar."""
+    html = receipt_html(payment)
+    path = receipt_path(payment, html)
+    try:
+        return html, path, path.read_bytes()
+    except FileNotFoundError:
+        return html, path, None
+
+
+def receipt_pdf(payment):
+    """PDF del recibo de un Payment: desde disco si ya se generó, si no se genera y guarda."""
+    html, path, content = cached_receipt(payment)
+    if content is None:
+        content = html_to_pdf(html)
+        if content:
+            store_receipt(path, content)
+    return content
@@ -0,0 +1,120 @@
+"""
+Servicio único para dibujar el código QR de un socio (panel, correo, admin).
+
+Generar la matriz con qrcode y codificar el PNG con Pillow cuesta varios ms, y
+antes se repetía en cada vista. Aquí cada imagen se dibuja una sola vez:
+
+1. LRU en memoria del proceso (acierto sin serializar nada).
+2. Caché persistente de Django (alias QR_RENDER_CACHE_ALIAS, en disco por
+   defecto), compartida entre workers y reinicios.
+
+La clave es (qr_unique_id, size, border, format): al regenerar el qr_unique_id
+la clave cambia y las imágenes antiguas simplemente expiran. Cada entrada guarda
+además el texto codificado; si no coincide (p. ej. cambió SECRET_KEY) se redibuja.
+"""
+import base64
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from io import BytesIO
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.cache import caches
+
+RENDER_VERSION = 1
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+class RenderedQR(namedtuple('RenderedQR', ['content', 'content_type', 'etag'])):
+    """Bytes de la imagen, su tipo MIME y un ETag fuerte (hash del contenido)."""
+    __slots__ = ()
+
+    @property
+    def data_uri(self):
+        return f"data:{self.content_type};base64,{base64.b64encode(self.content).decode('ascii')}"
+
+
+class _LRU:
+    """LRU mínimo y thread-safe (functools.lru_cache no permite validar la entrada)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_memory = _LRU(getattr(settings, 'QR_RENDER_LRU_SIZE', 512))
+
+
+def _persistent():
+    return caches[getattr(settings, 'QR_RENDER_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(qr_unique_id, size, border, fmt):
+    return f"qr_render:v{RENDER_VERSION}:{qr_unique_id}:{size}:{border}:{fmt}"
+
+
+def render_payload(data, size=10, border=4, fmt='png'):
+    """Dibuja `data` como QR (sin caché). `size` es el tamaño de cada módulo."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de QR no soportado: {fmt}")
+
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=size,
+        border=border,
+        image_factory=qrcode.image.svg.SvgPathImage if fmt == 'svg' else None,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    if fmt == 'svg':
+        qr.make_image().save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    content = buffer.getvalue()
+    return RenderedQR(content, FORMATS[fmt], f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+
+
+def render_qr(user, size=10, border=4, fmt='png'):
+    """
+    Imagen del QR del socio, desde la caché si ya se dibujó.
+    Retorna RenderedQR o None si el usuario no tiene QR.
+    """
+    data = user.get_qr_data()
+    if not data:
+        return None
+
+    key = _cache_key(user.qr_unique_id, size, border, fmt)
+    entry = _memory.get(key)
+    if entry is None or entry[0] != data:
+        entry = _persistent().get(key)
+        if entry is None or entry[0] != data:
+            entry = (data, render_payload(data, size, border, fmt))
+            timeout = getattr(settings, 'QR_RENDER_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+            _persistent().set(key, entry, timeout)
+        _memory.set(key, entry)
+    return entry[1]
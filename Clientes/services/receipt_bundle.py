@@ -0,0 +1,124 @@
+"""
+Descarga masiva de recibos de pago (ZIP) para un rango de fechas.
+
+Los recibos ya generados se leen del disco (services/pdf_render.py); el resto
+se convierte en el pool de procesos, con a lo más `window` conversiones en vuelo
+para que la memoria no crezca con el rango. Cada PDF entra al ZIP apenas está
+listo y el ZIP se escribe en modo streaming (sin seek, con data descriptors):
+el navegador o el archivo de salida empiezan a recibir bytes con el primer
+recibo, no al final.
+"""
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from ..models import Payment
+from .pdf_render import cached_receipt, pool_size, receipt_html, store_receipt, submit_html
+
+
+def payments_between(start, end):
+    """Pagos entre dos fechas locales, ambas inclusive."""
+    return Payment.objects.filter(
+        date__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        date__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    ).select_related('user').order_by('date', 'id')
+
+
+def receipt_filename(payment):
+    local = timezone.localtime(payment.date)
+    return f"{local:%Y-%m-%d}_Recibo_Transaccion_{payment.id}.pdf"
+
+
+def iter_receipts(payments, executor=None, window=None, use_cache=True):
+    """
+    Genera (payment, pdf) a medida que cada recibo está listo (el orden puede
+    variar). pdf es None si la conversión falló.
+    `window` limita las conversiones en vuelo (por defecto 2 por proceso del
+    pool compartido). use_cache=False ignora y no escribe la caché en disco.
+    """
+    window = window or max(2, pool_size() * 2)
+    pending = {}
+
+    def collect(futures):
+        for future in futures:
+            payment, path = pending.pop(future)
+            try:
+                content = future.result()
+            except Exception:
+                content = None
+            if content and path is not None:
+                store_receipt(path, content)
+            yield payment, content
+
+    for payment in payments.iterator(chunk_size=200):
+        if use_cache:
+            html, path, content = cached_receipt(payment)
+            if content is not None:
+                yield payment, content
+                continue
+        else:
+            html, path = receipt_html(payment), None
+        pending[submit_html(html, executor)] = (payment, path)
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        yield from collect(done)
+
+
+class _ChunkBuffer:
+    """Destino de ZipFile sin seek: acumula lo escrito hasta que se retira."""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(receipts, on_progress=None):
+    """
+    Arma el ZIP a partir de (payment, pdf) y lo entrega por trozos (bytes).
+    Los recibos que no se pudieron generar se listan en ERRORES.txt.
+    on_progress(procesados, fallidos) se llama tras cada recibo.
+    """
+    buffer = _ChunkBuffer()
+    failed = []
+    done = 0
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for payment, content in receipts:
+            if content:
+                info = zipfile.ZipInfo(
+                    receipt_filename(payment),
+                    date_time=timezone.localtime(payment.date).timetuple()[:6],
+                )
+                info.compress_type = zipfile.ZIP_DEFLATED
+                zf.writestr(info, content)
+            else:
+                failed.append(payment.id)
+            done += 1
+            if on_progress:
+                on_progress(done, len(failed))
+            chunk = buffer.pop()
+            if chunk:
+                yield chunk
+        if failed:
+            zf.writestr('ERRORES.txt', 'No se pudo generar el recibo de los pagos: '
+                        + ', '.join(f'#{pid}' for pid in sorted(failed)) + '\n')
+    yield buffer.pop()
@@ -0,0 +1,197 @@
+"""
+Reportes en segundo plano (Excel/CSV de pagos y ZIP de recibos).
+
+El panel llama a request_report(): solo inserta un ReportJob. El comando
+process_report_jobs lo toma (SELECT ... FOR UPDATE SKIP LOCKED, como el outbox),
+genera el archivo en REPORTS_ROOT (bajo MEDIA_ROOT) y va dejando el avance en
+la fila para que el panel lo consulte. En Render el worker lo levanta start.sh
+en el mismo servicio web (los archivos quedan en su disco) y limpia los
+reportes antiguos cada hora.
+
+Payment es un historial inmutable (solo se agregan pagos), así que su estado
+en un rango se resume en (cantidad, id máximo, suma). Esa huella, junto al
+tipo y los parámetros, identifica el archivo: si ya existe un reporte con la
+misma huella se reutiliza en vez de generarlo de nuevo. Las membresías sí se
+modifican (estado, datos del socio) y no tienen fecha de modificación, por lo
+que los reportes por membresía siempre se regeneran.
+"""
+import hashlib
+import json
+import os
+import secrets
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from ..models import Payment, ReportJob
+from .outbox import skip_locked
+from .payment_export import export_count, stream_csv, write_xlsx
+from .receipt_bundle import iter_receipts, payments_between, stream_zip
+
+EXTENSIONS = {'excel': 'xlsx', 'csv': 'csv', 'recibos': 'zip'}
+CONTENT_TYPES = {
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'recibos': 'application/zip',
+}
+# Un reporte 'running' sin terminar después de esto se considera abandonado
+LEASE = timedelta(minutes=30)
+# Cada cuánto se guarda el avance en la BD como máximo
+PROGRESS_INTERVAL = 1.0  # segundos
+
+
+def storage():
+    """Archivos de reportes. Se descargan solo por descargar_reporte (con login)."""
+    location = getattr(settings, 'REPORTS_ROOT', os.path.join(settings.MEDIA_ROOT, 'reports'))
+    return FileSystemStorage(location=location)
+
+
+def clean_params(kind, params):
+    """Valida y normaliza los parámetros de un reporte. Lanza ValueError si no son válidos."""
+    if kind in ('excel', 'csv'):
+        origen = params.get('origen') or 'membresias'
+        if origen not in ('membresias', 'pagos'):
+            raise ValueError('Origen de exportación no válido')
+        return {'origen': origen}
+    if kind == 'recibos':
+        desde = date.fromisoformat(params['desde'])
+        hasta = date.fromisoformat(params['hasta'])
+        if desde > hasta:
+            raise ValueError('La fecha inicial no puede ser posterior a la final')
+        return {'desde': desde.isoformat(), 'hasta': hasta.isoformat()}
+    raise ValueError(f'Tipo de reporte desconocido: {kind}')
+
+
+def _payments(kind, params):
+    if kind == 'recibos':
+        return payments_between(date.fromisoformat(params['desde']), date.fromisoformat(params['hasta']))
+    return Payment.objects.all()
+
+
+def fingerprint(kind, params):
+    """Huella de los datos del reporte, o '' si no se puede reutilizar."""
+    if kind != 'recibos' and params.get('origen') != 'pagos':
+        return ''
+    state = _payments(kind, params).order_by().aggregate(n=Count('id'), last=Max('id'), total=Sum('amount'))
+    raw = json.dumps([kind, params, state['n'], state['last'], str(state['total'])], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def request_report(kind, params, user=None):
+    """
+    Pide un reporte. Retorna (job, reutilizado): si hay uno con la misma huella
+    pendiente, en curso o listo (con su archivo), se retorna ese.
+    """
+    params = clean_params(kind, params)
+    digest = fingerprint(kind, params)
+    if digest:
+        for job in ReportJob.objects.filter(fingerprint=digest, status__in=['pending', 'running', 'done']):
+            if job.status != 'done' or storage().exists(job.file_name):
+                return job, True
+    job = ReportJob.objects.create(kind=kind, params=params, requested_by=user, fingerprint=digest)
+    return job, False
+
+
+def claim_job():
+    """Reserva el reporte pendiente más antiguo (o uno abandonado) para este worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=skip_locked())
+            .filter(status='pending')
+            .order_by('created_at')
+            .first()
+        ) or (
+            ReportJob.objects.select_for_update(skip_locked=skip_locked())
+            .filter(status='running', started_at__lt=now - LEASE)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = now
+        job.progress = 0
+        job.save(update_fields=['status', 'started_at', 'progress'])
+    return job
+
+
+class _Progress:
+    """Guarda el avance en la fila del reporte, como mucho cada PROGRESS_INTERVAL."""
+
+    def __init__(self, job):
+        self.job = job
+        self._last = 0.0
+
+    def __call__(self, done, *args):
+        now = time.monotonic()
+        if now - self._last >= PROGRESS_INTERVAL:
+            self._last = now
+            ReportJob.objects.filter(pk=self.job.pk).update(progress=done)
+
+
+def _build(job, path, progress):
+    """Escribe el archivo del reporte en `path`."""
+    if job.kind == 'excel':
+        write_xlsx(job.params['origen'], path, on_progress=progress)
+    elif job.kind == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for line in stream_csv(job.params['origen'], on_progress=progress):
+                f.write(line)
+    else:
+        with open(path, 'wb') as f:
+            for chunk in stream_zip(iter_receipts(_payments(job.kind, job.params)), on_progress=progress):
+                f.write(chunk)
+
+
+def run_job(job):
+    """Genera el archivo del reporte y marca el resultado en la fila."""
+    if job.kind in ('excel', 'csv'):
+        total = export_count(job.params['origen'])
+    else:
+        total = _payments(job.kind, job.params).count()
+    # La huella se toma al empezar: el archivo contiene al menos esos pagos
+    digest = fingerprint(job.kind, job.params)
+    ReportJob.objects.filter(pk=job.pk).update(total=total, fingerprint=digest)
+
+    store = storage()
+    os.makedirs(store.location, exist_ok=True)
+    name = f"{job.kind}_{job.pk}_{secrets.token_hex(8)}.{EXTENSIONS[job.kind]}"
+    tmp = store.path(name + '.tmp')
+    try:
+        _build(job, tmp, _Progress(job))
+        os.replace(tmp, store.path(name))
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        ReportJob.objects.filter(pk=job.pk).update(
+            status='failed', error=f"{type(e).__name__}: {e}", finished_at=timezone.now()
+        )
+        return 'failed'
+    ReportJob.objects.filter(pk=job.pk).update(
+        status='done', file_name=name, progress=total, finished_at=timezone.now()
+    )
+    return 'done'
+
+
+def purge_old(days):
+    """Borra los reportes (y sus archivos) creados hace más de `days` días."""
+    limit = timezone.now() - timedelta(days=days)
+    store = storage()
+    old = ReportJob.objects.filter(created_at__lt=limit).exclude(status__in=['pending', 'running'])
+    for name in old.exclude(file_name='').values_list('file_name', flat=True):
+        store.delete(name)
+    return old.delete()[0]
+
+
+def job_filename(job):
+    """Nombre con el que se descarga el archivo del reporte."""
+    created = timezone.localtime(job.created_at)
+    if job.kind == 'recibos':
+        base = f"Recibos_{job.params['desde'].replace('-', '')}_{job.params['hasta'].replace('-', '')}"
+    else:
+        base = f'Reporte_{"Libro_Pagos" if job.params.get("origen") == "pagos" else "Pagos"}_{created:%Y%m%d}'
+    return f"{base}.{EXTENSIONS[job.kind]}"
@@ -0,0 +1,159 @@
+"""
+Listado de socios con su estado (plan activo, días restantes, último acceso).
+
+Antes el panel del moderador recorría todos los socios y, por cada uno, pedía
+su membresía activa, el plan y su último acceso: 2-3 consultas por socio.
+Aquí todo sale en una sola consulta anotada:
+
+- último acceso permitido: Subquery sobre AccessLog ordenada por timestamp,
+  que resuelve el índice (user, status, timestamp) con una lectura por socio
+- plan activo y su vencimiento: Subquery/OuterRef sobre Membership, con el
+  mismo criterio que CustomUser.get_active_membership()
+
+Sin JOIN ni GROUP BY sobre AccessLog, la BD aplica el LIMIT antes de evaluar
+las subconsultas: solo se calculan para los socios de la página. El listado se
+pagina en el servidor y el COUNT va sobre la búsqueda sin anotar.
+
+directory() es la misma consulta para la API JSON (api_socios), con
+paginación por cursor (keyset): la página siguiente se pide "después de
+(valor de orden, id)" en vez de con OFFSET, así cada página cuesta lo mismo
+aunque haya miles de socios y no se salta ni repite nadie si entran socios
+nuevos mientras se recorre.
+"""
+import base64
+import json
+from datetime import datetime
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+from ..models import AccessLog, CustomUser, Membership
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# orden -> (order_by, campo del cursor). El cursor guarda además first_name e id
+# para desempatar apellidos repetidos.
+SORTS = {
+    'recientes': (('-created_at', '-id'), 'created_at'),
+    'apellido': (('last_name', 'first_name', 'id'), 'last_name'),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def with_status(queryset, today=None):
+    """Anota last_access, active_plan_name y active_plan_end en un QuerySet de usuarios."""
+    today = today or timezone.localdate()
+    active = Membership.objects.filter(
+        user=OuterRef('pk'), is_active=True, end_date__gt=today
+    ).order_by('-created_at')
+    last_access = AccessLog.objects.filter(
+        user=OuterRef('pk'), status='allowed'
+    ).order_by('-timestamp').values('timestamp')[:1]
+    return queryset.annotate(
+        last_access=Subquery(last_access),
+        active_plan_name=Subquery(active.values('plan__name')[:1]),
+        active_plan_end=Subquery(active.values('end_date')[:1]),
+    )
+
+
+def _search(users, term):
+    for word in term.split():
+        users = users.filter(
+            Q(rut__icontains=word) | Q(first_name__icontains=word)
+            | Q(last_name__icontains=word) | Q(email__icontains=word)
+        )
+    return users
+
+
+def search_socios(term=''):
+    """Socios (más nuevos primero), filtrados por RUT, nombre o correo."""
+    return _search(CustomUser.objects.filter(role='socio'), term).order_by('-created_at', '-id')
+
+
+def status_row(socio, today=None):
+    """Fila del listado a partir de un socio anotado con with_status()."""
+    today = today or timezone.localdate()
+    return {
+        'user': socio,
+        'plan_name': socio.active_plan_name or 'Sin Plan Activo',
+        'status_class': 'active' if socio.is_active_member else 'inactive',
+        'status_text': 'Activo' if socio.is_active_member else 'Inactivo',
+        'dias_restantes': (socio.active_plan_end - today).days if socio.active_plan_end else 0,
+        'last_access': socio.last_access,
+    }
+
+
+def socio_page(page_number=1, term='', per_page=PAGE_SIZE, today=None):
+    """
+    Página del listado: (page, filas). Dos consultas: el COUNT sobre la búsqueda
+    sin anotar y la página anotada con with_status().
+    """
+    today = today or timezone.localdate()
+    page = Paginator(search_socios(term), per_page).get_page(page_number)
+    start = (page.number - 1) * per_page
+    page.object_list = with_status(search_socios(term), today)[start:start + per_page]
+    return page, [status_row(socio, today) for socio in page.object_list]
+
+
+# ==================== API DE DIRECTORIO (KEYSET) ====================
+
+def encode_cursor(user, sort):
+    field = SORTS[sort][1]
+    value = getattr(user, field)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, user.first_name, user.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    try:
+        value, first_name, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if SORTS[sort][1] == 'created_at':
+            value = datetime.fromisoformat(value)
+        return value, first_name, int(pk)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Cursor inválido') from e
+
+
+def _after(sort, cursor):
+    """Filtro "después del cursor" coherente con el order_by del orden."""
+    value, first_name, pk = cursor
+    if sort == 'recientes':
+        return Q(created_at__lt=value) | Q(created_at=value, id__lt=pk)
+    return (
+        Q(last_name__gt=value)
+        | Q(last_name=value, first_name__gt=first_name)
+        | Q(last_name=value, first_name=first_name, id__gt=pk)
+    )
+
+
+def directory(role='socio', active=None, plan_id=None, term='', sort='recientes',
+              cursor=None, limit=PAGE_SIZE, today=None):
+    """
+    Una página del directorio: (usuarios anotados con with_status(), cursor siguiente o None).
+    Filtros: rol, activo (is_active_member), plan (membresía activa de ese plan) y texto.
+    Una consulta: el filtro del cursor y el LIMIT van sobre columnas de
+    CustomUser y las subconsultas de with_status() solo corren para esas filas.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Orden desconocido: {sort}")
+    today = today or timezone.localdate()
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    users = _search(CustomUser.objects.filter(role=role, is_superuser=False), term)
+    if active is not None:
+        users = users.filter(is_active_member=active)
+    if plan_id:
+        users = users.filter(Exists(Membership.objects.filter(
+            user=OuterRef('pk'), plan_id=plan_id, is_active=True, end_date__gt=today
+        )))
+    if cursor:
+        users = users.filter(_after(sort, decode_cursor(cursor, sort)))
+
+    page = list(with_status(users, today).order_by(*SORTS[sort][0])[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1], sort) if len(page) > limit else None
+    return page[:limit], next_cursor
@@ -0,0 +1,104 @@
+"""
+Series de tiempo para los gráficos (Chart.js).
+
+La agregación por mes/día se hace en la BD con TruncMonth/TruncDay + Sum/Count,
+así solo viajan a Python unas pocas filas (una por período) sin importar cuántos
+pagos o accesos haya. El relleno con ceros de los períodos vacíos se hace aquí.
+"""
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth
+from django.utils import timezone
+
+MONTH_LABELS = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+
+def _local_midnight(d):
+    """Inicio del día local (America/Santiago) como datetime aware."""
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def _period_key(value, period):
+    """Normaliza el valor truncado (date o datetime aware) a la fecha local del período."""
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date()
+    return value.replace(day=1) if period == 'month' else value
+
+
+def _period_starts(start, end, period):
+    """Todos los períodos en [start, end), incluidos los que no tienen datos."""
+    current = start.replace(day=1) if period == 'month' else start
+    while current < end:
+        yield current
+        if period == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=1)
+
+
+def _grouped_rows(queryset, date_field, period, aggregate):
+    """Filas (período_truncado, valor) calculadas en la BD."""
+    if connections[queryset.db].vendor == 'mysql':
+        # MySQL/MariaDB necesita las tablas de zonas horarias cargadas para
+        # CONVERT_TZ (XAMPP no las trae). Agrupamos por hora UTC, que no requiere
+        # conversión, y acumulamos en días/meses locales en Python. Chile usa
+        # offsets de horas enteras, así que cada hora cae completa en un día local.
+        bucket = TruncHour(date_field, tzinfo=dt_timezone.utc)
+    else:
+        bucket = TruncMonth(date_field) if period == 'month' else TruncDay(date_field)
+
+    rows = queryset.order_by().annotate(bucket=bucket).values('bucket').annotate(value=aggregate)
+    return [(row['bucket'], row['value']) for row in rows]
+
+
+def bucket_totals(queryset, date_field, start, end, period='month', aggregate=None):
+    """
+    Agrega `queryset` por mes o día local entre `start` (incluido) y `end` (excluido).
+
+    Retorna {inicio_del_período: valor} solo con los períodos que tienen datos.
+    Por defecto cuenta filas; para montos pasar p. ej. aggregate=Sum('amount').
+    """
+    if period not in ('month', 'day'):
+        raise ValueError("period debe ser 'month' o 'day'")
+    if aggregate is None:
+        aggregate = Count('pk')
+
+    queryset = queryset.filter(**{
+        f'{date_field}__gte': _local_midnight(start),
+        f'{date_field}__lt': _local_midnight(end),
+    })
+
+    totals = {}
+    for bucket, value in _grouped_rows(queryset, date_field, period, aggregate):
+        if bucket is None:
+            continue
+        key = _period_key(bucket, period)
+        totals[key] = totals.get(key, 0) + (value or 0)
+    return totals
+
+
+def time_series(queryset, date_field, start, end, period='month', aggregate=None):
+    """
+    Igual que bucket_totals, pero retorna (labels, data) listos para Chart.js,
+    con ceros en los períodos vacíos.
+    """
+    totals = bucket_totals(queryset, date_field, start, end, period, aggregate)
+
+    labels, data = [], []
+    for period_start in _period_starts(start, end, period):
+        if period == 'month':
+            labels.append(MONTH_LABELS[period_start.month - 1])
+        else:
+            labels.append(period_start.strftime('%d/%m'))
+        value = totals.get(period_start, 0)
+        data.append(float(value) if isinstance(value, Decimal) else value)
+    return labels, data
+
+
+def current_year_months(today):
+    """Rango [1 de enero, inicio del mes siguiente): meses del año hasta el actual."""
+    start = date(today.year, 1, 1)
+    end = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    return start, end
@@ -3,6 +3,20 @@ let isScanning = false;
 let debugMode = false;
 let scanAttempts = 0;
 
+// Cola de escaneos hechos sin conexión (se envían en lote al volver la red)
+const OFFLINE_QUEUE_KEY = 'qrOfflineScans';
+const OFFLINE_BATCH_SIZE = 500;
+// Reintentos del envío: espera creciente (1 s, 2 s, 4 s... hasta 5 min)
+const FLUSH_MIN_DELAY = 1000;
+const FLUSH_MAX_DELAY = 5 * 60 * 1000;
+let flushingQueue = false;
+let flushDelay = FLUSH_MIN_DELAY;
+let nextFlushAt = 0;
+// Error permanente (sesión vencida, sin permisos, lote rechazado): no se reintenta
+let flushStoppedReason = null;
+
+class PermanentFlushError extends Error {}
+
 // Función para agregar logs de debug
 function addDebugLog(message, type = 'info') {
     if (!debugMode) return;
@@ -161,6 +175,21 @@ function processQR(qrData) {
     .catch(error => {
         addDebugLog(`✗ Error: ${error.message}`, 'error');
         console.error('Error completo:', error);
+
+        // Sin red (fetch rechazado): guardar el escaneo con su hora para enviarlo después
+        if (error instanceof TypeError) {
+            enqueueOfflineScan(qrData);
+            showResult({
+                allowed: false,
+                name: 'Sin conexión',
+                rut: 'N/A',
+                plan: '-',
+                expiry: '-',
+                time: new Date().toLocaleTimeString('es-CL'),
+                error: `Escaneo guardado, se validará al volver la conexión (${getOfflineQueue().length} pendientes)`
+            });
+            return;
+        }
         
         // Mostrar error en pantalla
         showResult({
@@ -180,6 +209,110 @@ function processQR(qrData) {
     });
 }
 
+// ==================== COLA SIN CONEXIÓN ====================
+
+function getOfflineQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(OFFLINE_QUEUE_KEY)) || [];
+    } catch {
+        return [];
+    }
+}
+
+function saveOfflineQueue(queue) {
+    localStorage.setItem(OFFLINE_QUEUE_KEY, JSON.stringify(queue));
+}
+
+function enqueueOfflineScan(qrData) {
+    const queue = getOfflineQueue();
+    queue.push({
+        id: `${Date.now()}-${Math.random().toString(36).slice(2, 8)}`,
+        qr_data: qrData,
+        scanned_at: new Date().toISOString()
+    });
+    saveOfflineQueue(queue);
+    addDebugLog(`Escaneo en cola sin conexión (${queue.length} pendientes)`, 'error');
+}
+
+function scheduleFlush(delay) {
+    nextFlushAt = Date.now() + delay;
+    setTimeout(() => flushOfflineQueue(true), delay);
+}
+
+async function flushOfflineQueue(scheduled = false) {
+    if (flushingQueue || flushStoppedReason || !navigator.onLine) return;
+    if (scheduled !== true && Date.now() < nextFlushAt) return;  // Esperando el próximo reintento
+    const batch = getOfflineQueue().slice(0, OFFLINE_BATCH_SIZE);
+    if (batch.length === 0) return;
+
+    flushingQueue = true;
+    let retryIn = FLUSH_MIN_DELAY;
+    try {
+        const response = await fetch('/api/process-qr-scan/batch/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ scans: batch })
+        });
+        const isJson = (response.headers.get('Content-Type') || '').includes('application/json');
+        // Sesión vencida: el login redirige y responde HTML
+        if (response.redirected || (response.ok && !isJson)) {
+            throw new PermanentFlushError('la sesión expiró, vuelve a iniciar sesión');
+        }
+        // 4xx (salvo 408/429) no se arregla reintentando: sin permisos o lote rechazado
+        if (response.status >= 400 && response.status < 500 && ![408, 429].includes(response.status)) {
+            const data = isJson ? await response.json().catch(() => ({})) : {};
+            throw new PermanentFlushError(data.error || `HTTP ${response.status}`);
+        }
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+
+        // Quitar de la cola solo lo que el servidor procesó
+        const sent = new Set(batch.map(scan => scan.id));
+        saveOfflineQueue(getOfflineQueue().filter(scan => !sent.has(scan.id)));
+        addDebugLog(`✓ Lote enviado: ${data.summary.allowed} permitidos, ${data.summary.denied} denegados, ${data.summary.invalid} inválidos`, 'success');
+        flushDelay = FLUSH_MIN_DELAY;
+    } catch (error) {
+        if (error instanceof PermanentFlushError) {
+            flushStoppedReason = error.message;
+            const pending = getOfflineQueue().length;
+            addDebugLog(`✗ Envío de la cola detenido: ${error.message}`, 'error');
+            showResult({
+                allowed: false,
+                name: 'Escaneos sin conexión pendientes',
+                rut: 'N/A',
+                plan: '-',
+                expiry: '-',
+                time: new Date().toLocaleTimeString('es-CL'),
+                error: `No se pudieron enviar ${pending} escaneos: ${error.message}. Recarga la página para reintentar.`
+            });
+            return;
+        }
+        // TypeError = fetch sin red; 5xx o respuesta inválida: también se reintenta, esperando cada vez más
+        const reason = error instanceof TypeError ? 'sin conexión' : error.message;
+        retryIn = flushDelay;
+        flushDelay = Math.min(flushDelay * 2, FLUSH_MAX_DELAY);
+        addDebugLog(`✗ No se pudo enviar la cola (${reason}), reintento en ${Math.round(retryIn / 1000)} s`, 'error');
+    } finally {
+        flushingQueue = false;
+    }
+
+    if (getOfflineQueue().length > 0) {
+        scheduleFlush(retryIn);
+    }
+}
+
+// Al volver la red se reintenta de inmediato, sin esperar el backoff acumulado
+window.addEventListener('online', () => {
+    flushDelay = FLUSH_MIN_DELAY;
+    nextFlushAt = 0;
+    flushOfflineQueue();
+});
+window.addEventListener('DOMContentLoaded', flushOfflineQueue);
+setInterval(flushOfflineQueue, 30000);
+
 function formatDate(dateString) {
     try {
         const date = new Date(dateString);
@@ -160,7 +160,6 @@ function setupSearch(inputId, rowClass, noResultsId, originalEmptyId) {
     });
 }
 
-setupSearch('searchSocioInput', 'searchable-socio-row', 'search-socio-no-results', 'no-socios-row');
 // 1. Configurar búsqueda de Socios
 setupSearch('searchInput', 'searchable-row', 'search-no-results', 'no-results-row');
 
@@ -364,4 +363,164 @@ function filterPayments() {
             row.style.display = "none"; // Ocultar
         }
     }
-}
\ No newline at end of file
+}
+
+// ==================== REPORTES EN SEGUNDO PLANO ====================
+// Pide el reporte al servidor (lo genera el worker process_report_jobs),
+// consulta su estado cada 2 segundos y lo descarga al terminar.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const statusEl = document.getElementById('reportJobStatus');
+    if (!statusEl) return;
+
+    document.querySelectorAll('[data-report-kind]').forEach(button => {
+        button.addEventListener('click', async function() {
+            const params = { kind: this.dataset.reportKind };
+            if (this.dataset.reportOrigen) params.origen = this.dataset.reportOrigen;
+
+            const form = this.closest('form');
+            if (form) {
+                if (!form.reportValidity()) return;
+                params.desde = form.querySelector('[name=desde]').value;
+                params.hasta = form.querySelector('[name=hasta]').value;
+            }
+
+            button.disabled = true;
+            statusEl.textContent = 'Solicitando reporte...';
+            try {
+                const response = await fetch('/management/reports/', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+                    },
+                    body: JSON.stringify(params)
+                });
+                const data = await response.json();
+                if (!data.success) throw new Error(data.message);
+                await pollReportJob(data.job, statusEl);
+            } catch (error) {
+                statusEl.textContent = 'Error: ' + error.message;
+            } finally {
+                button.disabled = false;
+            }
+        });
+    });
+});
+
+async function pollReportJob(job, statusEl) {
+    while (job.status === 'pending' || job.status === 'running') {
+        const avance = job.total ? ` ${job.progress}/${job.total}` : '';
+        statusEl.textContent = `Reporte #${job.id}: ${job.status_display}${avance}`;
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const response = await fetch(`/management/reports/${job.id}/`);
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message);
+        job = data.job;
+    }
+    if (job.status === 'failed') throw new Error(job.error || 'No se pudo generar el reporte');
+    statusEl.textContent = `Reporte #${job.id} listo`;
+    window.location.href = job.download_url;
+}
+
+// ==================== DIRECTORIO DE SOCIOS (CARGA A DEMANDA) ====================
+// La tabla de socios se llena desde /api/socios/ de a 25 filas. Búsqueda,
+// filtros y orden se resuelven en el servidor; "Cargar más" sigue el cursor.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const tbody = document.getElementById('sociosTbody');
+    if (!tbody) return;
+
+    const searchInput = document.getElementById('searchSocioInput');
+    const estadoFilter = document.getElementById('socioEstadoFilter');
+    const planFilter = document.getElementById('socioPlanFilter');
+    const ordenSelect = document.getElementById('socioOrden');
+    const loadMoreBtn = document.getElementById('loadMoreSocios');
+    let nextCursor = null;
+    let requestId = 0;
+
+    function statusRow(text) {
+        const row = document.createElement('tr');
+        row.id = 'socios-status-row';
+        const cell = document.createElement('td');
+        cell.colSpan = 5;
+        cell.style.cssText = 'text-align: center; padding: 2rem; color: var(--text-secondary);';
+        cell.textContent = text;
+        row.appendChild(cell);
+        return row;
+    }
+
+    function socioRow(socio) {
+        const row = document.createElement('tr');
+        const activo = socio.is_active_member;
+        row.innerHTML = `
+            <td><strong></strong><div style="font-size: 0.8rem; color: var(--text-secondary);"></div></td>
+            <td></td>
+            <td>
+                <span class="status-badge ${activo ? 'active' : 'expired'}">
+                    <i class='bx ${activo ? 'bx-check-circle' : 'bx-x-circle'}'></i> ${activo ? 'Activo' : 'Inactivo'}
+                </span>
+            </td>
+            <td>${socio.dias_restantes > 0
+                ? `<span style="color: var(--success-color);">${socio.dias_restantes} días</span>`
+                : '<span style="color: var(--danger-color);">Vencido</span>'}</td>
+            <td>
+                <div class="action-buttons">
+                    <a class="btn-icon view" title="Ver detalles"><i class='bx bx-show'></i></a>
+                    <a class="btn-icon edit" title="Editar"><i class='bx bx-edit'></i></a>
+                    <button class="btn-icon delete" title="Eliminar"><i class='bx bx-trash'></i></button>
+                </div>
+            </td>`;
+        // Datos del socio como texto (nunca como HTML)
+        row.querySelector('strong').textContent = socio.full_name;
+        row.querySelector('td div').textContent = socio.rut;
+        row.children[1].textContent = socio.plan_name || 'Sin plan';
+        row.querySelector('.view').href = socio.detail_url;
+        row.querySelector('.edit').href = socio.edit_url;
+        row.querySelector('.delete').addEventListener('click', () => showDeleteModal(socio.id, socio.full_name, socio.rut));
+        return row;
+    }
+
+    async function loadSocios(append) {
+        const params = new URLSearchParams({ rol: 'socio', orden: ordenSelect.value });
+        if (searchInput.value.trim()) params.set('q', searchInput.value.trim());
+        if (estadoFilter.value) params.set('activo', estadoFilter.value);
+        if (planFilter.value) params.set('plan', planFilter.value);
+        if (append && nextCursor) params.set('cursor', nextCursor);
+
+        const current = ++requestId;
+        loadMoreBtn.disabled = true;
+        try {
+            const response = await fetch(`${tbody.dataset.url}?${params}`);
+            const data = await response.json();
+            if (current !== requestId) return;  // Llegó una respuesta más nueva
+            if (!data.success) throw new Error(data.error);
+
+            if (!append) tbody.innerHTML = '';
+            data.results.forEach(socio => tbody.appendChild(socioRow(socio)));
+            if (!tbody.children.length) {
+                tbody.appendChild(statusRow(params.has('q') || params.has('activo') || params.has('plan')
+                    ? 'No se encontraron socios con esos datos.'
+                    : 'No hay socios registrados.'));
+            }
+            nextCursor = data.next_cursor;
+            loadMoreBtn.style.display = nextCursor ? '' : 'none';
+        } catch (error) {
+            if (current !== requestId) return;
+            tbody.innerHTML = '';
+            tbody.appendChild(statusRow('Error al cargar socios: ' + error.message));
+        } finally {
+            loadMoreBtn.disabled = false;
+        }
+    }
+
+    let searchTimer = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => loadSocios(false), 300);
+    });
+    [estadoFilter, planFilter, ordenSelect].forEach(el => el.addEventListener('change', () => loadSocios(false)));
+    loadMoreBtn.addEventListener('click', () => loadSocios(true));
+
+    loadSocios(false);
+});
@@ -249,8 +249,8 @@ window.onclick = function(event) {
 }
 
 function downloadBase64QR(filename) {
-    const img = document.querySelector('.qr-image'); // Selecciona la imagen generada
-    if (img && img.src.startsWith('data:image')) {
+    const img = document.querySelector('.qr-image'); // Imagen servida por /qr/<id>.png
+    if (img && img.src) {
         const link = document.createElement('a');
         link.href = img.src;
         link.download = filename + '.png';
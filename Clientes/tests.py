@@ -1,3 +1,998 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+from concurrent.futures import Future
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.contrib.auth import authenticate
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncHour
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import load_workbook
+from django.utils import timezone
+from .models import CustomUser, Plan, Membership, AccessLog, Payment
+from .services.dashboard_service import AdminDashboardService
+from .services.socio_directory import socio_page
+from .services.member_search import search_members
+from .services.attendance import attendance_streaks, daily_attendance_histogram, rebuild_rollups
+from .services.timeseries import time_series
+from .views.access_views import ingest_scans
+from . import admission_cache
+from . import login_throttle
+from . import qr_token
+from . import rut as rut_utils
+from . import user_cache
+from . import middleware as sql_profiler
+from .services import qr_render
+from .services import outbox
+from .services import pdf_render
+from .services import report_jobs
+from .services.bulk_mailer import BulkMailer, campaign_messages
+from django.core import mail
+from .models import DailyAttendanceRollup, OutboxMessage, ReportJob
+from .utils import generate_pdf_receipt
+from .backends import RUTorEmailBackend, lookup_field
+from .forms import CustomUserCreationForm
 
-# Create your tests here.
+
+class DashboardQueryCountTests(TestCase):
+    """Regresiones de cantidad de consultas en el panel de administrador."""
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = Plan.objects.create(
+            name='Plan Test', plan_type='basico', description='-', price=20000,
+            duration_days=30, access_days='Todos los días'
+        )
+        today = timezone.now().date()
+        for i in range(5):
+            socio = CustomUser.objects.create_user(
+                username=f'socio{i}', rut=f'1000000{i}-{i}', password='x',
+                first_name='Socio', last_name=str(i), role='socio'
+            )
+            Membership.objects.create(
+                user=socio, plan=plan, start_date=today - timedelta(days=25),
+                payment_method='efectivo', amount_paid=plan.price
+            )
+            Payment.objects.create(
+                user=socio, plan=plan, user_backup_name=socio.get_full_name(),
+                user_backup_rut=socio.rut, plan_backup_name=plan.name,
+                amount=plan.price, payment_method='efectivo'
+            )
+            AccessLog.objects.create(user=socio, status='allowed')
+            AccessLog.objects.create(user=socio, status='allowed', timestamp=timezone.now() - timedelta(days=1))
+        rebuild_rollups(timezone.localdate() - timedelta(days=1), timezone.localdate())
+
+    def test_get_kpis_una_consulta_por_tabla(self):
+        # CustomUser, Membership, AccessLog y Payment. Un KPI nuevo debe sumarse
+        # como agregado condicional a una de estas consultas, no como otra más.
+        with self.assertNumQueries(4):
+            kpis = AdminDashboardService().get_kpis()
+
+        self.assertEqual(kpis['usuarios_activos'], 5)
+        self.assertEqual(kpis['accesos_hoy'], 5)
+        self.assertEqual(kpis['planes_por_vencer'], 5)
+        self.assertEqual(kpis['ingresos_anuales'], 100000)
+
+    def test_listas_de_socios_sin_n_mas_1(self):
+        # Los conteos salen de un solo agregado; la tabla de socios la pide el panel a api_socios
+        service = AdminDashboardService()
+        with self.assertNumQueries(1):
+            stats = service.get_user_stats()
+        self.assertEqual((stats['total_socios'], stats['socios_activos'], stats['socios_inactivos']), (5, 5, 0))
+
+        AccessLog.objects.filter(timestamp__gte=service.start_of_day).delete()
+        rebuild_rollups(service.now_chile.date(), service.now_chile.date())
+        with self.assertNumQueries(4):
+            details = service.get_attendance_details()
+            self.assertEqual(details['total_ausentes'], 5)
+
+    def test_listado_del_moderador_en_una_consulta_por_pagina(self):
+        # Plan activo, días restantes y último acceso salen anotados: COUNT + página
+        with CaptureQueriesContext(connection) as queries:
+            page, filas = socio_page(1, per_page=3)
+        self.assertEqual((page.paginator.count, len(filas)), (5, 3))
+        conteo, pagina = [q['sql'].upper() for q in queries.captured_queries]
+        self.assertNotIn('CLIENTES_ACCESSLOG', conteo)
+        self.assertNotIn('GROUP BY', pagina)
+        self.assertEqual(filas[0]['plan_name'], 'Plan Test')
+        fin = Membership.objects.get(user=filas[0]['user']).end_date
+        self.assertEqual(filas[0]['dias_restantes'], (fin - timezone.localdate()).days)
+        self.assertIsNotNone(filas[0]['last_access'])
+
+        page, filas = socio_page(1, term='Socio 4')
+        self.assertEqual([f['user'].username for f in filas], ['socio4'])
+
+    def test_api_socios_por_cursor_y_filtros(self):
+        admin = CustomUser.objects.create_user(username='adm', rut='5126663-3', password='x', role='admin')
+        self.client.force_login(admin)
+        url = reverse('api_socios')
+
+        self.client.get(url)  # deja request.user en la caché de sesión
+        vistos, cursor = [], ''
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url, {'orden': 'apellido', 'limite': 2, 'cursor': cursor}).json()
+            # Sesión y la página; la página no agrupa AccessLog antes del LIMIT
+            self.assertEqual(len(queries), 2)
+            self.assertNotIn('GROUP BY', queries.captured_queries[-1]['sql'].upper())
+            vistos += [r['full_name'] for r in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(vistos, [f'Socio {i}' for i in range(5)])
+        self.assertIsNone(cursor)
+
+        Membership.objects.filter(user__username='socio0').update(is_active=False)
+        CustomUser.objects.filter(username='socio0').update(is_active_member=False)
+        plan = Plan.objects.get()
+        data = self.client.get(url, {'activo': '1', 'plan': plan.id}).json()
+        self.assertEqual(len(data['results']), 4)
+        self.assertEqual(data['results'][0]['plan_name'], 'Plan Test')
+        self.assertEqual(self.client.get(url, {'cursor': 'basura'}).status_code, 400)
+
+        moderador = CustomUser.objects.create_user(username='mod', rut='6126663-3', password='x', role='moderador')
+        self.client.force_login(moderador)
+        self.assertEqual(self.client.get(url, {'rol': 'admin'}).status_code, 403)
+        self.assertIn('/moderador/', self.client.get(url).json()['results'][0]['detail_url'])
+
+
+class BenchmarkIndicesGuardTests(TestCase):
+
+    @override_settings(DEBUG=False)
+    def test_no_siembra_sin_confirmar_fuera_de_desarrollo(self):
+        with mock.patch('Clientes.management.commands.benchmark_indices.Command.sembrar') as sembrar:
+            with self.assertRaisesMessage(CommandError, '--confirmar'):
+                call_command('benchmark_indices', stdout=StringIO())
+            with self.assertRaisesMessage(CommandError, '--confirmar'):
+                call_command('benchmark_indices', limpiar=True, stdout=StringIO())
+        sembrar.assert_not_called()
+        self.assertFalse(CustomUser.objects.exists())
+
+
+class TimeSeriesTests(TestCase):
+    """Agregación por día/mes local con relleno de ceros (gráficos de ingresos)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        local = lambda *args: timezone.make_aware(datetime(*args))
+        # 23:30 del 31/01 en Chile ya es 01/02 en UTC: debe contar en enero
+        for fecha, monto in [
+            (local(2025, 1, 2, 10, 0), 1000),
+            (local(2025, 1, 2, 18, 0), 500),
+            (local(2025, 1, 31, 23, 30), 2000),
+            (local(2025, 2, 1, 0, 30), 300),
+            (local(2025, 3, 15, 12, 0), 700),
+        ]:
+            Payment.objects.create(
+                user_backup_name='Socio', user_backup_rut='11111111-1', plan_backup_name='Plan',
+                amount=monto, payment_method='efectivo', date=fecha
+            )
+
+    def series(self, start, end, period):
+        return time_series(Payment.objects.all(), 'date', start, end, period, aggregate=Sum('amount'))
+
+    def assert_series(self):
+        self.assertEqual(
+            self.series(date(2025, 1, 1), date(2025, 5, 1), 'month'),
+            (['Ene', 'Feb', 'Mar', 'Abr'], [3500.0, 300.0, 700.0, 0])
+        )
+        self.assertEqual(
+            self.series(date(2025, 1, 30), date(2025, 2, 3), 'day'),
+            (['30/01', '31/01', '01/02', '02/02'], [0, 2000.0, 300.0, 0])
+        )
+        # Sin aggregate cuenta filas
+        self.assertEqual(
+            time_series(Payment.objects.all(), 'date', date(2025, 1, 1), date(2025, 1, 4), 'day'),
+            (['01/01', '02/01', '03/01'], [0, 2, 0])
+        )
+
+    def test_relleno_con_ceros_y_periodos_locales(self):
+        self.assert_series()
+
+    def test_mysql_agrupa_por_hora_utc_y_acumula_en_dias_locales(self):
+        # En MySQL se agrupa por hora UTC (sin CONVERT_TZ); el resultado debe ser el mismo
+        mysql = {'default': mock.Mock(vendor='mysql')}
+        with mock.patch('Clientes.services.timeseries.connections', mysql), \
+                mock.patch('Clientes.services.timeseries.TruncHour', wraps=TruncHour) as trunc_hour:
+            self.assert_series()
+        self.assertTrue(trunc_hour.called)
+
+
+class DailyAttendanceHistogramTests(TestCase):
+
+    def test_dias_locales_con_ceros_en_una_consulta(self):
+        socio = CustomUser.objects.create_user(username='histo', rut='6666666-6', password='x', role='socio')
+        hoy = date(2025, 1, 10)
+        local = lambda d, h, m=0: timezone.make_aware(datetime(d.year, d.month, d.day, h, m))
+        # 23:30 del día 8 en Chile es el 9 en UTC: cuenta el 8
+        for momento, estado in [
+            (local(hoy, 9), 'allowed'),
+            (local(hoy - timedelta(days=2), 23, 30), 'allowed'),
+            (local(hoy - timedelta(days=2), 8), 'allowed'),
+            (local(hoy - timedelta(days=2), 9), 'denied'),
+            (local(hoy - timedelta(days=9), 12), 'allowed'),  # fuera de la ventana
+        ]:
+            AccessLog.objects.create(user=socio, status=estado, timestamp=momento)
+        rebuild_rollups(hoy - timedelta(days=10), hoy)
+
+        with self.assertNumQueries(1):
+            labels, data = daily_attendance_histogram(days=7, today=hoy)
+        self.assertEqual(labels, ['04/01', '05/01', '06/01', '07/01', '08/01', '09/01', '10/01'])
+        self.assertEqual(data, [0, 0, 0, 0, 2, 0, 1])
+        self.assertEqual(daily_attendance_histogram(days=3, today=hoy, status='denied')[1], [1, 0, 0])
+
+
+class AttendanceStreakTests(TestCase):
+
+    def test_racha_de_mas_de_30_dias_en_una_consulta(self):
+        socio = CustomUser.objects.create_user(username='racha', rut='2222222-2', password='x', role='socio')
+        now = timezone.localtime(timezone.now()).replace(hour=12)
+        # 45 días seguidos terminando ayer, un hueco y 3 días más antiguos
+        for days_ago in list(range(1, 46)) + [47, 48, 49]:
+            AccessLog.objects.create(user=socio, status='allowed', timestamp=now - timedelta(days=days_ago))
+        rebuild_rollups(now.date() - timedelta(days=60), now.date())
+
+        with self.assertNumQueries(1):
+            streaks = attendance_streaks(socio, today=now.date())
+
+        self.assertEqual(streaks['current'], 45)
+        self.assertEqual(streaks['longest'], 45)
+        # 48 días con acceso en los 50 desde el primero
+        self.assertEqual(streaks['weekly_frequency'], 6.7)
+
+        self.client.force_login(socio, backend='Clientes.backends.RUTorEmailBackend')
+        panel = self.client.get(reverse('index_socio'))
+        self.assertEqual(panel.context['weekly_frequency'], 6.7)
+        self.assertContains(panel, 'Promedio: 6,7 por semana')
+
+
+class AttendanceRollupTests(TestCase):
+    """El resumen diario mantenido en línea coincide con el reconstruido desde AccessLog."""
+
+    def resumen(self):
+        return sorted(DailyAttendanceRollup.objects.values_list('date', 'scope', 'user_id', 'plan_id', 'allowed', 'denied'))
+
+    def test_escaneos_y_borrados_mantienen_el_resumen(self):
+        plan = Plan.objects.create(
+            name='Plan Resumen', plan_type='basico', description='-', price=20000,
+            duration_days=30, access_days='Todos los días'
+        )
+        socio = CustomUser.objects.create_user(username='resumen', rut='5555555-5', password='x', role='socio')
+        membresia = Membership.objects.create(
+            user=socio, plan=plan, start_date=timezone.localdate() - timedelta(days=5),
+            payment_method='efectivo', amount_paid=plan.price
+        )
+        socio.refresh_from_db()
+        ayer = timezone.localtime(timezone.now()).replace(hour=12) - timedelta(days=1)
+
+        # Escaneo en línea (hoy) y lote sin conexión (ayer)
+        self.client.post(reverse('process_qr_scan'), {'qr_data': socio.get_qr_data()}, content_type='application/json')
+        ingest_scans([{'id': '1', 'qr_data': socio.get_qr_data(), 'scanned_at': ayer.isoformat()}])
+        hoy = timezone.localdate()
+        for day in (hoy, ayer.date()):
+            self.assertEqual(
+                set(DailyAttendanceRollup.objects.filter(date=day).values_list('scope', 'user_id', 'plan_id', 'allowed')),
+                {('total', None, None, 1), ('user', socio.id, None, 1), ('plan', None, plan.id, 1)}
+            )
+
+        en_linea = self.resumen()
+        rebuild_rollups(ayer.date(), hoy)
+        self.assertEqual(self.resumen(), en_linea)
+
+        # Borrar el acceso de ayer recalcula ese día (ya sin accesos)
+        AccessLog.objects.get(timestamp__date=ayer.date(), membership=membresia).delete()
+        self.assertFalse(DailyAttendanceRollup.objects.filter(date=ayer.date()).exists())
+        self.assertEqual(
+            [r for r in self.resumen() if r[0] == hoy], [r for r in en_linea if r[0] == hoy]
+        )
+
+    def test_borrados_recalculan_sin_restar_por_fila(self):
+        otro = CustomUser.objects.create_user(username='resumen2', rut='6666666-6', password='x', role='socio')
+        socio = CustomUser.objects.create_user(username='resumen3', rut='7777777-7', password='x', role='socio')
+        ahora = timezone.localtime(timezone.now()).replace(hour=12)
+        # Accesos creados por fuera de record_access (admin, poblar_db): nunca sumaron al resumen
+        for user in (otro, socio, socio):
+            AccessLog.objects.create(user=user, status='allowed', timestamp=ahora)
+        AccessLog.objects.create(user=socio, status='denied', timestamp=ahora - timedelta(days=1))
+
+        # Un borrado masivo recalcula cada día afectado una vez, no un UPDATE por fila
+        with self.assertNumQueries(9):
+            AccessLog.objects.filter(user=socio, status='allowed').delete()
+        total = DailyAttendanceRollup.objects.get(scope='total', date=ahora.date())
+        self.assertEqual((total.allowed, total.denied), (1, 0))
+
+        # Borrar al socio: la cascada es un DELETE directo y sus días se recalculan
+        socio.delete()
+        self.assertFalse(DailyAttendanceRollup.objects.filter(date=ahora.date() - timedelta(days=1)).exists())
+        self.assertEqual(
+            self.resumen(),
+            [(ahora.date(), 'total', None, None, 1, 0), (ahora.date(), 'user', otro.id, None, 1, 0)]
+        )
+
+
+@override_settings(ADMISSION_CACHE_ALLOW_LOCAL=True)
+class AdmissionCacheTests(TestCase):
+    """process_qr_scan con la caché de admisión."""
+
+    def setUp(self):
+        cache.clear()
+        self.plan = Plan.objects.create(
+            name='Plan Escáner', plan_type='basico', description='-', price=20000,
+            duration_days=30, access_days='Todos los días'
+        )
+        self.socio = CustomUser.objects.create_user(username='scan', rut='4444444-4', password='x', role='socio')
+        # Membresía vencida hace 10 días
+        Membership.objects.create(
+            user=self.socio, plan=self.plan, start_date=timezone.localdate() - timedelta(days=40),
+            payment_method='efectivo', amount_paid=self.plan.price
+        )
+        self.socio.refresh_from_db()
+
+    def scan(self):
+        return self.client.post(
+            reverse('process_qr_scan'), {'qr_data': self.socio.get_qr_data()}, content_type='application/json'
+        )
+
+    def test_acierto_invalidacion_y_entrada_repetida(self):
+        self.assertEqual(self.scan().json()['status'], 'denied')
+
+        # Acierto: no se vuelven a leer usuario ni membresías, solo se escribe
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.scan().json()['status'], 'denied')
+        lecturas = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in lecturas if 'customuser' in sql or 'membership' in sql])
+
+        # La renovación (Membership.save) invalida la entrada: el siguiente escaneo entra
+        Membership.objects.create(
+            user=self.socio, plan=self.plan, start_date=timezone.localdate(),
+            payment_method='efectivo', amount_paid=self.plan.price
+        )
+        data = self.scan().json()
+        self.assertEqual((data['status'], data['user']['monthly_access']), ('allowed', 1))
+        self.assertEqual(
+            DailyAttendanceRollup.objects.get(scope='total', date=timezone.localdate()).allowed, 1
+        )
+
+        # Ya entró hoy: se responde desde la caché sin tocar la BD
+        with self.assertNumQueries(0):
+            response = self.scan()
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(response.json()['already_accessed_today'])
+        self.assertEqual(AccessLog.objects.filter(status='allowed').count(), 1)
+
+    def test_cache_por_proceso_no_se_usa(self):
+        with override_settings(ADMISSION_CACHE_ALLOW_LOCAL=False):
+            self.assertFalse(admission_cache.enabled())
+            self.scan()
+            self.assertIsNone(admission_cache.get_entry(qr_token.parse(self.socio.get_qr_data())))
+
+
+class ScanBatchIngestionTests(TestCase):
+    """Lote de escaneos de un torniquete que estuvo sin conexión."""
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = Plan.objects.create(
+            name='Plan Lote', plan_type='basico', description='-', price=20000,
+            duration_days=30, access_days='Todos los días'
+        )
+        today = timezone.localdate()
+        cls.socios = []
+        for i in range(3):
+            socio = CustomUser.objects.create_user(
+                username=f'lote{i}', rut=f'3000000{i}-{i}', password='x', role='socio'
+            )
+            cls.socios.append(socio)
+        # El tercero no tiene membresía
+        for socio in cls.socios[:2]:
+            Membership.objects.create(
+                user=socio, plan=plan, start_date=today - timedelta(days=5),
+                payment_method='efectivo', amount_paid=plan.price
+            )
+
+    def qr(self, socio):
+        return str({'user_id': socio.id, 'qr_id': socio.qr_unique_id, 'rut': socio.rut})
+
+    def test_lote_con_consultas_fijas_y_una_entrada_por_dia(self):
+        base = timezone.localtime(timezone.now()).replace(hour=12, minute=0) - timedelta(days=1)
+        a, b, sin_plan = self.socios
+        scans = [
+            {'id': 'a2', 'qr_data': self.qr(a), 'scanned_at': (base + timedelta(hours=2)).isoformat()},
+            {'id': 'a1', 'qr_data': self.qr(a), 'scanned_at': base.isoformat()},
+            {'id': 'b1', 'qr_data': self.qr(b), 'scanned_at': base.isoformat()},
+            {'id': 'c1', 'qr_data': self.qr(sin_plan), 'scanned_at': base.isoformat()},
+            {'id': 'x', 'qr_data': 'basura'},
+        ]
+        # Usuarios, membresías y accesos previos; un INSERT de logs; lectura e
+        # INSERT del resumen diario (más SAVEPOINTs). No crece con el lote.
+        with self.assertNumQueries(12):
+            results = ingest_scans(scans)
+
+        verdicts = {r['id']: r['status'] for r in results}
+        self.assertEqual(verdicts, {'a2': 'denied', 'a1': 'allowed', 'b1': 'allowed', 'c1': 'denied', 'x': 'invalid'})
+        self.assertTrue(results[0]['already_accessed_today'])
+        self.assertEqual(AccessLog.objects.filter(status='allowed').count(), 2)
+        self.assertEqual(AccessLog.objects.filter(status='denied').count(), 1)
+        self.assertEqual(
+            DailyAttendanceRollup.objects.get(scope='total', date=base.date()).allowed, 2
+        )
+
+        # Reenviar el mismo lote no duplica entradas permitidas
+        results = ingest_scans(scans[:3])
+        self.assertEqual([r['status'] for r in results], ['denied', 'denied', 'denied'])
+        self.assertEqual(AccessLog.objects.filter(status='allowed').count(), 2)
+
+    @override_settings(MAX_OFFLINE_AGE=60 * 60 * 24)
+    def test_escaneos_retroactivos_o_futuros_son_invalidos(self):
+        ahora = timezone.now()
+        a = self.socios[0]
+        results = ingest_scans([
+            {'qr_data': self.qr(a), 'scanned_at': (ahora - timedelta(days=2)).isoformat()},
+            {'qr_data': self.qr(a), 'scanned_at': (ahora + timedelta(hours=1)).isoformat()},
+            {'qr_data': self.qr(a), 'scanned_at': (ahora - timedelta(hours=23)).isoformat()},
+        ])
+        self.assertEqual([r['status'] for r in results], ['invalid', 'invalid', 'allowed'])
+        self.assertEqual(results[0]['error'], 'Escaneo demasiado antiguo')
+        self.assertEqual(AccessLog.objects.count(), 1)
+
+
+class QRTokenTests(TestCase):
+
+    def setUp(self):
+        self.socio = CustomUser.objects.create_user(username='token', rut='5555555-5', password='x', role='socio')
+
+    def test_token_firmado_se_verifica_sin_bd(self):
+        token = self.socio.get_qr_data()
+        self.assertTrue(token.startswith(qr_token.TOKEN_PREFIX))
+        self.assertLess(len(token), 32)
+
+        with self.assertNumQueries(0):
+            claims = qr_token.parse(token.lower())
+        self.assertEqual(claims.user_id, self.socio.id)
+        self.assertTrue(claims.matches(self.socio.qr_unique_id, self.socio.rut))
+
+        # Cualquier otro último carácter se rechaza, también si solo cambia el relleno de base32
+        for letra in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567':
+            if letra != token[-1]:
+                with self.assertRaises(qr_token.InvalidQRToken):
+                    qr_token.parse(token[:-1] + letra)
+
+    def test_qr_regenerado_revoca_el_token_y_el_formato_antiguo_sigue_valido(self):
+        token = self.socio.get_qr_data()
+        antiguo = str({'user_id': self.socio.id, 'qr_id': self.socio.qr_unique_id, 'rut': self.socio.rut})
+        self.assertTrue(qr_token.parse(antiguo).matches(self.socio.qr_unique_id, self.socio.rut))
+
+        self.socio.qr_unique_id = None
+        self.socio.save()
+        self.assertFalse(qr_token.parse(token).matches(self.socio.qr_unique_id, self.socio.rut))
+
+
+class QRRenderCacheTests(TestCase):
+
+    def test_imagen_se_dibuja_una_vez_por_clave(self):
+        socio = CustomUser.objects.create_user(username='render', rut='6666666-6', password='x', role='socio')
+        qr_render._memory.clear()
+        calls = []
+        original = qr_render.render_payload
+
+        def spy(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+
+        qr_render.render_payload = spy
+        try:
+            png = qr_render.render_qr(socio)
+            self.assertEqual(qr_render.render_qr(socio), png)
+            qr_render._memory.clear()  # Sin LRU se lee de la caché persistente
+            self.assertEqual(qr_render.render_qr(socio).etag, png.etag)
+            svg = qr_render.render_qr(socio, fmt='svg')
+        finally:
+            qr_render.render_payload = original
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(png.content_type, 'image/png')
+        self.assertTrue(svg.content.startswith(b'<?xml'))
+
+
+class QRImageViewTests(TestCase):
+
+    def test_imagen_con_etag_y_304(self):
+        socio = CustomUser.objects.create_user(username='img', rut='7777777-7', password='x', role='socio')
+        otro = CustomUser.objects.create_user(username='otro', rut='8888888-8', password='x', role='socio')
+        url = f'/qr/{socio.qr_unique_id}.png'
+
+        self.client.force_login(socio, backend='Clientes.backends.RUTorEmailBackend')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(f'/qr/{socio.qr_unique_id}.svg')['Content-Type'], 'image/svg+xml')
+
+        # Otro socio no puede ver el QR ajeno
+        self.client.force_login(otro, backend='Clientes.backends.RUTorEmailBackend')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class OutboxTests(TestCase):
+    """El request solo encola; el worker envía (backend locmem en los tests)."""
+
+    def setUp(self):
+        plan = Plan.objects.create(
+            name='Plan Correo', plan_type='basico', description='-', price=20000,
+            duration_days=30, access_days='Todos los días'
+        )
+        self.socio = CustomUser.objects.create_user(
+            username='correo', rut='9999999-9', email='socio@example.com', password='x', role='socio'
+        )
+        self.membership = Membership.objects.create(
+            user=self.socio, plan=plan, start_date=timezone.localdate(),
+            payment_method='efectivo', amount_paid=plan.price
+        )
+
+    def test_encolar_y_entregar(self):
+        outbox.enqueue_welcome_email(self.socio, self.membership, send_qr=True)
+        self.assertEqual(len(mail.outbox), 0)
+        self.membership.refresh_from_db()
+        self.assertEqual(self.membership.email_status, 'pending')
+
+        summary = outbox.process_batch()
+        self.assertEqual(summary, {'sent': 1, 'retry': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'AccesoQR_9999999-9.png')
+        self.membership.refresh_from_db()
+        self.assertEqual(self.membership.email_status, 'sent')
+        self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 0, 'failed': 0})
+
+    def test_sin_skip_locked_usa_for_update_normal(self):
+        # MariaDB 10.4 (XAMPP) no soporta SKIP LOCKED: pedirlo lanzaría NotSupportedError
+        outbox.enqueue_welcome_email(self.socio, self.membership, send_qr=True)
+        original = OutboxMessage.objects.select_for_update
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False), \
+                mock.patch.object(OutboxMessage.objects, 'select_for_update', wraps=original) as sfu:
+            self.assertEqual(outbox.process_batch()['sent'], 1)
+        sfu.assert_called_with(skip_locked=False)
+
+    def test_reintento_con_backoff_y_fallo_final(self):
+        message = outbox.enqueue_welcome_email(self.socio, self.membership, send_qr=True)
+        OutboxMessage.objects.filter(pk=message.pk).update(membership=None, max_attempts=2)
+
+        self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 1, 'failed': 0})
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'pending')
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        # Aún no toca reintentar
+        self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 0, 'failed': 0})
+
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 0, 'failed': 1})
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'failed')
+        self.assertIn('ValueError', message.last_error)
+
+
+class BulkMailerTests(TestCase):
+
+    def test_campana_de_vencimiento_en_lotes(self):
+        plan = Plan.objects.create(
+            name='Plan Aviso', plan_type='basico', description='-', price=20000,
+            duration_days=30, access_days='Todos los días'
+        )
+        today = timezone.localdate()
+        for i in range(5):
+            socio = CustomUser.objects.create_user(
+                username=f'aviso{i}', rut=f'1200000{i}-{i}', email=f'aviso{i}@example.com',
+                password='x', role='socio'
+            )
+            # Los 3 primeros vencen en 7 días; los otros más adelante
+            Membership.objects.create(
+                user=socio, plan=plan, start_date=today - timedelta(days=23 if i < 3 else 10),
+                payment_method='efectivo', amount_paid=plan.price
+            )
+
+        with BulkMailer(batch_size=2) as mailer:
+            stats = mailer.send(campaign_messages('vencimiento', days=7))
+
+        self.assertEqual((stats['sent'], stats['failed'], stats['batches']), (3, 0, 2))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'aviso{i}@example.com' for i in range(3)])
+        self.assertIn('vence pronto', mail.outbox[0].subject)
+
+    def test_corte_de_sesion_reabre_y_reintenta_una_vez(self):
+        class ConexionConCuota:
+            """SMTP con fail_silently que corta la sesión tras 2 correos y rechaza a un destinatario."""
+            def __init__(self):
+                self.aperturas, self.en_sesion, self.entregados = 0, 0, []
+
+            def open(self):
+                self.aperturas += 1
+                self.en_sesion = 0
+
+            def close(self):
+                pass
+
+            def send_messages(self, messages):
+                if self.en_sesion >= 2 or messages[0].to == ['rechazado@example.com']:
+                    return 0
+                self.en_sesion += 1
+                self.entregados += messages
+                return 1
+
+        conexion = ConexionConCuota()
+        correos = [mail.EmailMessage('Aviso', '-', to=[f'socio{i}@example.com']) for i in range(5)]
+        correos.insert(3, mail.EmailMessage('Aviso', '-', to=['rechazado@example.com']))
+        with BulkMailer(batch_size=10, connection=conexion) as mailer:
+            stats = mailer.send(correos)
+
+        # El corte tras el 2° correo no arrastra al resto del lote; el rechazado falla tras un reintento
+        self.assertEqual((stats['sent'], stats['failed'], stats['batches']), (5, 1, 1))
+        self.assertEqual(len(conexion.entregados), 5)
+        self.assertEqual(conexion.aperturas, 3)
+
+
+class ReceiptPDFCacheTests(TestCase):
+
+    def test_recibo_se_genera_una_vez_y_es_determinista(self):
+        pago = Payment.objects.create(
+            user_backup_name='Ana Pérez', user_backup_rut='11111111-1', plan_backup_name='Plan Mensual',
+            amount=25000, payment_method='efectivo', comment='Inscripción'
+        )
+        with tempfile.TemporaryDirectory() as tmp, override_settings(PDF_RENDER_WORKERS=0, PDF_CACHE_DIR=tmp):
+            primero = generate_pdf_receipt(pago)
+            self.assertTrue(primero.startswith(b'%PDF'))
+            # Mismo HTML -> mismos bytes (sin fecha de creación ni ID aleatorio)
+            self.assertEqual(pdf_render.html_to_pdf(pdf_render.receipt_html(pago)), primero)
+
+            # La segunda vez se lee del disco, sin pasar por xhtml2pdf
+            with mock.patch.object(pdf_render, 'html_to_pdf') as render:
+                self.assertEqual(generate_pdf_receipt(pago), primero)
+            render.assert_not_called()
+
+    def test_render_que_no_termina_a_tiempo_se_cancela(self):
+        pendiente = Future()
+        with mock.patch.object(pdf_render, 'submit_html', return_value=pendiente), \
+                override_settings(PDF_RENDER_TIMEOUT=0.01):
+            self.assertIsNone(pdf_render.html_to_pdf('<p>lento</p>'))
+        self.assertTrue(pendiente.cancelled())
+
+    def test_espera_del_pdf_bajo_el_timeout_de_gunicorn(self):
+        self.assertLess(pdf_render.render_timeout(), settings.WEB_TIMEOUT)
+
+    def test_zip_de_recibos_por_rango(self):
+        admin = CustomUser.objects.create_user(
+            username='admin_zip', rut='22222222-2', email='admin@example.com', password='x', role='admin'
+        )
+        hoy = timezone.localdate()
+        for i in range(3):
+            Payment.objects.create(
+                user_backup_name=f'Socio {i}', user_backup_rut='11111111-1', plan_backup_name='Plan',
+                amount=10000, payment_method='efectivo', date=timezone.now() - timedelta(days=i * 40)
+            )
+        self.client.force_login(admin, backend='Clientes.backends.RUTorEmailBackend')
+        with tempfile.TemporaryDirectory() as tmp, override_settings(PDF_RENDER_WORKERS=0, PDF_CACHE_DIR=tmp):
+            response = self.client.get(reverse('descargar_recibos_zip'), {
+                'desde': (hoy - timedelta(days=45)).isoformat(), 'hasta': hoy.isoformat()
+            })
+            contenido = b''.join(response.streaming_content)
+
+        archivo = zipfile.ZipFile(BytesIO(contenido))
+        self.assertEqual(len(archivo.namelist()), 2)
+        self.assertIsNone(archivo.testzip())
+        self.assertTrue(all(archivo.read(n).startswith(b'%PDF') for n in archivo.namelist()))
+
+
+class PaymentExportTests(TestCase):
+
+    def test_exportaciones_en_streaming(self):
+        admin = CustomUser.objects.create_user(
+            username='admin_export', rut='22222222-2', email='admin@example.com', password='x', role='admin'
+        )
+        for i in range(3):
+            Payment.objects.create(
+                user_backup_name=f'Socio {i}', user_backup_rut='11111111-1', plan_backup_name='Plan',
+                amount=10000 + i, payment_method='tarjeta'
+            )
+        self.client.force_login(admin, backend='Clientes.backends.RUTorEmailBackend')
+        url = reverse('exportar_pagos_excel')
+
+        response = self.client.get(url, {'origen': 'pagos', 'formato': 'csv'})
+        lineas = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 4)
+        self.assertEqual(lineas[1].split(';')[5:7], ['Tarjeta', '10002'])
+
+        response = self.client.get(url, {'origen': 'pagos'})
+        libro = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        self.assertEqual(len(list(libro.active.iter_rows(values_only=True))), 4)
+
+
+class ReportJobTests(TestCase):
+
+    def test_reporte_en_segundo_plano_se_reutiliza_si_no_hay_pagos_nuevos(self):
+        admin = CustomUser.objects.create_user(
+            username='admin_jobs', rut='22222222-2', email='admin@example.com', password='x', role='admin'
+        )
+        Payment.objects.create(
+            user_backup_name='Socio', user_backup_rut='11111111-1', plan_backup_name='Plan',
+            amount=10000, payment_method='efectivo'
+        )
+        self.client.force_login(admin, backend='Clientes.backends.RUTorEmailBackend')
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(REPORTS_ROOT=tmp):
+            pedir = lambda: self.client.post(
+                reverse('solicitar_reporte'), {'kind': 'csv', 'origen': 'pagos'}, content_type='application/json'
+            ).json()
+            data = pedir()
+            self.assertFalse(data['reused'])
+            self.assertEqual(data['job']['status'], 'pending')
+
+            self.assertEqual(report_jobs.run_job(report_jobs.claim_job()), 'done')
+            estado = self.client.get(reverse('estado_reporte', args=[data['job']['id']])).json()['job']
+            self.assertEqual((estado['status'], estado['progress']), ('done', 1))
+            descarga = self.client.get(estado['download_url'])
+            self.assertIn('Socio', b''.join(descarga.streaming_content).decode('utf-8-sig'))
+
+            # Mismos pagos: se reutiliza el archivo; un pago nuevo obliga a regenerar
+            self.assertEqual(pedir()['job']['id'], data['job']['id'])
+            Payment.objects.create(
+                user_backup_name='Otro', user_backup_rut='33333333-3', plan_backup_name='Plan',
+                amount=5000, payment_method='tarjeta'
+            )
+            self.assertFalse(pedir()['reused'])
+            self.assertEqual(ReportJob.objects.count(), 2)
+
+            # Cuerpo que no es un objeto JSON: 400, no 500
+            for cuerpo in ('[]', '"csv"', '{mal'):
+                respuesta = self.client.post(reverse('solicitar_reporte'), cuerpo, content_type='application/json')
+                self.assertEqual(respuesta.status_code, 400)
+
+            # Sin SKIP LOCKED (MariaDB 10.4) se toma igual, con FOR UPDATE normal
+            original = ReportJob.objects.select_for_update
+            with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False), \
+                    mock.patch.object(ReportJob.objects, 'select_for_update', wraps=original) as sfu:
+                self.assertIsNotNone(report_jobs.claim_job())
+            sfu.assert_called_with(skip_locked=False)
+
+    def test_worker_continuo_limpia_reportes_antiguos_periodicamente(self):
+        comando = 'Clientes.management.commands.process_report_jobs'
+        with mock.patch(f'{comando}.purge_old', return_value=0) as purge, \
+                mock.patch(f'{comando}.time.sleep', side_effect=[None, None, KeyboardInterrupt]):
+            call_command('process_report_jobs', continuo=True, purgar_cada=0, stdout=StringIO())
+        self.assertEqual(purge.call_count, 3)
+
+        # Sin --continuo limpia una vez al arrancar; con --retener-dias 0 no limpia
+        with mock.patch(f'{comando}.purge_old', return_value=0) as purge:
+            call_command('process_report_jobs', stdout=StringIO())
+            call_command('process_report_jobs', retener_dias=0, stdout=StringIO())
+        self.assertEqual(purge.call_count, 1)
+
+
+@override_settings(SQL_PROFILER_ENABLED=True)
+class SQLProfilerTests(TestCase):
+
+    def test_mide_consultas_y_percentiles_por_url(self):
+        self.assertEqual([sql_profiler.percentile(list(range(1, 101)), q) for q in (50, 95, 99)], [50, 95, 99])
+
+        admin = CustomUser.objects.create_user(
+            username='admin_perfil', rut='22222222-2', email='admin@example.com', password='x', role='admin'
+        )
+        self.client.force_login(admin, backend='Clientes.backends.RUTorEmailBackend')
+        sql_profiler.buffer.clear()
+        self.client.get(reverse('index_admin'))
+        self.client.get(reverse('index_admin'))
+
+        response = self.client.get(reverse('perfil_sql'))
+        fila = next(r for r in response.context['rows'] if r['url_name'] == 'index_admin')
+        self.assertEqual(fila['requests'], 2)
+        self.assertGreater(fila['queries'][0], 0)
+        self.assertGreater(fila['wall'][2], 0)
+
+
+class MemberSearchTests(TestCase):
+
+    def test_busqueda_por_prefijo_normalizada_y_ordenada(self):
+        maria = CustomUser.objects.create_user(
+            username='maria', rut='12.345.678-5', email='maria.gonzalez@example.com', password='x',
+            first_name='María José', last_name='González', role='socio'
+        )
+        CustomUser.objects.create_user(
+            username='mariana', rut='9876543-3', email='mariana@example.com', password='x',
+            first_name='Mariana', last_name='Gómez', role='socio'
+        )
+        CustomUser.objects.create_user(username='mod', rut='7654321-6', password='x', first_name='Maria', role='moderador')
+
+        with self.assertNumQueries(2):
+            self.assertEqual([u.username for u in search_members('maria')], ['maria', 'mariana'])
+        self.assertEqual(search_members('jose gonz'), [maria])
+        self.assertEqual(search_members('123456785'), [maria])
+        self.assertEqual(search_members('12.345'), [maria])
+        self.assertEqual(search_members('m'), [])
+
+        # Renombrar (o dejar de ser socio) actualiza los términos
+        maria.last_name = 'Núñez'
+        maria.save()
+        self.assertEqual(search_members('nunez'), [maria])
+        self.assertEqual(search_members('gonzalez'), [])
+
+        recepcion = CustomUser.objects.get(username='mod')
+        self.client.force_login(recepcion, backend='Clientes.backends.RUTorEmailBackend')
+        data = self.client.get(reverse('api_buscar_socio'), {'q': 'MARÍA'}).json()
+        self.assertEqual(data['user']['rut'], '12.345.678-5')
+        self.assertEqual([r['full_name'] for r in data['results']], ['María José Núñez', 'Mariana Gómez'])
+
+
+class RUTNormalizationTests(TestCase):
+
+    def test_rut_canonico_y_busqueda_exacta(self):
+        self.assertEqual(rut_utils.check_digits([11111111, 12345678, 5126663, 10000013]), ['1', '5', '3', 'K'])
+        self.assertTrue(rut_utils.is_valid('12.345.678-5'))
+        self.assertFalse(rut_utils.is_valid('12.345.678-9'))
+        self.assertEqual(rut_utils.normalize('12.345.678-k'), rut_utils.normalize('12345678K'))
+
+        admin = CustomUser.objects.create_user(
+            username='administrador', rut='11.111.111-1', password='123', role='admin'
+        )
+        self.assertEqual(admin.rut_normalized, '111111111')
+
+        # El RUT escrito de otra forma encuentra al mismo usuario
+        login = self.client.post(reverse('inicio_sesion'), {'username': '11111111-1', 'password': '123'})
+        self.assertTrue(login.json()['success'])
+        self.assertEqual(self.client.get(reverse('validate_rut'), {'rut': '111111111'}).json()['valid'], False)
+        self.assertIn('inválido', self.client.get(reverse('validate_rut'), {'rut': '11111111-2'}).json()['error'])
+
+        # Backfill: filas antiguas sin clave y un duplicado escrito distinto
+        otro = CustomUser.objects.create_user(username='otro', rut='7654321-6', password='x', role='socio')
+        CustomUser.objects.update(rut_normalized=None)
+        CustomUser.objects.filter(pk=otro.pk).update(rut='11111111-1')
+        salida = StringIO()
+        call_command('normalize_ruts', lote=1, stdout=salida)
+        self.assertIn('RUT duplicado', salida.getvalue())
+        self.assertEqual(
+            dict(CustomUser.objects.values_list('username', 'rut_normalized')),
+            {'administrador': '111111111', 'otro': None}
+        )
+
+        # La fila sin clave sigue entrando con su RUT exacto (el login solo guarda last_login)
+        self.client.logout()
+        login = self.client.post(reverse('inicio_sesion'), {'username': '11111111-1', 'password': 'x'})
+        self.assertTrue(login.json()['success'])
+        self.assertEqual(CustomUser.objects.get_by_rut('11.111.111-1'), admin)
+        self.assertEqual(CustomUser.objects.get_by_rut('111111111'), admin)
+
+        # El duplicado es un error de validación en los formularios y nunca se guarda sin clave
+        otro.refresh_from_db()
+        with self.assertRaisesMessage(ValidationError, 'Ya existe un usuario con este RUT'):
+            otro.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            otro.save()
+        self.assertIsNone(CustomUser.objects.get(pk=otro.pk).rut_normalized)
+        form = CustomUserCreationForm(data={
+            'username': 'tercero', 'rut': '11111111-1', 'password1': 'Clave-segura-123',
+            'password2': 'Clave-segura-123', 'role': 'socio',
+        })
+        self.assertIn('rut', form.errors)
+        with self.assertRaises(CustomUser.DoesNotExist):
+            CustomUser.objects.get_by_rut('')
+
+
+@override_settings(LOGIN_MAX_FAILURES=3, LOGIN_TRUSTED_PROXY_COUNT=0)
+class LoginBackendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.socio = CustomUser.objects.create_user(
+            username='12345678-5', rut='12.345.678-5', email='socio@example.com', password='clave', role='socio'
+        )
+        self.web = RequestFactory().post('/login/')
+
+    def test_una_columna_por_intento_y_bloqueo_tras_fallos(self):
+        for identificador in ('12345678-5', '12.345.678-5', 'socio@example.com'):
+            with self.assertNumQueries(1):
+                self.assertEqual(authenticate(self.web, username=identificador, password='clave'), self.socio)
+        self.assertEqual(lookup_field('Socio@Example.com'), ('email', 'socio@example.com'))
+        self.assertEqual(lookup_field('admin'), ('username', 'admin'))
+
+        # Variantes del mismo RUT suman en el mismo contador
+        for variante in ('12345678-5', '12.345.678-5', '012345678-5'):
+            self.assertIsNone(authenticate(self.web, username=variante, password='mala'))
+        # Bloqueado: ni BD ni hash, aunque la clave sea correcta
+        with self.assertNumQueries(0), mock.patch.object(CustomUser, 'check_password') as check:
+            self.assertIsNone(authenticate(self.web, username='12345678-5', password='clave'))
+        check.assert_not_called()
+        for variante in ('12.345.678-5', '0012345678-5', '123456785'):
+            respuesta = self.client.post(reverse('inicio_sesion'), {'username': variante, 'password': 'clave'})
+            self.assertEqual(respuesta.status_code, 429)
+
+        # Otra cuenta desde la misma IP sigue pudiendo entrar
+        CustomUser.objects.create_user(username='otro', rut='7654321-6', password='x', role='socio')
+        self.assertIsNotNone(authenticate(self.web, username='7.654.321-6', password='x'))
+
+    def test_correo_sin_distinguir_mayusculas(self):
+        self.assertEqual(authenticate(self.web, username='SOCIO@example.COM', password='clave'), self.socio)
+        for correo in ('SOCIO@example.com', 'socio@EXAMPLE.com', 'Socio@Example.Com'):
+            self.assertIsNone(authenticate(self.web, username=correo, password='mala'))
+        with self.assertRaises(PermissionDenied):
+            RUTorEmailBackend().authenticate(self.web, username='socio@example.com', password='clave')
+
+    @override_settings(LOGIN_TRUSTED_PROXY_COUNT=1, LOGIN_MAX_FAILURES_PER_IP=4)
+    def test_ip_del_cliente_desde_el_proxy(self):
+        # Todos llegan desde el balanceador (mismo REMOTE_ADDR); el proxy agrega la IP real al final
+        def desde(*saltos):
+            return RequestFactory().post('/login/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=', '.join(saltos))
+
+        self.assertEqual(login_throttle.client_ip(desde('1.1.1.1', '200.1.1.1')), '200.1.1.1')
+        self.assertIsNone(login_throttle.client_ip(RequestFactory().post('/login/')))
+
+        # El atacante (IP falsa a la izquierda) no bloquea al socio que entra desde otra IP
+        for _ in range(3):
+            self.assertIsNone(authenticate(desde('200.2.2.2', '66.6.6.6'), username='12345678-5', password='mala'))
+        self.assertEqual(authenticate(desde('200.2.2.2'), username='12345678-5', password='clave'), self.socio)
+
+        # Límite por IP: 4 fallos desde una IP con cuentas distintas la bloquean solo a ella
+        for i in range(4):
+            authenticate(desde('66.6.6.7'), username=f'nadie{i}', password='x')
+        self.assertTrue(login_throttle.is_blocked(('username', 'otra'), desde('66.6.6.7')))
+        self.assertFalse(login_throttle.is_blocked(('username', 'otra'), desde('200.2.2.2')))
+        # Sin IP conocida no se aplica el límite por IP
+        self.assertEqual(login_throttle._keys(('username', 'x'), None)[1], None)
+
+    def test_superusuario_solo_por_admin(self):
+        CustomUser.objects.create_superuser('root', password='clave')
+        self.assertIsNone(authenticate(self.web, username='root', password='clave'))
+        admin_login = RequestFactory().post('/admin/login/')
+        self.assertEqual(authenticate(admin_login, username='root', password='clave').username, 'root')
+
+
+@override_settings(SESSION_USER_CACHE_ALLOW_LOCAL=True)
+class SessionUserCacheTests(TestCase):
+
+    def test_request_user_desde_cache_e_invalidado_al_guardar(self):
+        socio = CustomUser.objects.create_user(
+            username='cache', rut='8765432-1', password='x', first_name='Ana', role='socio', phone='+56911111111'
+        )
+        self.client.force_login(socio, backend='Clientes.backends.RUTorEmailBackend')
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+
+        user_cache.load_user(request)
+        with self.assertNumQueries(1):  # solo la sesión
+            request = RequestFactory().get('/')
+            request.session = self.client.session
+            user = user_cache.load_user(request)
+            self.assertEqual((user.pk, user.role, user.first_name), (socio.pk, 'socio', 'Ana'))
+        with self.assertNumQueries(1):  # un campo fuera de la foto trae el resto de una vez
+            self.assertEqual((user.phone, user.email, user.rut), ('+56911111111', '', '8765432-1'))
+
+        # Un cambio de rol se ve en el request siguiente
+        socio.role = 'moderador'
+        socio.save()
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        self.assertEqual(user_cache.load_user(request).role, 'moderador')
+
+        # Cambiar la contraseña invalida las sesiones abiertas
+        socio.set_password('nueva')
+        socio.save()
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        self.assertFalse(user_cache.load_user(request).is_authenticated)
+
+    @override_settings(SESSION_USER_CACHE_ALLOW_LOCAL=False)
+    def test_cache_por_proceso_no_se_usa(self):
+        socio = CustomUser.objects.create_user(username='local', rut='8765431-3', password='x', role='socio')
+        self.client.force_login(socio, backend='Clientes.backends.RUTorEmailBackend')
+        self.assertFalse(user_cache.enabled())
+        for _ in range(2):
+            request = RequestFactory().get('/')
+            request.session = self.client.session
+            with self.assertNumQueries(2):  # sesión y usuario, siempre desde la BD
+                self.assertEqual(user_cache.load_user(request), socio)
@@ -0,0 +1,124 @@
+"""
+Caché de request.user por sesión.
+
+Sin caché, cada request autenticado carga el usuario con
+RUTorEmailBackend.get_user() (un SELECT a la tabla de usuarios) solo para
+revisar su rol. Aquí se guarda, por clave de sesión, una foto compacta del
+usuario (SNAPSHOT_FIELDS) y se arma request.user desde ella sin tocar la BD.
+El resto de los campos quedan diferidos: si una vista lee uno (p. ej.
+phone), CustomUser.refresh_from_db() trae todos los que faltan en una sola
+consulta.
+
+Invalidación: cada usuario tiene una versión en la caché y la foto guarda la
+versión con que se armó. CustomUser.save() (y el borrado) eliminan la
+versión, así que todas las sesiones de ese usuario se recargan en el
+siguiente request. La versión se lee ANTES de consultar la BD: si otro
+request guarda el usuario entremedio, la foto nace ya vencida.
+
+Solo se usa con sesiones de RUTorEmailBackend; las del admin (superusuarios)
+siguen el camino normal de Django.
+
+Solo se activa si SESSION_USER_CACHE_ALIAS es una caché compartida entre
+workers (ver enabled()): con LocMemCache invalidate() solo limpia el worker
+que guardó, y los demás seguirían sirviendo a un usuario desactivado, con el
+rol anterior o con la sesión previa a un cambio de contraseña.
+
+IMPORTANTE: Este módulo NO importa modelos (models.py lo usa en sus save()).
+"""
+import uuid
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router
+from django.utils.crypto import constant_time_compare
+
+KEY_PREFIX = 'session_user'
+BACKEND_PATH = 'Clientes.backends.RUTorEmailBackend'
+
+# Lo que leen las vistas en casi todos los requests (rol, nombre, estado, QR)
+# más lo que usan las comprobaciones de Django y del login
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'role', 'first_name', 'last_name', 'is_active_member',
+    'qr_unique_id', 'is_superuser', 'is_staff', 'is_active',
+)
+
+
+def _cache():
+    return caches[getattr(settings, 'SESSION_USER_CACHE_ALIAS', 'default')]
+
+
+def enabled():
+    """¿Es seguro usar la caché? Solo si es compartida entre procesos (o se permite la local)."""
+    cache = _cache()
+    if isinstance(cache, DummyCache):
+        return False
+    return not isinstance(cache, LocMemCache) or getattr(settings, 'SESSION_USER_CACHE_ALLOW_LOCAL', False)
+
+
+def _timeout():
+    return getattr(settings, 'SESSION_USER_CACHE_TIMEOUT', 60 * 5)
+
+
+def _snapshot_key(session_key):
+    return f"{KEY_PREFIX}:{session_key}"
+
+
+def _version_key(user_id):
+    return f"{KEY_PREFIX}:v:{user_id}"
+
+
+def invalidate(user_id):
+    """Vence las fotos de todas las sesiones del usuario."""
+    if user_id is not None:
+        _cache().delete(_version_key(user_id))
+
+
+def _current_version(user_id):
+    cache = _cache()
+    cache.add(_version_key(user_id), uuid.uuid4().hex, None)
+    return cache.get(_version_key(user_id))
+
+
+def _from_snapshot(snapshot):
+    User = auth.get_user_model()
+    # from_db() espera los valores en el orden de los campos del modelo
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in SNAPSHOT_FIELDS]
+    return User.from_db(router.db_for_read(User), names, [snapshot[name] for name in names])
+
+
+def load_user(request):
+    """
+    Reemplazo de django.contrib.auth.get_user(request) con la foto en caché.
+    Verifica lo mismo que Django: usuario de la sesión y hash de sesión
+    (que cambia con la contraseña).
+    """
+    if not enabled():
+        return auth.get_user(request)
+    session = request.session
+    session_key = session.session_key
+    try:
+        user_id = int(session[auth.SESSION_KEY])
+    except (KeyError, TypeError, ValueError):
+        return auth.get_user(request)
+    if not session_key or session.get(auth.BACKEND_SESSION_KEY) != BACKEND_PATH:
+        return auth.get_user(request)
+
+    cache = _cache()
+    found = cache.get_many([_snapshot_key(session_key), _version_key(user_id)])
+    snapshot = found.get(_snapshot_key(session_key))
+    version = found.get(_version_key(user_id))
+    if (
+        snapshot and version and snapshot['version'] == version and snapshot['id'] == user_id
+        and constant_time_compare(session.get(auth.HASH_SESSION_KEY) or '', snapshot['session_hash'])
+    ):
+        return _from_snapshot(snapshot)
+
+    version = _current_version(user_id)
+    user = auth.get_user(request)
+    if user.is_authenticated and version:
+        snapshot = {f: getattr(user, f) for f in SNAPSHOT_FIELDS}
+        snapshot.update(version=version, session_hash=user.get_session_auth_hash())
+        cache.set(_snapshot_key(session_key), snapshot, _timeout())
+    return user
@@ -3,86 +3,90 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
 import os
-from io import BytesIO
-from xhtml2pdf import pisa
-import qrcode
+from .services.pdf_render import CONTRACT_TEMPLATE, receipt_pdf, render_pdf
+from .services.qr_render import render_qr
 
 def generate_pdf_contract(user, membership):
     """Genera el PDF del contrato y lo devuelve como bytes."""
-    template_path = 'pdfs/contract_template.html'
     context = {
         'user': user,
         'membership': membership,
         'fecha_actual': timezone.now()
     }
-    html = render_to_string(template_path, context)
-    result = BytesIO()
+    return render_pdf(CONTRACT_TEMPLATE, context)
+
+def build_qr_email(user, membership, send_qr=False, send_contract=False, connection=None, reissue=False):
+    """
+    Arma el correo de bienvenida (QR y/o contrato adjuntos) sin enviarlo.
+    Lo usan el worker del outbox y el envío masivo, que deciden cuándo y con qué
+    conexión enviarlo. Con reissue=True el texto es de reenvío, no de bienvenida.
+    """
+    # Contexto para el correo
+    context = {
+        'user': user,
+        'membership': membership,
+        'plan_name': membership.plan.name,
+        'qr_unique_id': user.qr_unique_id,
+        'send_qr': send_qr,
+        'send_contract': send_contract,
+        'reissue': reissue
+    }
     
-    # CORRECCIÓN 1: Usar UTF-8 explícitamente para soportar tildes y ñ
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result, encoding='UTF-8')
+    html_message = render_to_string('emails/qr_code_email.html', context)
+    if reissue:
+        subject = f'{user.first_name}, te reenviamos tus documentos de ClubHouse'
+    else:
+        subject = f'¡Bienvenido al Club, {user.first_name}! 🚀'
+    
+    email = EmailMessage(
+        subject=subject,
+        body=html_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        connection=connection,
+    )
+    email.content_subtype = 'html'
+    
+    # 1. Adjuntar QR (Si se solicitó). La imagen sale de la caché de qr_render
+    if send_qr and user.qr_unique_id:
+        qr_image = render_qr(user)
+        email.attach(f'AccesoQR_{user.rut}.png', qr_image.content, qr_image.content_type)
+    
+    # 2. Adjuntar Contrato (Igual que antes)
+    if send_contract:
+        pdf_content = generate_pdf_contract(user, membership)
+        if pdf_content:
+            filename = f"Contrato_Servicio_{user.rut}.pdf"
+            email.attach(filename, pdf_content, 'application/pdf')
     
-    if not pdf.err:
-        return result.getvalue()
-    return None
+    return email
+
+def build_expiry_reminder_email(membership, connection=None):
+    """Arma el recordatorio "tu plan vence en N días" para el envío masivo."""
+    user = membership.user
+    context = {
+        'user': user,
+        'membership': membership,
+        'plan_name': membership.plan.name,
+        'days_remaining': membership.days_remaining(),
+    }
+    email = EmailMessage(
+        subject=f'{user.first_name}, tu plan {membership.plan.name} vence pronto',
+        body=render_to_string('emails/plan_expiry_reminder.html', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        connection=connection,
+    )
+    email.content_subtype = 'html'
+    return email
 
 def send_qr_email(user, membership, send_qr=False, send_contract=False):
     """
-    Envía el correo de bienvenida generando el QR en memoria.
+    Envía el correo de bienvenida de inmediato (bloqueante).
+    Las vistas NO deben usarla: encolan con services.outbox.enqueue_welcome_email.
     """
     try:
-        # Contexto para el correo
-        context = {
-            'user': user,
-            'membership': membership,
-            'plan_name': membership.plan.name,
-            'qr_unique_id': user.qr_unique_id,
-            'send_qr': send_qr,
-            'send_contract': send_contract
-        }
-        
-        html_message = render_to_string('emails/qr_code_email.html', context)
-        subject = f'¡Bienvenido al Club, {user.first_name}! 🚀'
-        
-        email = EmailMessage(
-            subject=subject,
-            body=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email],
-        )
-        email.content_subtype = 'html'
-        
-        # 1. Generar y Adjuntar QR en Memoria (Si se solicitó)
-        if send_qr and user.qr_unique_id:
-            # Obtener el texto del QR usando el método del modelo
-            qr_data = user.get_qr_data()
-            
-            # Generar imagen QR
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Guardar en buffer de memoria
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            qr_bytes = buffer.getvalue()
-            
-            # Adjuntar al correo
-            email.attach(f'AccesoQR_{user.rut}.png', qr_bytes, 'image/png')
-        
-        # 2. Adjuntar Contrato (Igual que antes)
-        if send_contract:
-            pdf_content = generate_pdf_contract(user, membership)
-            if pdf_content:
-                filename = f"Contrato_Servicio_{user.rut}.pdf"
-                email.attach(filename, pdf_content, 'application/pdf')
-        
-        email.send(fail_silently=False)
+        build_qr_email(user, membership, send_qr=send_qr, send_contract=send_contract).send(fail_silently=False)
         return True
         
     except Exception as e:
@@ -92,26 +96,6 @@ def send_qr_email(user, membership, send_qr=False, send_contract=False):
 def generate_pdf_receipt(payment_obj):
     """
     Genera el PDF del recibo basado en el modelo Payment (Historial).
+    Se genera una sola vez y luego se sirve desde disco (ver services/pdf_render.py).
     """
-    template_path = 'pdfs/receipt_template.html'
-    
-    # Preparamos los datos. Usamos los datos de RESPALDO para garantizar
-    # que el recibo sea fiel al momento del pago, incluso si el usuario se borró.
-    context = {
-        'pago': payment_obj,
-        'fecha_emision': timezone.now(),
-        # Datos del cliente (Snapshot histórico)
-        'cliente_nombre': payment_obj.user_backup_name,
-        'cliente_rut': payment_obj.user_backup_rut,
-        # Intentamos obtener el email actual si el usuario existe, sino '-'
-        'cliente_email': payment_obj.user.email if payment_obj.user else "No disponible (Usuario eliminado)"
-    }
-    
-    html = render_to_string(template_path, context)
-    result = BytesIO()
-    
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result, encoding='UTF-8')
-    
-    if not pdf.err:
-        return result.getvalue()
-    return None
\ No newline at end of file
+    return receipt_pdf(payment_obj)
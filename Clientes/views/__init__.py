@@ -13,14 +13,16 @@ from .user_mgmt_views import (
 )
 from .plan_mgmt_views import (
     admin_plan_create, admin_plan_details, admin_plan_edit, admin_plan_delete,
-    exportar_pagos_excel, ver_recibo_pago
+    exportar_pagos_excel, ver_recibo_pago, descargar_recibos_zip,
+    solicitar_reporte, estado_reporte, descargar_reporte
 )
 from .access_views import (
-    process_qr_scan, mostrar_Scanner, mostrar_QRCodeEmail
+    process_qr_scan, process_qr_scan_batch, qr_image, mostrar_Scanner, mostrar_QRCodeEmail
 )
+from .profiler_views import perfil_sql
 from .api_views import (
     get_plans, validate_rut, validate_email, api_buscar_socio, 
-    api_renovar_plan, api_cancelar_plan, api_crear_socio_moderador
+    api_renovar_plan, api_cancelar_plan, api_crear_socio_moderador, api_socios
 )
 
 __all__ = [
@@ -40,12 +42,16 @@ __all__ = [
     
     # Plan Management
     'admin_plan_create', 'admin_plan_details', 'admin_plan_edit', 'admin_plan_delete',
-    'exportar_pagos_excel', 'ver_recibo_pago', 'process_admin_plan_creation',
+    'exportar_pagos_excel', 'ver_recibo_pago', 'descargar_recibos_zip', 'process_admin_plan_creation',
+    'solicitar_reporte', 'estado_reporte', 'descargar_reporte',
     
     # Access
-    'process_qr_scan', 'mostrar_Scanner', 'mostrar_QRCodeEmail',
+    'process_qr_scan', 'process_qr_scan_batch', 'qr_image', 'mostrar_Scanner', 'mostrar_QRCodeEmail',
     
+    # Perfilador SQL
+    'perfil_sql',
+
     # API
     'get_plans', 'validate_rut', 'validate_email', 'api_buscar_socio', 
-    'api_renovar_plan', 'api_cancelar_plan', 'api_crear_socio_moderador'
+    'api_renovar_plan', 'api_cancelar_plan', 'api_crear_socio_moderador', 'api_socios'
 ]
\ No newline at end of file
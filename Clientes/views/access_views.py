@@ -1,16 +1,69 @@
 import json
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from ..models import CustomUser, AccessLog
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
+from ..models import CustomUser, Membership, AccessLog
+from .. import admission_cache, qr_token
+from ..services.attendance import record_access, record_accesses
+from ..services.qr_render import FORMATS as QR_FORMATS, render_qr
+
+logger = logging.getLogger(__name__)
+
+# Máximo de escaneos por lote que acepta process_qr_scan_batch
+MAX_BATCH_SCANS = 1000
+# Tolerancia para relojes de torniquete adelantados
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+# La URL de la imagen cambia al rotar el qr_unique_id; el ETag cubre el resto
+QR_IMAGE_MAX_AGE = 60 * 60 * 24
+
+
+def _load_admission_entry(claims, now_chile):
+    """
+    Lee de la BD lo necesario para admitir (caché fallida).
+    CORREGIDO: Usa rango de fechas para evitar error de timezone en MySQL.
+    """
+    user = CustomUser.objects.filter(id=claims.user_id).first()
+    if user is None or not claims.matches(user.qr_unique_id, user.rut):
+        return None
+
+    membership = user.get_active_membership()
+
+    # Definimos el inicio (00:00:00) y fin (23:59:59) del día actual
+    start_of_day = now_chile.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = now_chile.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    # Buscamos registros usando el rango (__range) en lugar de __date
+    todays_access = AccessLog.objects.filter(
+        user=user,
+        timestamp__range=(start_of_day, end_of_day),
+        status='allowed'
+    ).first()
+
+    primer_dia_mes = now_chile.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    monthly_access = AccessLog.objects.filter(user=user, timestamp__gte=primer_dia_mes, status='allowed').count()
+
+    return admission_cache.build_entry(
+        user,
+        membership,
+        timezone.localtime(todays_access.timestamp) if todays_access else None,
+        monthly_access,
+        now_chile
+    )
 
 @require_http_methods(["POST"])
 def process_qr_scan(request):
     """
     Procesa el escaneo de QR y registra el acceso del usuario.
-    CORREGIDO: Usa rango de fechas para evitar error de timezone en MySQL.
+    Con la caché de admisión caliente solo se escribe: el AccessLog y su resumen diario.
     """
     try:
         # Obtener datos del QR
@@ -24,104 +77,66 @@ def process_qr_scan(request):
         if not qr_data:
             return JsonResponse({'success': False, 'error': 'No se proporcionó información del QR'}, status=400)
         
-        # --- PARSEO DE DATOS (Igual que antes) ---
-        user_id, qr_id, rut = None, None, None
+        # --- PARSEO Y FIRMA (sin consultar la BD) ---
         try:
-            if isinstance(qr_data, str):
-                import ast
-                qr_dict = ast.literal_eval(qr_data.strip())
-                user_id = qr_dict.get('user_id')
-                qr_id = qr_dict.get('qr_id')
-                rut = qr_dict.get('rut')
-            elif isinstance(qr_data, dict):
-                user_id = qr_data.get('user_id')
-                qr_id = qr_data.get('qr_id')
-                rut = qr_data.get('rut')
-            else:
-                qr_dict = json.loads(qr_data)
-                user_id = qr_dict.get('user_id')
-                qr_id = qr_dict.get('qr_id')
-                rut = qr_dict.get('rut')
-                
-            if not user_id or not qr_id or not rut:
-                raise ValueError("Datos incompletos")
-        except Exception:
+            claims = qr_token.parse(qr_data)
+        except qr_token.InvalidQRToken:
             return JsonResponse({'success': False, 'error': 'Formato QR inválido'}, status=400)
         
-        # Buscar usuario
-        try:
-            user = CustomUser.objects.get(id=user_id, rut=rut, qr_unique_id=qr_id)
-        except CustomUser.DoesNotExist:
-            return JsonResponse({
-                'success': False, 
-                'status': 'denied', 
-                'error': 'Usuario no encontrado o QR inválido',
-                'user': {'name': 'Desconocido', 'rut': rut or 'N/A'}
-            }, status=404)
+        # 1. Obtenemos la hora actual en Chile
+        now_chile = timezone.localtime(timezone.now())
+        today = now_chile.date()
+
+        # Caché de admisión: en un escaneo normal evita leer usuario, membresía y logs
+        entry = admission_cache.get_entry(claims)
+        if entry is None:
+            entry = _load_admission_entry(claims, now_chile)
+            if entry is None:
+                return JsonResponse({
+                    'success': False, 
+                    'status': 'denied', 
+                    'error': 'Usuario no encontrado o QR inválido',
+                    'user': {'name': 'Desconocido', 'rut': claims.rut or 'N/A'}
+                }, status=404)
+            admission_cache.set_entry(entry)
         
-        # Verificar membresía
-        membership = user.get_active_membership()
-        if not membership or not membership.is_valid():
-            AccessLog.objects.create(user=user, status='denied', membership=membership, denial_reason='Membresía vencida')
+        # Verificar membresía (equivalente a membership.is_valid())
+        if not entry['membership_id'] or entry['end_date'] <= today:
+            with transaction.atomic():
+                denied_log = AccessLog.objects.create(user_id=entry['user_id'], status='denied', membership=None, denial_reason='Membresía vencida')
+                record_access(entry['user_id'], None, 'denied', denied_log.timestamp)
             return JsonResponse({
                 'success': False,
                 'status': 'denied',
                 'error': 'Membresía vencida o inexistente',
-                'user': {'name': user.get_full_name(), 'rut': user.rut}
+                'user': {'name': entry['name'], 'rut': entry['rut']}
             })
         
-        # CORRECCIÓN PRINCIPAL: FILTRO POR RANGO HORARIO
-        
-        # 1. Obtenemos la hora actual en Chile
-        now_chile = timezone.localtime(timezone.now())
-        
-        # 2. Definimos el inicio (00:00:00) y fin (23:59:59) del día actual
-        start_of_day = now_chile.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = now_chile.replace(hour=23, minute=59, second=59, microsecond=999999)
-
-        # 3. Buscamos registros usando el rango (__range) en lugar de __date
-        already_accessed_today = AccessLog.objects.filter(
-            user=user,
-            timestamp__range=(start_of_day, end_of_day), # <--- AQUÍ ESTÁ EL CAMBIO
-            status='allowed'
-        ).exists()
-        
-        if already_accessed_today:
-            # Obtener el registro para mostrar la hora
-            todays_access = AccessLog.objects.filter(
-                user=user,
-                timestamp__range=(start_of_day, end_of_day),
-                status='allowed'
-            ).first()
-            
-            # Recalcular estadísticas para mostrar en el frontend
-            # (Simplificado para brevedad, usa tu lógica original si prefieres)
-            primer_dia_mes = now_chile.replace(day=1, hour=0, minute=0, second=0)
-            monthly_access = AccessLog.objects.filter(user=user, timestamp__gte=primer_dia_mes, status='allowed').count()
-            
+        if entry['admitted_on'] == today:
             return JsonResponse({
                 'success': False,
                 'status': 'denied',
-                'error': f'Ya registraste entrada a las {timezone.localtime(todays_access.timestamp).strftime("%H:%M:%S")}',
+                'error': f'Ya registraste entrada a las {entry["access_time"]}',
                 'already_accessed_today': True,
                 'user': {
-                    'name': user.get_full_name(),
-                    'rut': user.rut,
-                    'monthly_access': monthly_access,
-                    'access_time': timezone.localtime(todays_access.timestamp).strftime('%H:%M:%S')
+                    'name': entry['name'],
+                    'rut': entry['rut'],
+                    'monthly_access': entry['monthly_access'],
+                    'access_time': entry['access_time']
                 }
             }, status=403)
         
-        # CREAR NUEVO REGISTRO
-        access_log = AccessLog.objects.create(
-            user=user,
-            status='allowed',
-            membership=membership
-        )
+        # CREAR NUEVO REGISTRO y sumarlo al resumen diario de asistencia
+        with transaction.atomic():
+            access_log = AccessLog.objects.create(
+                user_id=entry['user_id'],
+                status='allowed',
+                membership_id=entry['membership_id']
+            )
+            record_access(entry['user_id'], entry['plan_id'], 'allowed', access_log.timestamp)
         
-        # Estadísticas finales
-        primer_dia_mes = now_chile.replace(day=1, hour=0, minute=0, second=0)
-        monthly_access = AccessLog.objects.filter(user=user, timestamp__gte=primer_dia_mes, status='allowed').count()
+        # Write-through: AccessLog.save invalidó la entrada, la reponemos actualizada
+        entry = admission_cache.record_admission(entry, timezone.localtime(access_log.timestamp))
         
         return JsonResponse({
             'success': True,
@@ -129,10 +144,10 @@ def process_qr_scan(request):
             'message': '¡Bienvenido!',
             'already_accessed_today': False,
             'user': {
-                'name': user.get_full_name(),
-                'rut': user.rut,
-                'monthly_access': monthly_access,
-                'access_time': timezone.localtime(access_log.timestamp).strftime('%H:%M:%S')
+                'name': entry['name'],
+                'rut': entry['rut'],
+                'monthly_access': entry['monthly_access'],
+                'access_time': entry['access_time']
             }
         })
         
@@ -140,6 +155,221 @@ def process_qr_scan(request):
         print(f"Error: {str(e)}")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+def _max_offline_age():
+    return timedelta(seconds=getattr(settings, 'MAX_OFFLINE_AGE', 60 * 60 * 72))
+
+
+def _parse_scanned_at(value, now):
+    """
+    Hora del escaneo informada por el torniquete (ISO 8601). Sin zona = hora de Chile.
+    Se rechaza si está en el futuro (más allá de MAX_CLOCK_SKEW) o si es más
+    antigua que MAX_OFFLINE_AGE: no se aceptan entradas retroactivas.
+    """
+    if not value:
+        return now
+    scanned_at = parse_datetime(str(value))
+    if scanned_at is None:
+        raise ValueError("Fecha de escaneo inválida")
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    if scanned_at > now + MAX_CLOCK_SKEW:
+        raise ValueError("Fecha de escaneo en el futuro")
+    if scanned_at < now - _max_offline_age():
+        raise ValueError("Escaneo demasiado antiguo")
+    return scanned_at
+
+
+def ingest_scans(scans):
+    """
+    Valida y registra un lote de escaneos hechos sin conexión.
+
+    Cada escaneo es un dict con 'qr_data' y opcionalmente 'scanned_at' (ISO 8601)
+    e 'id' (eco para el cliente). Aplica las mismas reglas que process_qr_scan
+    usando la hora del escaneo: usuario y QR válidos, membresía vigente ese día y
+    una sola entrada permitida por día local.
+
+    Costo fijo sin importar el tamaño del lote: una consulta de usuarios, una de
+    membresías, una de accesos previos y un bulk_create de todos los AccessLog.
+    Retorna una lista de veredictos en el mismo orden de `scans`.
+    """
+    now = timezone.now()
+    verdicts = [None] * len(scans)
+    parsed = []  # (índice, QRClaims, scanned_at)
+
+    for index, scan in enumerate(scans):
+        verdict = {'index': index}
+        if isinstance(scan, dict) and scan.get('id') is not None:
+            verdict['id'] = scan['id']
+        verdicts[index] = verdict
+        try:
+            if not isinstance(scan, dict) or not scan.get('qr_data'):
+                raise ValueError("Escaneo sin información del QR")
+            claims = qr_token.parse(scan['qr_data'])
+            scanned_at = _parse_scanned_at(scan.get('scanned_at'), now)
+        except ValueError as e:
+            verdict.update({'success': False, 'status': 'invalid', 'error': str(e)})
+            continue
+        parsed.append((index, claims, scanned_at))
+
+    if not parsed:
+        return verdicts
+
+    # 1. Usuarios del lote (una consulta)
+    user_ids = {claims.user_id for _, claims, _ in parsed}
+    users = {
+        u.id: u for u in CustomUser.objects.filter(id__in=user_ids).order_by().only(
+            'id', 'rut', 'qr_unique_id', 'first_name', 'last_name', 'username'
+        )
+    }
+
+    first_day = timezone.localtime(min(p[2] for p in parsed)).date()
+    last_day = timezone.localtime(max(p[2] for p in parsed)).date()
+
+    # 2. Membresías que podían estar vigentes en algún día del lote (una consulta)
+    memberships = defaultdict(list)
+    for m in Membership.objects.filter(
+        user_id__in=users.keys(), is_active=True, end_date__gt=first_day
+    ).order_by('-created_at').values('id', 'user_id', 'plan_id', 'end_date'):
+        memberships[m['user_id']].append(m)
+
+    # 3. Entradas permitidas ya registradas en los días del lote (una consulta)
+    range_start = timezone.make_aware(datetime.combine(first_day, time.min))
+    range_end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    admitted = {
+        (user_id, timezone.localtime(ts).date())
+        for user_id, ts in AccessLog.objects.filter(
+            user_id__in=users.keys(), status='allowed',
+            timestamp__gte=range_start, timestamp__lt=range_end
+        ).order_by().values_list('user_id', 'timestamp')
+    }
+
+    # Se procesan en orden cronológico para que la regla de una entrada por día
+    # respete qué escaneo ocurrió primero, aunque el lote llegue desordenado.
+    logs, accesses = [], []
+    for index, claims, scanned_at in sorted(parsed, key=lambda p: p[2]):
+        verdict = verdicts[index]
+        user_id = claims.user_id
+        user = users.get(user_id)
+        if user is None or not claims.matches(user.qr_unique_id, user.rut):
+            verdict.update({
+                'success': False, 'status': 'denied', 'error': 'Usuario no encontrado o QR inválido',
+                'user': {'name': 'Desconocido', 'rut': claims.rut or 'N/A'}
+            })
+            continue
+
+        local_dt = timezone.localtime(scanned_at)
+        day = local_dt.date()
+        verdict['user'] = {'name': user.get_full_name() or user.username, 'rut': user.rut}
+        membership = next((m for m in memberships[user_id] if m['end_date'] > day), None)
+
+        if membership is None:
+            logs.append(AccessLog(
+                user_id=user_id, timestamp=scanned_at, status='denied',
+                membership=None, denial_reason='Membresía vencida'
+            ))
+            accesses.append((user_id, None, 'denied', scanned_at))
+            verdict.update({'success': False, 'status': 'denied', 'error': 'Membresía vencida o inexistente'})
+        elif (user_id, day) in admitted:
+            verdict.update({
+                'success': False, 'status': 'denied', 'already_accessed_today': True,
+                'error': 'Ya registró entrada ese día'
+            })
+        else:
+            admitted.add((user_id, day))
+            logs.append(AccessLog(
+                user_id=user_id, timestamp=scanned_at, status='allowed', membership_id=membership['id']
+            ))
+            accesses.append((user_id, membership['plan_id'], 'allowed', scanned_at))
+            verdict.update({
+                'success': True, 'status': 'allowed', 'already_accessed_today': False,
+                'access_time': local_dt.strftime('%H:%M:%S')
+            })
+
+    # 4. Una sola escritura para todos los registros y su resumen diario.
+    # bulk_create no pasa por AccessLog.save, así que la caché se invalida a mano.
+    if logs:
+        with transaction.atomic():
+            AccessLog.objects.bulk_create(logs, batch_size=500)
+            record_accesses(accesses)
+        admission_cache.invalidate(*{log.user_id for log in logs})
+
+    return verdicts
+
+
+@require_http_methods(["POST"])
+@login_required(login_url='inicio_sesion')
+def process_qr_scan_batch(request):
+    """
+    Recibe los escaneos que un torniquete acumuló sin conexión y retorna un
+    veredicto por escaneo. Solo personal del gimnasio (admin/moderador).
+    """
+    if request.user.role not in ['admin', 'moderador']:
+        return JsonResponse({'success': False, 'error': 'No autorizado'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    scans = data.get('scans') if isinstance(data, dict) else None
+    if not isinstance(scans, list) or not scans:
+        return JsonResponse({'success': False, 'error': 'No se proporcionaron escaneos'}, status=400)
+    if len(scans) > MAX_BATCH_SCANS:
+        return JsonResponse({
+            'success': False, 'error': f'Máximo {MAX_BATCH_SCANS} escaneos por lote'
+        }, status=400)
+
+    try:
+        results = ingest_scans(scans)
+    except Exception as e:
+        logger.exception("Error al procesar un lote de %s escaneos", len(scans))
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+    summary = {'allowed': 0, 'denied': 0, 'invalid': 0}
+    for result in results:
+        summary[result['status']] += 1
+    return JsonResponse({'success': True, 'results': results, 'summary': summary})
+
+@require_http_methods(["GET", "HEAD"])
+@login_required(login_url='inicio_sesion')
+def qr_image(request, qr_unique_id, fmt):
+    """
+    Imagen del QR (/qr/<qr_unique_id>.png|svg) para el propio socio o el personal.
+    Sale de la caché de qr_render, con ETag fuerte y respuesta 304 si no cambió.
+    Parámetros opcionales: ?size= (1-20) y ?border= (0-8).
+    """
+    if fmt not in QR_FORMATS:
+        raise Http404
+
+    try:
+        size = int(request.GET.get('size', 10))
+        border = int(request.GET.get('border', 4))
+    except ValueError:
+        return HttpResponseBadRequest('Parámetros inválidos')
+    if not (1 <= size <= 20 and 0 <= border <= 8):
+        return HttpResponseBadRequest('Parámetros fuera de rango')
+
+    if request.user.qr_unique_id == qr_unique_id:
+        user = request.user
+    elif request.user.role in ['admin', 'moderador'] or request.user.is_staff:
+        user = CustomUser.objects.filter(qr_unique_id=qr_unique_id).first()
+    else:
+        user = None
+    if user is None:
+        raise Http404
+
+    rendered = render_qr(user, size, border, fmt)
+    if rendered is None:
+        raise Http404
+
+    response = get_conditional_response(request, etag=rendered.etag)
+    if response is None:
+        response = HttpResponse(rendered.content, content_type=rendered.content_type)
+    response['ETag'] = rendered.etag
+    # private: la imagen es la credencial de acceso del socio, no va a cachés compartidas
+    patch_cache_control(response, private=True, max_age=QR_IMAGE_MAX_AGE)
+    return response
+
 @login_required(login_url='inicio_sesion')
 def mostrar_Scanner(request):
     """Esta vista renderiza la pagina del Scanner."""
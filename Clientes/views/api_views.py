@@ -4,9 +4,12 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Q
 from ..models import CustomUser, Plan, Membership, Payment
-from ..utils import send_qr_email
+from .. import rut as rut_utils
+from django.urls import reverse
+from ..services.outbox import enqueue_welcome_email
+from ..services.socio_directory import InvalidCursor, directory
+from ..services.member_search import DEFAULT_LIMIT, search_members
 
 def get_plans(request):
     """API endpoint para obtener los planes disponibles."""
@@ -22,7 +25,9 @@ def validate_rut(request):
     rut = request.GET.get('rut')
     if not rut:
         return JsonResponse({'valid': False, 'error': 'RUT no proporcionado'})
-    exists = CustomUser.objects.filter(rut=rut).exists()
+    if not rut_utils.is_valid(rut):
+        return JsonResponse({'valid': False, 'error': 'RUT inválido (revise el dígito verificador)'})
+    exists = CustomUser.objects.filter(rut_normalized=rut_utils.normalize(rut)).exists()
     return JsonResponse({
         'valid': not exists,
         'error': 'Este RUT ya esta registrado' if exists else None
@@ -41,22 +46,23 @@ def validate_email(request):
 
 @login_required(login_url='inicio_sesion')
 def api_buscar_socio(request):
-    """API para buscar socio y devolver TODOS los datos necesarios para el panel de pagos"""
+    """
+    API para buscar socio (typeahead de recepción). Devuelve los mejores
+    resultados en 'results' y TODOS los datos del primero en 'user' para el panel de pagos.
+    """
     query = request.GET.get('q', '').strip()
     
     if not query:
         return JsonResponse({'success': False, 'error': 'Término de búsqueda vacío'})
 
-    # Buscar usuario (RUT, Nombre o Email)
-    user = CustomUser.objects.filter(
-        Q(rut__icontains=query) | 
-        Q(first_name__icontains=query) | 
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query),
-        role='socio'
-    ).first()
+    # Buscar por RUT, nombre o email (índice de términos normalizados, ver member_search)
+    try:
+        socios = search_members(query, limit=request.GET.get('limite', DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Límite inválido'}, status=400)
 
-    if user:
+    if socios:
+        user = socios[0]
         # Obtener membresía activa
         membership = user.get_active_membership()
         
@@ -89,7 +95,11 @@ def api_buscar_socio(request):
                 'fecha_vencimiento': fecha_vencimiento,
                 'dias_restantes': dias_restantes,
                 'estado': estado_badge
-            }
+            },
+            'results': [
+                {'rut': s.rut, 'full_name': s.get_full_name(), 'email': s.email}
+                for s in socios
+            ]
         }
         return JsonResponse(data)
     else:
@@ -107,7 +117,7 @@ def api_renovar_plan(request):
             user = request.user
         else:
             rut = data.get('rut')
-            user = CustomUser.objects.get(rut=rut)
+            user = CustomUser.objects.get_by_rut(rut)
 
         plan_id = data.get('plan_id')
         payment_method = data.get('payment_method')
@@ -189,15 +199,10 @@ def api_renovar_plan(request):
         user.is_active_member = True
         user.save()
 
-        # Enviar correos si corresponde
+        # Encolar correos si corresponde (los envía el worker process_outbox)
         send_qr = data.get('send_qr', False)
         send_contract = data.get('send_contract', False)
-
-        if send_qr or send_contract:
-            try:
-                send_qr_email(user, membership, send_qr=send_qr, send_contract=send_contract)
-            except Exception as e:
-                print(f"Error enviando email: {e}")
+        enqueue_welcome_email(user, membership, send_qr=send_qr, send_contract=send_contract)
 
         return JsonResponse({'success': True, 'message': 'Plan procesado correctamente'})
 
@@ -216,7 +221,7 @@ def api_crear_socio_moderador(request):
         data = json.loads(request.body)
         
         # 1. Validaciones básicas
-        if CustomUser.objects.filter(rut=data['rut']).exists():
+        if CustomUser.objects.filter(rut_normalized=rut_utils.normalize(data['rut'])).exists():
             return JsonResponse({'success': False, 'error': 'El RUT ya existe'})
         if CustomUser.objects.filter(email=data['email']).exists():
             return JsonResponse({'success': False, 'error': 'El Email ya existe'})
@@ -270,12 +275,9 @@ def api_crear_socio_moderador(request):
         user.is_active_member = True
         user.save()
 
-        # 5. Enviar Email (Opcional)
+        # 5. Encolar Email con el QR (Opcional)
         if data.get('sendQREmail'):
-            try:
-                send_qr_email(user, membership)
-            except:
-                pass # No detener el proceso si falla el email
+            enqueue_welcome_email(user, membership, send_qr=True)
 
         return JsonResponse({'success': True})
 
@@ -306,4 +308,56 @@ def api_cancelar_plan(request):
         return JsonResponse({'success': True, 'message': 'Plan cancelado exitosamente.'})
 
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@login_required(login_url='inicio_sesion')
+@require_http_methods(["GET"])
+def api_socios(request):
+    """
+    Directorio de usuarios en JSON con paginación por cursor (los paneles lo cargan a demanda).
+    Parámetros: rol, activo (1/0), plan (id), q, orden (recientes|apellido), cursor, limite.
+    """
+    requester_role = request.user.role
+    if requester_role not in ['admin', 'moderador']:
+        return JsonResponse({'success': False, 'error': 'No autorizado'}, status=403)
+
+    role = request.GET.get('rol', 'socio')
+    # Los moderadores solo gestionan socios
+    if role not in ['socio', 'moderador', 'admin'] or (requester_role == 'moderador' and role != 'socio'):
+        return JsonResponse({'success': False, 'error': 'Rol no permitido'}, status=403)
+
+    activo = request.GET.get('activo', '')
+    try:
+        users, next_cursor = directory(
+            role=role,
+            active={'1': True, '0': False}.get(activo),
+            plan_id=int(request.GET['plan']) if request.GET.get('plan') else None,
+            term=request.GET.get('q', '').strip(),
+            sort=request.GET.get('orden', 'recientes'),
+            cursor=request.GET.get('cursor') or None,
+            limit=request.GET.get('limite', 25),
+        )
+    except (InvalidCursor, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    today = timezone.localdate()
+    detail_view, edit_view = (
+        ('admin_user_details', 'admin_user_edit') if requester_role == 'admin'
+        else ('moderador_ver_usuario', 'moderador_editar_usuario')
+    )
+    results = [{
+        'id': user.id,
+        'rut': user.rut,
+        'full_name': user.get_full_name(),
+        'email': user.email,
+        'role': user.role,
+        'is_active_member': user.is_active_member,
+        'plan_name': user.active_plan_name,
+        'dias_restantes': (user.active_plan_end - today).days if user.active_plan_end else 0,
+        'last_access': timezone.localtime(user.last_access).isoformat() if user.last_access else None,
+        'created_at': timezone.localtime(user.created_at).isoformat(),
+        'detail_url': reverse(detail_view, args=[user.id]),
+        'edit_url': reverse(edit_view, args=[user.id]),
+    } for user in users]
+    return JsonResponse({'success': True, 'results': results, 'next_cursor': next_cursor})
@@ -1,5 +1,6 @@
 import json
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout, update_session_auth_hash
 from django.contrib import messages
 from django.http import JsonResponse
@@ -7,8 +8,9 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from ..models import CustomUser, Plan, Membership, Payment
-from ..utils import send_qr_email
-from ..templatetags.qr_tags import generate_qr_base64
+from .. import login_throttle, rut as rut_utils
+from ..backends import lookup_field
+from ..services.outbox import enqueue_welcome_email
 
 # --- VISTAS DE AUTENTICACIONN ---
 
@@ -59,6 +61,12 @@ def process_login(request):
                 'error': 'Por favor ingresa tu RUT/Email y contraseña'
             }, status=400)
         
+        if login_throttle.is_blocked(lookup_field(username), request):
+            return JsonResponse({
+                'success': False,
+                'error': 'Demasiados intentos fallidos. Intenta nuevamente en unos minutos.'
+            }, status=429)
+
         # Autenticar usuario
         user = authenticate(request, username=username, password=password)
         
@@ -186,7 +194,7 @@ def process_registration(request):
                     'error': f'El campo {field} es requerido'
                 }, status=400)
         
-        if CustomUser.objects.filter(rut=data['rut']).exists():
+        if CustomUser.objects.filter(rut_normalized=rut_utils.normalize(data['rut'])).exists():
             return JsonResponse({
                 'success': False,
                 'error': 'El RUT ingresado ya esta registrado'
@@ -252,38 +260,29 @@ def process_registration(request):
             comment=f"Registro inicial - Nuevo Socio"
         )
         
-        # --- LÓGICA ACTUALIZADA DE EMAIL ---
-        email_sent = False
+        # --- EMAIL: solo se encola, lo envía el worker (process_outbox) ---
         # Capturamos los checkbox del frontend
         send_qr_req = data.get('sendQREmail', False)
         send_contract_req = data.get('sendContract', False)
-
-        # Si se solicitó al menos uno de los dos
-        if send_qr_req or send_contract_req:
-            try:
-                # Pasamos ambos flags explícitamente
-                email_sent = send_qr_email(
-                    user, 
-                    membership, 
-                    send_qr=send_qr_req, 
-                    send_contract=send_contract_req
-                )
-            except Exception as email_error:
-                print(f"Error email: {str(email_error)}")
-                email_sent = False
+        email_queued = enqueue_welcome_email(
+            user,
+            membership,
+            send_qr=send_qr_req,
+            send_contract=send_contract_req
+        ) is not None
         
         user.backend = 'Clientes.backends.RUTorEmailBackend'
         login(request, user)
 
-        # --- GENERACIÓN DEL QR BASE64 PARA LA RESPUESTA JSON ---
-        qr_image_b64 = generate_qr_base64(user.get_qr_data())
+        # --- URL DEL QR (el navegador la descarga y cachea aparte) ---
+        qr_code_url = reverse('qr_image', args=[user.qr_unique_id, 'png'])
         
         return JsonResponse({
             'success': True,
             'message': 'Registro exitoso',
             'user_id': user.id,
-            'qr_code_b64': qr_image_b64,
-            'email_sent': email_sent
+            'qr_code_url': qr_code_url,
+            'email_queued': email_queued
         })
         
     except Exception as e:
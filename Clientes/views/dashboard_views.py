@@ -5,7 +5,12 @@ from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from ..models import CustomUser, Plan, Membership, AccessLog
 from ..services.dashboard_service import AdminDashboardService
+from ..services.socio_directory import socio_page
+from ..services.attendance import (
+    daily_attendance_histogram, attendance_streaks, allowed_totals, user_access_summary
+)
 from datetime import timedelta
+import json
 
 # --- VISTAS DE PANELES (con proteccion de rol) ---
 
@@ -66,10 +71,8 @@ def index_moderador(request):
     start_of_day = now_chile.replace(hour=0, minute=0, second=0, microsecond=0)
     end_of_day = now_chile.replace(hour=23, minute=59, second=59, microsecond=999999)
 
-    # Definir rangos exactos para AYER
+    # AYER (para la tendencia de accesos)
     yesterday_date = now_chile - timedelta(days=1)
-    start_of_yesterday = yesterday_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_yesterday = yesterday_date.replace(hour=23, minute=59, second=59, microsecond=999999)
 
     # --- 1. Usuarios Activos y Tendencia ---
     usuarios_activos = CustomUser.objects.filter(
@@ -98,16 +101,10 @@ def index_moderador(request):
         cambio_usuarios = {'porcentaje': 100, 'es_positivo': True}
 
     # --- 2. Accesos Hoy y Tendencia ---
-    # CORRECCIÓN: Usar rangos (timestamp__range) en lugar de __date
-    accesos_hoy = AccessLog.objects.filter(
-        timestamp__range=(start_of_day, end_of_day), 
-        status='allowed'
-    ).count()
-    
-    accesos_ayer = AccessLog.objects.filter(
-        timestamp__range=(start_of_yesterday, end_of_yesterday), 
-        status='allowed'
-    ).count()
+    # Desde el resumen diario: dos filas, sin contar AccessLog
+    totales_accesos = allowed_totals(today, yesterday_date.date())
+    accesos_hoy = totales_accesos[today]
+    accesos_ayer = totales_accesos[yesterday_date.date()]
     
     cambio_accesos = calcular_porcentaje_cambio(accesos_ayer, accesos_hoy)
 
@@ -136,24 +133,15 @@ def index_moderador(request):
         timestamp__range=(start_of_day, end_of_day)
     ).select_related('user', 'membership', 'membership__plan').order_by('-timestamp')
     
+    # --- 4b. Gráfico de Asistencia (últimos 7 días, misma función que el admin) ---
+    labels_asist, data_asist = daily_attendance_histogram(days=7, today=today)
+
     # --- 5. Lista de Usuarios para Gestión ---
-    socios = CustomUser.objects.filter(role='socio').order_by('-created_at')
-    lista_usuarios = []
+    # Una consulta anotada por página (plan activo, días restantes y último acceso)
+    busqueda = request.GET.get('q', '').strip()
+    socios_page, lista_usuarios = socio_page(request.GET.get('page'), busqueda, today=today)
     planes_renovacion = Plan.objects.filter(is_active=True).order_by('price')
-    for socio in socios:
-        membership = socio.get_active_membership()
-        
-        ultimo_acceso = AccessLog.objects.filter(user=socio, status='allowed').order_by('-timestamp').first()
-        
-        lista_usuarios.append({
-            'user': socio,
-            'plan_name': membership.plan.name if membership else 'Sin Plan Activo',
-            'status_class': 'active' if socio.is_active_member else 'inactive',
-            'status_text': 'Activo' if socio.is_active_member else 'Inactivo',
-            'dias_restantes': membership.days_remaining() if membership else 0,
-            'last_access': ultimo_acceso.timestamp if ultimo_acceso else None
-        }) 
-        
+
     context = {
         'usuarios_activos': usuarios_activos,
         'cambio_usuarios': cambio_usuarios, 
@@ -162,8 +150,14 @@ def index_moderador(request):
         'planes_vencer': planes_vencer,
         'cambio_planes': cambio_planes,
         'ultimos_accesos': ultimos_accesos,
+        'chart_asistencias_labels': json.dumps(labels_asist),
+        'chart_asistencias_data': json.dumps(data_asist),
         'planes_renovacion': planes_renovacion,
         'lista_usuarios': lista_usuarios,
+        'socios_page': socios_page,
+        'busqueda': busqueda,
+        # Al paginar o buscar se vuelve directo a la sección de usuarios
+        'seccion_activa': 'usuarios' if 'page' in request.GET or 'q' in request.GET else 'dashboard',
     }
     
     return render(request, 'index_moderador.html', context)
@@ -193,39 +187,12 @@ def index_socio(request):
         status='allowed'
     ).order_by('-timestamp')
     
-    # 2. Asistencias por semana (últimos 7 días)
-    seven_days_ago = now_chile - timedelta(days=7)
-    seven_days_ago_start = seven_days_ago.replace(hour=0, minute=0, second=0, microsecond=0)
+    # 2. Semana (7 días), mes actual, total y acceso de hoy: una consulta al resumen diario
+    summary = user_access_summary(request.user, today=now_chile.date())
     
-    weekly_access = request.user.access_logs.filter(
-        timestamp__gte=seven_days_ago_start,
-        status='allowed'
-    ).count()
-    
-    # 3. Asistencias del mes actual
-    # Primer día del mes actual a las 00:00:00
-    primer_dia_mes = now_chile.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    monthly_access = request.user.access_logs.filter(
-        timestamp__gte=primer_dia_mes,
-        status='allowed'
-    ).count()
-    
-    # Asistencias totales
-    total_access = request.user.access_logs.filter(status='allowed').count()
-    
-    # Calcular racha (días consecutivos)
-    streak_days = calculate_streak(request.user)
-    
-    # 4. Acceso de hoy
-    # Usamos un rango exacto del día para evitar problemas de conversión de DB
-    start_of_day = now_chile.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_day = now_chile.replace(hour=23, minute=59, second=59, microsecond=999999)
-    
-    accessed_today = request.user.access_logs.filter(
-        timestamp__range=(start_of_day, end_of_day),
-        status='allowed'
-    ).exists()
+    # Calcular racha (días consecutivos), mejor racha y frecuencia semanal
+    streaks = attendance_streaks(request.user, today=now_chile.date())
+    streak_days = streaks['current']
 
     # === NUEVO CÓDIGO: Obtener planes para renovación ===
     planes_db = Plan.objects.filter(is_active=True).order_by('price')
@@ -247,11 +214,13 @@ def index_socio(request):
         'membership': membership,
         'has_active_membership': request.user.has_active_membership(),
         'access_logs': access_logs[:20],  # Mostrar últimas 20
-        'weekly_access': weekly_access,
-        'monthly_access': monthly_access,
-        'total_access': total_access,
+        'weekly_access': summary['weekly'],
+        'monthly_access': summary['monthly'],
+        'total_access': summary['allowed'],
         'streak_days': streak_days,
-        'accessed_today': accessed_today,
+        'longest_streak': streaks['longest'],
+        'weekly_frequency': streaks['weekly_frequency'],
+        'accessed_today': summary['accessed_today'],
         'planes_renovacion': planes_data,
     }
     
@@ -297,39 +266,6 @@ def edit_profile_socio(request):
 
     return render(request, 'edit_profile_socio.html', {'user': user})
 
-def calculate_streak(user):
-    """Calcula la racha de días consecutivos de asistencia - CORREGIDO"""
-    # Usamos lógica de rangos para evitar timestamp__date
-    now_chile = timezone.localtime(timezone.now())
-    current_date = now_chile
-    streak = 0
-    
-    # Verificar los últimos 30 días
-    for i in range(30):
-        # Definir inicio y fin del día que estamos verificando
-        start_of_day = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = current_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        has_access = AccessLog.objects.filter(
-            user=user,
-            timestamp__range=(start_of_day, end_of_day), # Uso de rango en lugar de __date
-            status='allowed'
-        ).exists()
-        
-        if has_access:
-            streak += 1
-            # Retroceder un día
-            current_date -= timedelta(days=1)
-        else:
-            # Si hoy no vino, permitimos revisar si ayer vino para no romper la racha inmediatamente
-            # (Opcional: Si quieres que la racha se rompa estrictamente si HOY no vino, quita este if)
-            if i == 0: 
-                current_date -= timedelta(days=1)
-                continue
-            break
-    
-    return streak
-
 def redirect_by_role(user):
     """
     Redirige al usuario según su rol.
@@ -1,14 +1,20 @@
 import json
+import tempfile
+from datetime import date
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.db.models import Sum
-from ..models import Plan, Membership, Payment
+from ..models import Plan, Membership, Payment, ReportJob
 from ..utils import generate_pdf_receipt
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+from ..services.timeseries import time_series, current_year_months
+from ..services.payment_export import SOURCES, stream_csv, write_xlsx
+from ..services import report_jobs
+from ..services.receipt_bundle import iter_receipts, payments_between, stream_zip
 
 
 # ==================== GESTION DE PLANES (ADMIN) ====================
@@ -116,31 +122,12 @@ def admin_plan_details(request, plan_id):
         ).aggregate(total=Sum('amount_paid'))['total'] or 0
 
         # 3. Datos para el Gráfico (AÑO ACTUAL COMPLETO)
-        # Reemplazamos la logica de "últimos 6 meses" por "Año Actual"
-        
-        # Inicializamos arrays fijos
-        chart_labels = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        chart_values = [0] * 12
-        
-        current_year = timezone.now().year
-        current_month = timezone.now().month
-
-        # Filtramos todos los pagos de este plan en el año actual (excluyendo cancelados)
-        pagos_plan_anio = Membership.objects.filter(
-            plan=plan,
-            payment_date__year=current_year
-        ).exclude(status='cancelled')
-
-        # Llenamos los datos mes a mes
-        for pago in pagos_plan_anio:
-            mes_index = pago.payment_date.month - 1
-            # Usamos amount_paid para ser exactos con el dinero real ingresado
-            monto = getattr(pago, 'amount_paid', plan.price) 
-            chart_values[mes_index] += int(monto)
-
-        # Recortamos para no mostrar meses futuros vacíos
-        chart_labels = chart_labels[:current_month]
-        chart_values = chart_values[:current_month]
+        # Suma por mes en la BD (excluyendo cancelados), hasta el mes actual
+        start, end = current_year_months(timezone.localdate())
+        chart_labels, chart_values = time_series(
+            Membership.objects.filter(plan=plan).exclude(status='cancelled'),
+            'payment_date', start, end, period='month', aggregate=Sum('amount_paid')
+        )
 
         # 4. Beneficios como lista
         beneficios_lista = [b.strip() for b in plan.benefits.split(',')] if plan.benefits else []
@@ -259,56 +246,34 @@ def admin_plan_delete(request, plan_id):
 
 @login_required(login_url='inicio_sesion')
 def exportar_pagos_excel(request):
-    """Genera y descarga el reporte de pagos en Excel"""
+    """
+    Genera y descarga el reporte de pagos.
+    ?formato=xlsx (por defecto) o csv; ?origen=membresias (por defecto) o pagos (libro mayor).
+    Memoria acotada: filas por lotes, Excel en modo write_only y CSV en streaming.
+    """
     if not request.user.role == 'admin':
         return redirect('inicio_sesion')
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=Reporte_Pagos_{timezone.now().strftime("%Y%m%d")}.xlsx'
+    origen = request.GET.get('origen', 'membresias')
+    formato = request.GET.get('formato', 'xlsx')
+    if origen not in SOURCES or formato not in ('xlsx', 'csv'):
+        messages.error(request, 'Formato u origen de exportación no válido')
+        return redirect('index_admin')
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Historial de Transacciones"
+    nombre = f'Reporte_{"Libro_Pagos" if origen == "pagos" else "Pagos"}_{timezone.now().strftime("%Y%m%d")}'
+    if formato == 'csv':
+        response = StreamingHttpResponse(stream_csv(origen), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename={nombre}.csv'
+        return response
 
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="000000", end_color="000000", fill_type="solid") # Fondo negro
-    center_align = Alignment(horizontal="center")
-    
-    # Encabezados
-    headers = ['ID', 'Fecha', 'RUT Socio', 'Nombre Socio', 'Plan', 'Método Pago', 'Monto', 'Estado', 'Realizado Por']
-    ws.append(headers)
-
-    # Aplicar estilo a encabezados
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-
-    # Obtener datos (Todos, no solo los últimos 50)
-    pagos = Membership.objects.select_related('user', 'plan').all().order_by('-payment_date')
-
-    for pago in pagos:
-        # Determinar quién realizó la acción (si está en notas o log, aquí asumimos sistema o usuario actual si no hay registro)
-        ws.append([
-            pago.id,
-            pago.payment_date.strftime("%d/%m/%Y H:i"),
-            pago.user.rut,
-            pago.user.get_full_name(),
-            pago.plan.name,
-            pago.get_payment_method_display(),
-            pago.amount_paid,
-            pago.get_status_display(),
-            "Sistema" # Puedes personalizar esto si guardas el staff en la transacción
-        ])
-
-    # Ajustar ancho de columnas
-    column_widths = [10, 20, 15, 25, 20, 15, 12, 12, 15]
-    for i, width in enumerate(column_widths, 1):
-        ws.column_dimensions[chr(64+i)].width = width
-
-    wb.save(response)
-    return response
+    # El libro se escribe a un temporal en disco (se borra al cerrar la respuesta)
+    archivo = tempfile.TemporaryFile()
+    write_xlsx(origen, archivo)
+    archivo.seek(0)
+    return FileResponse(
+        archivo, as_attachment=True, filename=f'{nombre}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
 
 @login_required(login_url='inicio_sesion')
 def ver_recibo_pago(request, payment_id):
@@ -331,4 +296,106 @@ def ver_recibo_pago(request, payment_id):
             
     except Payment.DoesNotExist: # CAMBIO: Catch de Payment
         messages.error(request, 'Transacción no encontrada')
-        return redirect('index_admin')
\ No newline at end of file
+        return redirect('index_admin')
+
+
+@login_required(login_url='inicio_sesion')
+def descargar_recibos_zip(request):
+    """
+    Descarga un ZIP con los recibos de los pagos entre ?desde= y ?hasta=
+    (YYYY-MM-DD, ambas inclusive; por defecto el mes en curso).
+    El ZIP se envía en streaming a medida que cada recibo está listo.
+
+    X-Receipt-Count (cantidad de recibos) sale con los encabezados, antes del
+    primer byte; el tamaño final no se conoce de antemano, así que no hay
+    Content-Length. Para ver el avance de rangos grandes está el reporte en
+    segundo plano (solicitar_reporte / estado_reporte con progress y total).
+    """
+    if not request.user.role == 'admin':
+        return redirect('inicio_sesion')
+
+    today = timezone.localdate()
+    try:
+        desde = date.fromisoformat(request.GET.get('desde') or today.replace(day=1).isoformat())
+        hasta = date.fromisoformat(request.GET.get('hasta') or today.isoformat())
+    except ValueError:
+        messages.error(request, 'Fechas inválidas (formato AAAA-MM-DD)')
+        return redirect('index_admin')
+    if desde > hasta:
+        messages.error(request, 'La fecha inicial no puede ser posterior a la final')
+        return redirect('index_admin')
+
+    pagos = payments_between(desde, hasta)
+    total = pagos.count()
+    if total == 0:
+        messages.error(request, 'No hay pagos en el rango seleccionado')
+        return redirect('index_admin')
+
+    response = StreamingHttpResponse(stream_zip(iter_receipts(pagos)), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="Recibos_{desde:%Y%m%d}_{hasta:%Y%m%d}.zip"'
+    response['X-Receipt-Count'] = str(total)
+    return response
+
+
+# --- REPORTES EN SEGUNDO PLANO ---
+
+def _report_job_json(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'total': job.total,
+        'error': job.error,
+        'download_url': reverse('descargar_reporte', args=[job.id]) if job.status == 'done' else None,
+    }
+
+
+@login_required(login_url='inicio_sesion')
+@require_http_methods(["POST"])
+def solicitar_reporte(request):
+    """
+    Encola un reporte (Excel/CSV de pagos o ZIP de recibos) para el worker
+    process_report_jobs. Si ya hay uno con los mismos datos se reutiliza.
+    """
+    if not request.user.role == 'admin':
+        return JsonResponse({'success': False, 'message': 'No autorizado'}, status=403)
+    try:
+        data = json.loads(request.body or '{}')
+        if not isinstance(data, dict):
+            raise ValueError('Se esperaba un objeto JSON')
+        job, reused = report_jobs.request_report(data.get('kind'), data, user=request.user)
+    except (ValueError, KeyError, TypeError) as e:
+        return JsonResponse({'success': False, 'message': str(e) or 'Parámetros inválidos'}, status=400)
+    return JsonResponse({'success': True, 'reused': reused, 'job': _report_job_json(job)})
+
+
+@login_required(login_url='inicio_sesion')
+@require_http_methods(["GET"])
+def estado_reporte(request, job_id):
+    """Estado y avance de un reporte (el panel lo consulta periódicamente)."""
+    if not request.user.role == 'admin':
+        return JsonResponse({'success': False, 'message': 'No autorizado'}, status=403)
+    try:
+        job = ReportJob.objects.get(id=job_id)
+    except ReportJob.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Reporte no encontrado'}, status=404)
+    return JsonResponse({'success': True, 'job': _report_job_json(job)})
+
+
+@login_required(login_url='inicio_sesion')
+def descargar_reporte(request, job_id):
+    """Descarga el archivo de un reporte ya generado."""
+    if not request.user.role == 'admin':
+        return redirect('inicio_sesion')
+    try:
+        job = ReportJob.objects.get(id=job_id, status='done')
+        archivo = report_jobs.storage().open(job.file_name, 'rb')
+    except (ReportJob.DoesNotExist, FileNotFoundError):
+        messages.error(request, 'El reporte no está disponible')
+        return redirect('index_admin')
+    return FileResponse(
+        archivo, as_attachment=True, filename=report_jobs.job_filename(job),
+        content_type=report_jobs.CONTENT_TYPES[job.kind]
+    )
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect
+from .. import middleware as sql_profiler
+
+# --- PERFIL DE SQL POR URL (SQL_PROFILER_ENABLED) ---
+
+@login_required(login_url='inicio_sesion')
+def perfil_sql(request):
+    """Resumen del perfilador de SQL: p50/p95/p99 por nombre de URL. POST vacía el buffer."""
+    if request.user.role != 'admin' and not request.user.is_superuser:
+        messages.error(request, 'No tienes permisos para acceder a esta area.')
+        return redirect('inicio_sesion')
+
+    if request.method == 'POST':
+        sql_profiler.buffer.clear()
+        messages.success(request, 'Mediciones eliminadas')
+        return redirect('perfil_sql')
+
+    profiles = sql_profiler.buffer.snapshot()
+    context = {
+        'enabled': getattr(settings, 'SQL_PROFILER_ENABLED', False),
+        'buffer_size': getattr(settings, 'SQL_PROFILER_BUFFER_SIZE', 2000),
+        'total': len(profiles),
+        'rows': sql_profiler.summarize(profiles),
+        'recent': sorted(profiles, key=lambda p: p.queries, reverse=True)[:20],
+    }
+    return render(request, 'perfil_sql.html', context)
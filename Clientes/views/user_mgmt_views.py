@@ -6,8 +6,10 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from datetime import datetime
-from ..utils import send_qr_email
+from ..services.outbox import enqueue_welcome_email
 from ..models import CustomUser, Plan, Membership
+from .. import rut as rut_utils
+from ..services.attendance import user_access_summary
 
 # ==================== GESTION DE USUARIOS (ADMIN) ====================
 
@@ -27,18 +29,16 @@ def admin_user_details(request, user_id):
         # Obtener accesos recientes (últimos 20)
         access_logs = user.access_logs.all().order_by('-timestamp')[:20]
         
-        # Calcular estadisticas
-        total_accesos = user.access_logs.count()
-        accesos_permitidos = user.access_logs.filter(status='allowed').count()
-        accesos_denegados = user.access_logs.filter(status='denied').count()
+        # Calcular estadisticas (resumen diario, una consulta)
+        resumen = user_access_summary(user)
         
         context = {
             'user_detail': user,
             'memberships': memberships,
             'access_logs': access_logs,
-            'total_accesos': total_accesos,
-            'accesos_permitidos': accesos_permitidos,
-            'accesos_denegados': accesos_denegados,
+            'total_accesos': resumen['total'],
+            'accesos_permitidos': resumen['allowed'],
+            'accesos_denegados': resumen['denied'],
         }
         
         return render(request, 'admin_user_details.html', context)
@@ -249,7 +249,7 @@ def process_admin_user_creation(request):
             }, status=400)
         
         # Validar duplicados
-        if CustomUser.objects.filter(rut=data['rut']).exists():
+        if CustomUser.objects.filter(rut_normalized=rut_utils.normalize(data['rut'])).exists():
             return JsonResponse({'success': False, 'error': 'El RUT ingresado ya esta registrado'}, status=400)
         
         if CustomUser.objects.filter(email=data['email']).exists():
@@ -299,22 +299,18 @@ def process_admin_user_creation(request):
                 send_qr_req = data.get('sendQREmail', False)
                 send_contract_req = data.get('sendContract', False) # <--- NUEVO
 
-                email_sent = False
-                if send_qr_req or send_contract_req:
-                    try:
-                        email_sent = send_qr_email(
-                            user, 
-                            membership, 
-                            send_qr=send_qr_req, 
-                            send_contract=send_contract_req
-                        )
-                    except Exception as email_error:
-                        print(f"Error al enviar email: {str(email_error)}")
+                # El correo se encola; lo envía el worker (process_outbox)
+                enqueue_welcome_email(
+                    user, 
+                    membership, 
+                    send_qr=send_qr_req, 
+                    send_contract=send_contract_req
+                )
                 
                 msg_extra = []
                 if send_qr_req: msg_extra.append("QR")
                 if send_contract_req: msg_extra.append("Contrato")
-                msg_final = f" (+ {' y '.join(msg_extra)} enviado)" if msg_extra else ""
+                msg_final = f" (+ {' y '.join(msg_extra)} en cola de envío)" if msg_extra else ""
 
                 return JsonResponse({
                     'success': True,
@@ -367,13 +363,15 @@ def moderador_ver_usuario(request, user_id):
         memberships = user.memberships.all().order_by('-created_at')
         access_logs = user.access_logs.all().order_by('-timestamp')[:20]
         
+        resumen = user_access_summary(user)
+        
         context = {
             'user_detail': user,
             'memberships': memberships,
             'access_logs': access_logs,
-            'total_accesos': user.access_logs.count(),
-            'accesos_permitidos': user.access_logs.filter(status='allowed').count(),
-            'accesos_denegados': user.access_logs.filter(status='denied').count(),
+            'total_accesos': resumen['total'],
+            'accesos_permitidos': resumen['allowed'],
+            'accesos_denegados': resumen['denied'],
         }
         # Renderizar el HTML específico de moderador
         return render(request, 'moderador_user_details.html', context) 
@@ -45,9 +45,12 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware con request.user en caché por sesión (Clientes/user_cache.py)
+    'Clientes.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Perfilador de SQL por request; solo se activa con SQL_PROFILER_ENABLED
+    'Clientes.middleware.SQLProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'Gimnasio.urls'
@@ -101,6 +104,70 @@ else:
         # Fallback por si pymysql no está instalado en algún entorno
         pass
 
+# ==============================================================================
+# CACHÉ
+# ==============================================================================
+
+# LocMem es por proceso: con varios workers de gunicorn conviene apuntar 'default'
+# a un backend compartido (Redis/Memcached/DatabaseCache) para que las
+# invalidaciones de un worker lleguen a los demás.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gimnasio-default',
+    },
+    # Imágenes de QR ya dibujadas (Clientes/services/qr_render.py). En disco para
+    # que sobrevivan reinicios y se compartan entre workers del mismo servidor.
+    'qr_images': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'qr_images',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Caché de admisión del escáner QR (Clientes/admission_cache.py). Solo se usa si
+# ADMISSION_CACHE_ALIAS es una caché compartida entre workers; con LocMemCache
+# cada escaneo lee la BD, salvo ADMISSION_CACHE_ALLOW_LOCAL (un solo proceso).
+ADMISSION_CACHE_ALIAS = 'default'
+ADMISSION_CACHE_TIMEOUT = 60 * 60 * 12  # 12 horas
+ADMISSION_CACHE_ALLOW_LOCAL = DEBUG
+
+# Antigüedad máxima (segundos) de un escaneo sin conexión que acepta
+# process_qr_scan_batch; los más antiguos se rechazan como 'invalid'
+MAX_OFFLINE_AGE = 60 * 60 * 72  # 3 días (un fin de semana largo sin red)
+
+# Usuario de cada sesión (Clientes/user_cache.py): se invalida desde CustomUser.save().
+# Igual que la caché de admisión, solo se usa con una caché compartida entre
+# workers, salvo SESSION_USER_CACHE_ALLOW_LOCAL (un solo proceso).
+SESSION_USER_CACHE_ALIAS = 'default'
+SESSION_USER_CACHE_TIMEOUT = 60 * 5  # 5 minutos
+SESSION_USER_CACHE_ALLOW_LOCAL = DEBUG
+
+# Caché de imágenes QR: LRU en memoria + caché persistente
+QR_RENDER_CACHE_ALIAS = 'qr_images'
+QR_RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 días
+QR_RENDER_LRU_SIZE = 512
+
+# Workers de gunicorn y su --timeout (los lee start.sh de las mismas variables)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', '30'))
+
+# PDFs (Clientes/services/pdf_render.py): procesos para xhtml2pdf (0 = en el
+# mismo proceso) y carpeta de recibos ya generados. Cada worker de gunicorn
+# crea su propio pool, así que los núcleos del host se reparten entre ellos.
+# La espera de un PDF queda bajo WEB_TIMEOUT para responder antes de que
+# gunicorn mate al worker.
+PDF_RENDER_WORKERS = int(os.environ.get(
+    'PDF_RENDER_WORKERS', max(1, min(4, os.cpu_count() or 1) // WEB_CONCURRENCY)
+))
+PDF_RENDER_TIMEOUT = int(os.environ.get('PDF_RENDER_TIMEOUT', WEB_TIMEOUT * 2 // 3))
+PDF_CACHE_DIR = BASE_DIR / 'cache' / 'pdf'
+
+# Perfilador de SQL (Clientes/middleware.py): SQL_PROFILER=1 para activarlo.
+# Resumen en /management/sql-profile/ (solo administradores)
+SQL_PROFILER_ENABLED = os.environ.get('SQL_PROFILER') == '1'
+SQL_PROFILER_BUFFER_SIZE = 2000  # Últimos requests medidos (por proceso)
+
 # ==============================================================================
 # VALIDACIÓN DE PASSWORD
 # ==============================================================================
@@ -157,6 +224,8 @@ STORAGES = {
 MEDIA_URL = '/media/'
 # Nota: Es más estándar usar BASE_DIR / 'media', pero si prefieres dentro de Clientes, está bien.
 MEDIA_ROOT = BASE_DIR / 'Clientes' / 'media'
+# Reportes generados por process_report_jobs (se descargan por vista con login)
+REPORTS_ROOT = MEDIA_ROOT / 'reports'
 
 # ==============================================================================
 # CONFIGURACIÓN PERSONALIZADA (USUARIOS, EMAIL, LOGIN)
@@ -169,16 +238,33 @@ AUTH_USER_MODEL = 'Clientes.CustomUser'
 
 # Custom Authentication Backend
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',  # Para /admin
     'Clientes.backends.RUTorEmailBackend',        # Para login con RUT/Email
+    'Clientes.backends.AdminModelBackend',        # Para /admin (solo ahí)
 ]
 
+# Intentos de login fallidos (Clientes/login_throttle.py): tras superar el límite
+# dentro de la ventana se rechaza sin consultar la BD ni calcular el hash
+LOGIN_THROTTLE_CACHE_ALIAS = 'default'
+LOGIN_FAILURE_WINDOW = 15 * 60  # segundos
+LOGIN_MAX_FAILURES = 5           # por identificador (RUT/email/usuario) + IP
+# Proxies delante de Django que agregan su salto a X-Forwarded-For (Render: 1).
+# Con 0 la IP es REMOTE_ADDR; detrás de un proxy REMOTE_ADDR es la del balanceador
+# y todos los socios compartirían un mismo contador.
+LOGIN_TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0' if DEBUG else '1'))
+# Límite por IP (cualquier identificador). None = desactivado: activarlo solo
+# cuando LOGIN_TRUSTED_PROXY_COUNT entregue la IP real del cliente, si no un
+# atacante bloquea el login de todo el gimnasio.
+LOGIN_MAX_FAILURES_PER_IP = None
+
 # Login redirect
 LOGIN_URL = '/'
 LOGIN_REDIRECT_URL = '/'
 
 # Configuración de Email
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Los correos los envía el worker `python manage.py process_outbox --continuo`,
+# que start.sh levanta junto a gunicorn en Render. Para probar
+# en local sin SMTP: EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
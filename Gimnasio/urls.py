@@ -41,8 +41,14 @@ urlpatterns = [
     # Otras vistas
     path('qr-scanner/', views.mostrar_Scanner, name='mostrar_Scanner'),
     path('QR/', views.mostrar_QRCodeEmail, name='mostrar_QRCodeEmail'),
+    path('qr/<slug:qr_unique_id>.<str:fmt>', views.qr_image, name='qr_image'),
     path('management/payments/export/', views.exportar_pagos_excel, name='exportar_pagos_excel'),
     path('management/payments/<int:payment_id>/receipt/', views.ver_recibo_pago, name='ver_recibo_pago'),
+    path('management/payments/receipts.zip', views.descargar_recibos_zip, name='descargar_recibos_zip'),
+    path('management/reports/', views.solicitar_reporte, name='solicitar_reporte'),
+    path('management/sql-profile/', views.perfil_sql, name='perfil_sql'),
+    path('management/reports/<int:job_id>/', views.estado_reporte, name='estado_reporte'),
+    path('management/reports/<int:job_id>/download/', views.descargar_reporte, name='descargar_reporte'),
 
     # API Endpoints
     path('api/plans/', views.get_plans, name='get_plans'),
@@ -54,8 +60,10 @@ urlpatterns = [
     
     # Nueva ruta para procesar QR
     path('api/process-qr-scan/', views.process_qr_scan, name='process_qr_scan'),
+    path('api/process-qr-scan/batch/', views.process_qr_scan_batch, name='process_qr_scan_batch'),
     #probando cosas
     path('api/buscar-socio/', views.api_buscar_socio, name='api_buscar_socio'),
+    path('api/socios/', views.api_socios, name='api_socios'),
     path('api/renovar-plan/', views.api_renovar_plan, name='api_renovar_plan'),
     #moderador funcionalidades
     path('moderador/nuevo-usuario/', views.moderador_nuevo_usuario, name='moderador_nuevo_usuario'),
@@ -4,5 +4,8 @@ set -o errexit
 
 pip install -r requirements.txt
 python manage.py collectstatic --no-input
-python manage.py makemigrations
-python manage.py migrate
\ No newline at end of file
+# Las migraciones van versionadas en Clientes/migrations (no se generan en el deploy)
+python manage.py migrate
+python manage.py normalize_ruts
+python manage.py rebuild_attendance_rollup --si-vacio
+python manage.py rebuild_search_index --si-vacio
@@ -0,0 +1,23 @@
+#!/usr/bin/env bash
+# Arranque del servicio web en Render (Start Command: bash start.sh).
+# Junto a gunicorn corren los workers: las vistas solo encolan (OutboxMessage,
+# ReportJob) y, sin ellos, los correos y los reportes se quedan en la cola.
+# Los reportes se escriben en REPORTS_ROOT (disco local del servicio), por eso
+# su worker corre en este mismo servicio y no en uno aparte.
+set -o errexit
+
+# Corre un comando de manage.py en segundo plano y lo relanza si se cae
+run_worker() {
+  while true; do
+    python manage.py "$@" || echo "Worker '$1' terminó con error, se relanza en 5 s" >&2
+    sleep 5
+  done
+}
+
+run_worker process_outbox --continuo &
+run_worker process_report_jobs --continuo &
+
+# WEB_CONCURRENCY (variable de entorno) define la cantidad de workers de gunicorn.
+# WEB_TIMEOUT también lo lee settings.py: la espera de un PDF (PDF_RENDER_TIMEOUT)
+# se calcula bajo este límite.
+exec gunicorn Gimnasio.wsgi:application --bind "0.0.0.0:${PORT:-8000}" --timeout "${WEB_TIMEOUT:-30}"